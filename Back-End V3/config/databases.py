@@ -1,5 +1,138 @@
-from databases import Database
+import asyncio
+import os
+import time
+from databases import Database, DatabaseURL
+from databases.backends.mysql import MySQLBackend, MySQLConnection
+from fastapi import HTTPException
 
-DATABASE_URL = f"YOUR_DATABASE_URL_HERE"
+DATABASE_URL = os.getenv("DATABASE_URL", "YOUR_DATABASE_URL_HERE")
 
-db = Database(DATABASE_URL)
\ No newline at end of file
+# --- Pool de conexiones (aiomysql) ---
+# Tamaño del pool y reciclado: la variable de entorno, si no lo que diga la
+# query de DATABASE_URL (?min_size=...&max_size=...&pool_recycle=...), si no el default
+_OPCIONES_POOL = (
+    # (opción, variable de entorno, default)
+    ("min_size", "DB_POOL_MIN", 1),
+    ("max_size", "DB_POOL_MAX", 10),
+    # Las conexiones inactivas por más de esto se cierran antes de reutilizarlas
+    # (Railway y otros proxies cortan las conexiones ociosas); -1 = nunca
+    ("pool_recycle", "DB_POOL_RECICLAR_SEGUNDOS", 240),
+)
+# Espera máxima por una conexión libre; después se responde 503 en lugar de colgar el pedido
+DB_POOL_ESPERA_SEGUNDOS = float(os.getenv("DB_POOL_ESPERA_SEGUNDOS", "10"))
+# Ping (COM_PING) a las conexiones que estuvieron inactivas más de esto antes de
+# usarlas; si se cayeron se reconectan ahí y no fallan en la consulta. -1 = sin ping
+DB_POOL_PING_SEGUNDOS = float(os.getenv("DB_POOL_PING_SEGUNDOS", "30"))
+DB_CONNECT_TIMEOUT_SEGUNDOS = int(os.getenv("DB_CONNECT_TIMEOUT_SEGUNDOS", "10"))
+# Tope por consulta (max_execution_time de MySQL, solo aplica a SELECT); 0 = sin tope
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class _ConexionMedida(MySQLConnection):
+    async def acquire(self) -> None:
+        assert self._connection is None, "Connection is already acquired"
+        self._connection = await self._database.tomar_conexion()
+
+
+class BackendMySQL(MySQLBackend):
+    """
+    El backend MySQL de `databases`, con tope de espera al tomar una conexión
+    del pool, ping a las conexiones ociosas y métricas del pool.
+    """
+
+    def __init__(self, database_url, espera_segundos: float = DB_POOL_ESPERA_SEGUNDOS,
+                 ping_segundos: float = DB_POOL_PING_SEGUNDOS, **options):
+        super().__init__(database_url, **options)
+        self.espera_segundos = espera_segundos
+        self.ping_segundos = ping_segundos
+        # Solo se tocan desde el event loop, no hace falta lock
+        self.esperando = 0
+        self.adquisiciones = 0
+        self.timeouts = 0
+        self.pings = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def connection(self) -> MySQLConnection:
+        return _ConexionMedida(self, self._dialect)
+
+    async def tomar_conexion(self):
+        assert self._pool is not None, "DatabaseBackend is not running"
+        inicio = time.perf_counter()
+        self.esperando += 1
+        try:
+            conexion = await asyncio.wait_for(self._pool.acquire(), self.espera_segundos)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Base de datos ocupada, intentá nuevamente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self.esperando -= 1
+        espera = time.perf_counter() - inicio
+        self.adquisiciones += 1
+        self.espera_total += espera
+        self.espera_max = max(self.espera_max, espera)
+
+        if self.ping_segundos >= 0 and asyncio.get_running_loop().time() - conexion.last_usage > self.ping_segundos:
+            self.pings += 1
+            try:
+                # Con reconnect=True (por defecto) reabre la conexión si el servidor la cortó
+                await conexion.ping()
+            except BaseException:
+                # También si cancelan el pedido (wait_for, cliente que se va): si no, la
+                # conexión queda tomada para siempre y el pool se achica. Se cierra
+                # porque un ping cortado a la mitad deja el protocolo desincronizado.
+                conexion.close()
+                self._pool.release(conexion)
+                raise
+        return conexion
+
+    def metricas(self) -> dict:
+        pool = self._pool
+        return {
+            "conectado": pool is not None,
+            "minimo": pool.minsize if pool else None,
+            "maximo": pool.maxsize if pool else None,
+            "abiertas": pool.size if pool else 0,
+            "en_uso": pool.size - pool.freesize if pool else 0,
+            "libres": pool.freesize if pool else 0,
+            "esperando": self.esperando,
+            "adquisiciones": self.adquisiciones,
+            "espera_promedio_ms": round(self.espera_total / self.adquisiciones * 1000, 3) if self.adquisiciones else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "timeouts_espera": self.timeouts,
+            "pings": self.pings,
+        }
+
+
+class BaseDeDatos(Database):
+    SUPPORTED_BACKENDS = {**Database.SUPPORTED_BACKENDS, "mysql": "config.databases:BackendMySQL"}
+
+    def metricas(self) -> dict:
+        return self._backend.metricas()
+
+    async def verificar(self, timeout: float) -> None:
+        """Un SELECT 1 con tope de tiempo: falla si el pool no puede dar una conexión sana."""
+        await asyncio.wait_for(self.fetch_val("SELECT 1"), timeout)
+
+
+def _opciones_pool(url: str) -> dict:
+    # Las opciones del constructor pisan a las de la URL: solo se pasan las que
+    # vienen del entorno o las que la URL no trae
+    en_url = DatabaseURL(url).options
+    opciones = {}
+    for opcion, variable, default in _OPCIONES_POOL:
+        if os.getenv(variable) is not None:
+            opciones[opcion] = int(os.environ[variable])
+        elif opcion not in en_url:
+            opciones[opcion] = default
+    opciones["connect_timeout"] = DB_CONNECT_TIMEOUT_SEGUNDOS
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        opciones["init_command"] = f"SET SESSION max_execution_time = {DB_STATEMENT_TIMEOUT_MS}"
+    return opciones
+
+
+db = BaseDeDatos(DATABASE_URL, **_opciones_pool(DATABASE_URL))
@@ -1,6 +1,14 @@
+import os
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from config.databases import db
-from routers import consultorio,turno,medico,cliente,horarios_medicos
+from routers import consultorio,turno,medico,cliente,horarios_medicos,admin,eventos
+from services.auth import pool_hashing
+from services.ciclo_turnos import ciclo_turnos, CICLO_TURNOS_ACTIVO
+from services.archivo_turnos import archivo_turnos, ARCHIVO_TURNOS_ACTIVO
+from services.reportes import refresco_reportes
+from services.pdf_turnos import pool_pdf
+from services.referencias import referencias
 
 # --- LOG DE DEBUG 1 ---
 print("\n[DEBUG] main.py: Iniciando importaciones...")
@@ -27,17 +35,32 @@ app.add_middleware(
     allow_origins=origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.on_event("startup")
 async def startup():
     await db.connect()
     print("✅ Conexión a la base de datos establecida.")
+    await referencias.cargar()
+    print("✅ Datos de referencia cargados.")
+    if CICLO_TURNOS_ACTIVO:
+        ciclo_turnos.iniciar()
+        print("✅ Ciclo automático de turnos iniciado.")
+    if ARCHIVO_TURNOS_ACTIVO:
+        archivo_turnos.iniciar()
+        print("✅ Archivo periódico de turnos iniciado.")
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await ciclo_turnos.detener()
+    await archivo_turnos.detener()
+    # Aplica los resúmenes diarios pendientes antes de cerrar la conexión
+    await refresco_reportes.esperar()
     await db.disconnect()
+    pool_hashing.cerrar()
+    pool_pdf.cerrar()
     print("❌ Conexión a la base de datos cerrada.")
 
 
@@ -46,6 +69,23 @@ async def root():
     return {"message": "Bienvenidos a mi API REST"}
 
 
+# Tope del SELECT 1 de /listo: más que esto y el balanceador deja de mandar tráfico
+LISTO_TIMEOUT_SEGUNDOS = float(os.getenv("LISTO_TIMEOUT_SEGUNDOS", "2"))
+
+
+@app.get("/listo")
+async def listo():
+    """Readiness: 200 si el pool da una conexión que responde; 503 si no."""
+    if not db.is_connected:
+        return JSONResponse(status_code=503, content={"listo": False, "error": "Sin conexión a la base de datos"})
+    try:
+        await db.verificar(LISTO_TIMEOUT_SEGUNDOS)
+    except Exception as e:
+        detalle = getattr(e, "detail", None) or str(e) or type(e).__name__
+        return JSONResponse(status_code=503, content={"listo": False, "error": detalle, "pool": db.metricas()})
+    return {"listo": True, "pool": db.metricas()}
+
+
 print("\n[DEBUG] main.py: Configurando routers...")
 
 if auth:
@@ -69,4 +109,10 @@ app.include_router(cliente.router,prefix="/clientes")
 print("[DEBUG] main.py: Router de clientes (/clientes) INCLUIDO.")
 
 app.include_router(horarios_medicos.router,prefix="/horarios_medicos")
-print("[DEBUG] main.py: Router de horarios_medicos (/horarios_medicos) INCLUIDO.")
\ No newline at end of file
+print("[DEBUG] main.py: Router de horarios_medicos (/horarios_medicos) INCLUIDO.")
+
+app.include_router(admin.router,prefix="/admin")
+print("[DEBUG] main.py: Router de admin (/admin) INCLUIDO.")
+
+app.include_router(eventos.router,prefix="/eventos")
+print("[DEBUG] main.py: Router de eventos (/eventos) INCLUIDO.")
\ No newline at end of file
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from services.auth import require_rol
+from services.ciclo_turnos import ciclo_turnos
+from services.archivo_turnos import archivo_turnos
+from services.reportes import refresco_reportes
+from services.respuestas import RespuestaJSON
+import services.analitica as analitica_service
+from services.pdf_turnos import pool_pdf, cache_pdf
+from services.eventos import bus as bus_eventos
+from services.cache_http import cache_respuestas, versiones
+from services.referencias import referencias
+from config.databases import db
+from services.exportacion import limite_descargas
+
+# No hay un rol de administrador: las vistas operativas quedan para el personal (médicos)
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_rol("medico"))])
+
+
+@router.get("/tareas")
+async def get_tareas():
+    """Métricas de las tareas de fondo (filas tocadas, duración, atraso)."""
+    return {
+        "ciclo_turnos": ciclo_turnos.metricas(),
+        "archivo_turnos": archivo_turnos.metricas(),
+        "reportes": refresco_reportes.metricas(),
+        "analitica": analitica_service.cache_analitica.metricas(),
+        "pdf": {**pool_pdf.metricas(), "cache": cache_pdf.metricas()},
+        "eventos": bus_eventos.metricas(),
+        "cache_http": {**cache_respuestas.metricas(), "versiones": versiones.metricas()},
+        "referencias": referencias.metricas(),
+        "bd": db.metricas(),
+        "exportacion": limite_descargas.metricas(),
+    }
+
+
+@router.post("/tareas/ciclo-turnos/ejecutar")
+async def ejecutar_ciclo_turnos():
+    """Corre una pasada del ciclo de turnos ahora, sin esperar al intervalo."""
+    await ciclo_turnos.ejecutar()
+    return ciclo_turnos.metricas()
+
+
+# Archivar a demanda no se expone: mueve turnos de toda la clínica y no hay un
+# rol de administrador. Se corre con scripts/archivar_turnos.py.
+
+
+# --- Analítica de toda la clínica --------------------------------------------
+
+MAX_DIAS_ANALITICA = 366
+
+
+def _rango(desde: Optional[date], hasta: Optional[date]):
+    """Por defecto las últimas 4 semanas (hasta hoy inclusive)."""
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=27)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'")
+    if (hasta - desde).days + 1 > MAX_DIAS_ANALITICA:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_DIAS_ANALITICA} días")
+    return desde, hasta
+
+
+@router.get("/ocupacion")
+async def get_ocupacion(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Ocupación por médico x día x hora y por consultorio x día (cache corto)."""
+    return RespuestaJSON(await analitica_service.get_ocupacion(*_rango(desde, hasta)))
+
+
+@router.get("/demanda")
+async def get_demanda(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Reservas y cancelaciones por día x hora, por especialidad y horas pico (cache corto)."""
+    return RespuestaJSON(await analitica_service.get_demanda(*_rango(desde, hasta)))
+
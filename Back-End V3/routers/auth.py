@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
 import services.auth as service
+from schemas.auth import Token, RefreshTokenIn
 
 router = APIRouter(tags=["auth"])
 
-@router.post("/auth/token/paciente")
+@router.post("/auth/token/paciente", response_model=Token)
 async def login_paciente_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ):
@@ -13,21 +14,21 @@ async def login_paciente_for_access_token(
     Endpoint de login para Pacientes (Clientes).
     Espera 'username' (email) y 'password'.
     """
-    access_token = await service.authenticate_user(
+    tokens = await service.authenticate_user(
         form_data.username, 
         form_data.password, 
         "cliente"
     )
-    if not access_token:
+    if not tokens:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="El correo electrónico o la contraseña son incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return tokens
 
 
-@router.post("/auth/token/profesional")
+@router.post("/auth/token/profesional", response_model=Token)
 async def login_profesional_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ):
@@ -35,15 +36,30 @@ async def login_profesional_for_access_token(
     Endpoint de login para Profesionales (Medicos).
     Espera 'username' (email) y 'password'.
     """
-    access_token = await service.authenticate_user(
+    tokens = await service.authenticate_user(
         form_data.username, 
         form_data.password, 
         "medico"
     )
-    if not access_token:
+    if not tokens:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="El correo electrónico o la contraseña son incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return tokens
+
+
+@router.post("/auth/token/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshTokenIn):
+    """
+    Renueva el access token usando el refresh token, sin pedir la contraseña.
+    El refresh token usado queda invalidado y se devuelve uno nuevo (rotación).
+    """
+    return await service.refresh_session(body.refresh_token)
+
+
+@router.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(body: RefreshTokenIn):
+    """Revoca la sesión asociada al refresh token."""
+    await service.revoke_session(body.refresh_token)
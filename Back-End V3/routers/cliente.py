@@ -1,12 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Annotated, List
 from schemas.cliente import Cliente, ClienteIn
 import services.cliente as service
+from services.auth import get_current_user, require_rol
+from schemas.auth import TokenData
 
 router = APIRouter(tags=["clientes"])
 
+UsuarioActual = Annotated[TokenData, Depends(get_current_user)]
+ClienteActual = Annotated[TokenData, Depends(require_rol("cliente"))]
+
+
+def _verificar_propio(usuario: TokenData, id: int):
+    if usuario.id != id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede operar sobre su propio perfil")
+
+# Tope de ids por pedido en la consulta batch
+MAX_IDS_BATCH = 500
+
+
+@router.get("/", response_model=List[Cliente])
+async def read_clientes(usuario: UsuarioActual, ids: str = Query(..., description="Ids separados por coma, p. ej. 1,2,3")):
+    """Varios clientes en un solo pedido (evita un GET /clientes/{id} por paciente)."""
+    try:
+        lista = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids debe ser una lista de enteros separados por coma")
+    if len(lista) > MAX_IDS_BATCH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Máximo {MAX_IDS_BATCH} ids por pedido")
+    if usuario.rol == "cliente":
+        for id in lista:
+            _verificar_propio(usuario, id)
+    return await service.get_clientes_by_ids(lista)
+
+
 @router.get("/{id}", response_model=Cliente)
-async def read_cliente(id: int):
+async def read_cliente(id: int, usuario: UsuarioActual):
+    # Los médicos necesitan ver los datos de sus pacientes
+    if usuario.rol == "cliente":
+        _verificar_propio(usuario, id)
     return await service.get_cliente_by_id(id)
 
 
@@ -16,10 +48,12 @@ async def registrar_cliente(cliente: ClienteIn):
 
 
 @router.put("/{id}", response_model=Cliente)
-async def update_cliente(id: int, cliente: ClienteIn):
+async def update_cliente(id: int, cliente: ClienteIn, usuario: ClienteActual):
+    _verificar_propio(usuario, id)
     return await service.update_cliente(id, cliente)
 
 
 @router.delete("/{id}")
-async def delete_cliente(id: int):
+async def delete_cliente(id: int, usuario: ClienteActual):
+    _verificar_propio(usuario, id)
     return await service.delete_cliente(id)
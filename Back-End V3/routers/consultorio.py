@@ -1,16 +1,25 @@
 from typing import List
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
+from services.auth import require_rol
+import services.cache_http as cache_http
+from services.referencias import referencias
 from schemas.consultorio import ConsultorioIn,Consultorio
 import services.consultorio as service
 
 router = APIRouter(tags=["consultorios"])
+_lista_consultorios = TypeAdapter(List[Consultorio])
 
 @router.get("/", response_model=List[Consultorio])
-async def read_all_consultorios():
-    """Obtiene una lista de todos los consultorios."""
-    return await service.get_all_consultorios()
+async def read_all_consultorios(request: Request):
+    """Obtiene una lista de todos los consultorios (con ETag: 304 si no cambió)."""
+    async def generar():
+        return cache_http.serializar(_lista_consultorios, await service.get_all_consultorios()), {}
+    # Primero la recarga periódica: puede mover la versión (cambios de otro worker)
+    await referencias.asegurar_cargado()
+    return await cache_http.responder(request, [cache_http.CONSULTORIOS], generar)
 
-@router.put("/{id}", response_model=Consultorio)
+@router.put("/{id}", response_model=Consultorio, dependencies=[Depends(require_rol("medico"))])
 async def update_Consultorio(id: int, consultorio: ConsultorioIn):
     return await service.update_consultorio(id,consultorio)
 
@@ -0,0 +1,123 @@
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from services.auth import decode_access_token, TokenData
+import services.eventos as eventos
+
+router = APIRouter(tags=["eventos"])
+
+# Cada cuánto reintenta EventSource si se corta la conexión (ms)
+RETRY_MS = 3000
+
+
+def _topicos_disponibilidad(especialidad: Optional[str], medico_id: Optional[int]) -> List[str]:
+    """El tópico más chico que cubre el filtro; el cliente aplica el resto (p. ej. la fecha)."""
+    if medico_id is not None:
+        return [eventos.topico_medico(medico_id)]
+    if especialidad:
+        return [eventos.topico_especialidad(especialidad)]
+    return [eventos.TOPICO_DISPONIBILIDAD]
+
+
+def _medico_de_token(token: Optional[str], medico_id: int) -> TokenData:
+    """
+    EventSource y WebSocket no permiten mandar el header Authorization, así
+    que el access token puede venir en la query (?token=...).
+    """
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta el token")
+    usuario = decode_access_token(token)
+    if usuario.rol != "medico" or usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos para esta agenda")
+    return usuario
+
+
+def _ultimo_id(last_event_id: Optional[str]) -> Optional[int]:
+    return int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+
+async def _sse(topicos: List[str], ultimo_id: Optional[int]) -> AsyncIterator[bytes]:
+    yield b"retry: %d\n\n" % RETRY_MS
+    async for evento in eventos.bus.suscribir(topicos, ultimo_id):
+        # Sin novedades: un comentario mantiene viva la conexión
+        yield b": ping\n\n" if evento is None else evento.sse
+
+
+def _respuesta_sse(topicos: List[str], last_event_id: Optional[str]) -> StreamingResponse:
+    eventos.bus.verificar_capacidad()
+    return StreamingResponse(
+        _sse(topicos, _ultimo_id(last_event_id)),
+        media_type="text/event-stream",
+        # Que nginx no acumule el stream en su buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/disponibilidad", response_class=StreamingResponse)
+async def stream_disponibilidad(
+    especialidad: Optional[str] = None,
+    medico_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events con los cambios de disponibilidad: `slot_ocupado`
+    (slot_id) y `slot_liberado` (el slot en el formato de
+    /horarios_medicos/disponibles/). Público, como ese listado.
+    """
+    return _respuesta_sse(_topicos_disponibilidad(especialidad, medico_id), last_event_id)
+
+
+@router.get("/medico/{medico_id}", response_class=StreamingResponse)
+async def stream_agenda_medico(
+    medico_id: int,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events con los cambios en los turnos del médico:
+    `turno_creado` (TurnoCompleto), `turno_estado` y `turno_eliminado`.
+    """
+    _medico_de_token(token, medico_id)
+    return _respuesta_sse([eventos.topico_agenda(medico_id)], last_event_id)
+
+
+@router.websocket("/ws")
+async def websocket_eventos(
+    websocket: WebSocket,
+    especialidad: Optional[str] = None,
+    medico_id: Optional[int] = None,
+    agenda: bool = False,
+    token: Optional[str] = None,
+    ultimo_id: Optional[int] = Query(None, ge=0),
+):
+    """
+    Los mismos eventos por WebSocket, un JSON por mensaje. Con `agenda=true`
+    (y el token del médico `medico_id`) recibe además los de su agenda.
+    """
+    topicos = _topicos_disponibilidad(especialidad, medico_id)
+    try:
+        if agenda:
+            if medico_id is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Falta medico_id")
+            _medico_de_token(token, medico_id)
+            topicos.append(eventos.topico_agenda(medico_id))
+        eventos.bus.verificar_capacidad()
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    try:
+        # aclosing: si el cliente se va, la suscripción se da de baja enseguida
+        async with aclosing(eventos.bus.suscribir(topicos, ultimo_id)) as stream:
+            async for evento in stream:
+                if evento is None:
+                    await websocket.send_text('{"tipo":"ping"}')
+                else:
+                    await websocket.send_text(evento.json.decode())
+    except WebSocketDisconnect:
+        pass
+    else:
+        # Después de `resincronizar` el cliente recarga y se vuelve a conectar
+        await websocket.close()
@@ -1,41 +1,125 @@
-from typing import List
+from typing import List, Optional
+from datetime import date
 # --- MODIFICACIÓN: Importar el nuevo schema ---
-from schemas.horarios_medicos import Horario_Medico, Horario_MedicoIn, HorarioDisponible
+from schemas.horarios_medicos import Horario_Medico, Horario_MedicoIn, HorarioDisponible, HorarioSemanalIn, ResultadoHorarioSemanal
 # ----------------------------------------------
 import services.horarios_medicos as service
-from fastapi import APIRouter
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import Annotated
+from pydantic import TypeAdapter
+from services.auth import require_rol
+from services.disponibilidad import motor
+from services.referencias import referencias
+import services.cache_http as cache_http
+from schemas.auth import TokenData
 
 router = APIRouter(tags=["horarios_medicos"])
+MedicoActual = Annotated[TokenData, Depends(require_rol("medico"))]
+_lista_horarios = TypeAdapter(List[Horario_Medico])
+_lista_slots = TypeAdapter(List[HorarioDisponible])
 
 @router.get("/", response_model=List[Horario_Medico])
-async def read_horarios_medicos():
-    return await service.get_all_horarios_medicos()
+async def read_horarios_medicos(request: Request):
+    async def generar():
+        return cache_http.serializar(_lista_horarios, await service.get_all_horarios_medicos()), {}
+    # Primero la recarga periódica: puede mover la versión (cambios de otro worker)
+    await referencias.asegurar_cargado()
+    return await cache_http.responder(request, [cache_http.HORARIOS], generar)
 
 @router.get("/por-medico/{medico_id}", response_model=List[Horario_Medico])
-async def read_horarios_medico_by_id(medico_id: int):
-    return await service.get_horarios_medico_by_id(medico_id)   
+async def read_horarios_medico_by_id(medico_id: int, request: Request):
+    async def generar():
+        return cache_http.serializar(_lista_horarios, await service.get_horarios_medico_by_id(medico_id)), {}
+    await referencias.asegurar_cargado()
+    return await cache_http.responder(request, [cache_http.HORARIOS], generar)
+
+@router.put("/por-medico/{medico_id}", response_model=ResultadoHorarioSemanal)
+async def replace_horarios_medico(medico_id: int, horarios: List[HorarioSemanalIn], usuario: MedicoActual):
+    """
+    Reemplaza la grilla semanal completa del médico en una sola transacción:
+    lo que no venga en la lista se elimina, lo nuevo se crea y lo distinto se actualiza.
+    """
+    _verificar_medico(usuario, medico_id)
+    return await service.reemplazar_horarios_medico(medico_id, horarios)
 
 @router.get("/{id}", response_model=Horario_Medico)
 async def read_horario_medico(id: int):
     return await service.get_horario_id(id) 
 
+def _verificar_medico(usuario: TokenData, medico_id: int):
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede modificar sus propios horarios")
+
+async def _verificar_horario_propio(usuario: TokenData, id: int):
+    horario = await referencias.horario(id)
+    if horario is None:
+        raise HTTPException(status_code=404, detail="Horario médico no encontrado")
+    _verificar_medico(usuario, horario.medicos_id)
+
 @router.post("/", response_model=Horario_Medico)
-async def create_horario_medico(horario_medico: Horario_MedicoIn):
+async def create_horario_medico(horario_medico: Horario_MedicoIn, usuario: MedicoActual):
+    _verificar_medico(usuario, horario_medico.medicos_id)
     return await service.create_horario_medico(horario_medico)
 
 @router.put("/{id}", response_model=Horario_Medico)
-async def update_horario_medico(id: int, horario_medico: Horario_MedicoIn):
+async def update_horario_medico(id: int, horario_medico: Horario_MedicoIn, usuario: MedicoActual):
+    # El horario tiene que ser suyo antes y después del cambio
+    await _verificar_horario_propio(usuario, id)
+    _verificar_medico(usuario, horario_medico.medicos_id)
     return await service.update_horario_medico(id, horario_medico)
 
 @router.delete("/{id}")
-async def delete_horario_medico(id: int):
+async def delete_horario_medico(id: int, usuario: MedicoActual):
+    await _verificar_horario_propio(usuario, id)
     return await service.delete_horario_medico(id)
 
-# --- Endpoint para slots disponibles (sin cambios respecto a la vez anterior) ---
+# --- Endpoint para slots disponibles ---
 @router.get("/disponibles/", response_model=List[HorarioDisponible], tags=["horarios_medicos"])
-async def read_horarios_disponibles():
+async def read_horarios_disponibles(
+    request: Request,
+    especialidad: Optional[str] = None,
+    medico_id: Optional[int] = None,
+    consultorio_id: Optional[int] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    days_in_future: int = Query(14, ge=1, le=90),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
     """
     Obtiene una lista generada de todos los slots de horarios futuros
     que aún no han sido reservados por un turno.
+
+    Si se pasa `limit` y hay más resultados, el header `X-Next-Cursor`
+    trae el cursor para pedir la página siguiente.
+
+    El ETag sale de la versión del índice de disponibilidad y del minuto
+    actual: los slots que empiezan y las retenciones que vencen sacan o
+    devuelven slots sin que cambie el índice, así que vale a lo sumo un minuto.
     """
-    return await service.get_available_slots()
\ No newline at end of file
+    async def generar():
+        slots = await service.get_available_slots(
+            days_in_future=days_in_future,
+            especialidad=especialidad,
+            medico_id=medico_id,
+            consultorio_id=consultorio_id,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            limit=limit,
+            cursor=cursor,
+        )
+        headers = {}
+        if limit is not None and len(slots) == limit:
+            headers["X-Next-Cursor"] = service.codificar_cursor_slot(slots[-1])
+        return cache_http.serializar(_lista_slots, slots), headers
+
+    # La versión tiene que ser la del índice ya cargado
+    await motor.asegurar_cargado()
+    minuto = datetime.now().strftime("%Y%m%d%H%M")
+    return await cache_http.responder(request, [cache_http.DISPONIBILIDAD], generar, variable=minuto)
+
+@router.get("/especialidades/", response_model=List[str], tags=["horarios_medicos"])
+async def read_especialidades_disponibles():
+    """Especialidades que tienen al menos un horario cargado."""
+    return await service.get_especialidades_disponibles()
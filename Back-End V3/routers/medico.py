@@ -1,25 +1,82 @@
 from fastapi import APIRouter, Depends,HTTPException,status
 from schemas.medico import Medico, MedicoIn
+from schemas.cliente import PacienteMedico
+from schemas.reporte import ReporteMedico
+from services.respuestas import RespuestaJSON
 import services.medico as service
+import services.reportes as reportes_service
+from services.auth import require_rol
+from schemas.auth import TokenData
 from fastapi import HTTPException, status
-from typing import List,Annotated
+from typing import List,Annotated,Optional
+from datetime import date, timedelta
+from fastapi import Query
 from pydantic import BaseModel
 
 router= APIRouter(tags=["medicos"])
+MedicoActual = Annotated[TokenData, Depends(require_rol("medico"))]
+
 class MedicoStats(BaseModel):
     turnos_hoy: int
     pacientes_totales: int
 
 @router.get("/{medico_id}/estadisticas", response_model=MedicoStats)
-async def get_medico_estadisticas(medico_id: int):
+async def get_medico_estadisticas(medico_id: int, usuario: MedicoActual):
     """Obtiene estadísticas rápidas para el dashboard del médico."""
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede ver sus propias estadísticas")
     return await service.get_medico_estadisticas(medico_id)
 
 
+# Un año como máximo por pedido: el reporte lee una fila por día
+MAX_DIAS_REPORTE = 366
+
+
+@router.get("/{medico_id}/reportes", response_model=ReporteMedico)
+async def get_reporte_medico(
+    medico_id: int,
+    usuario: MedicoActual,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+):
+    """Resumen diario de turnos y ocupación (por defecto, los últimos 30 días)."""
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede ver sus propios reportes")
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=29)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior o igual a 'hasta'")
+    if (hasta - desde).days + 1 > MAX_DIAS_REPORTE:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_DIAS_REPORTE} días")
+    return await reportes_service.get_reporte_medico(medico_id, desde, hasta)
+
+
+@router.get("/{medico_id}/pacientes", response_model=List[PacienteMedico])
+async def get_pacientes_medico(
+    medico_id: int,
+    usuario: MedicoActual,
+    limit: int = Query(100, ge=1, le=500),
+    despues_de: Optional[int] = Query(None, description="Id del último paciente de la página anterior"),
+    solo_activos: bool = False,
+):
+    """Pacientes del médico con resumen de visitas, en una sola consulta agregada."""
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede ver sus propios pacientes")
+    pacientes = await service.get_pacientes_medico(medico_id, limit, despues_de, solo_activos)
+    headers = {}
+    if len(pacientes) == limit:
+        headers["X-Next-Cursor"] = str(pacientes[-1]["id"])
+    return RespuestaJSON(pacientes, headers=headers)
+
+
 @router.put("/{id}", response_model=Medico)
-async def update_Medico(id: int, Medico: MedicoIn):
+async def update_Medico(id: int, Medico: MedicoIn, usuario: MedicoActual):
+    if usuario.id != id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede modificar su propio perfil")
     return await service.update_medico(id, Medico)
 
 @router.delete("/{id}")
-async def delete_Medico(id: int):
+async def delete_Medico(id: int, usuario: MedicoActual):
+    if usuario.id != id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puede eliminar su propio perfil")
     return await service.delete_medico(id)
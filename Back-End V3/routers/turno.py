@@ -1,62 +1,235 @@
 from fastapi import APIRouter,Depends,HTTPException,status
-from schemas.turno import Turno, TurnoIn,TurnoCompleto, EstadoTurno 
+from schemas.turno import Turno, TurnoIn,TurnoCompleto, EstadoTurno, RetencionIn, RetencionOut, ConfirmarRetencionIn, CambioEstadoIn
 import services.turnos as service
+from services.auth import get_current_user, require_rol
+from services.respuestas import RespuestaJSON
+from services.consultas_turnos import codificar_cursor
+from services.exportacion import exportar_turnos, FormatoExportacion
+from services.referencias import referencias
+import services.pdf_turnos as pdf_turnos
+import services.cliente as cliente_service
+from schemas.auth import TokenData
 from fastapi import HTTPException, status
-from typing import List,Annotated
+from typing import List,Annotated,Optional,Literal
+from datetime import datetime
+from fastapi import Query, Header
+from fastapi.responses import Response, StreamingResponse
 
 
 router= APIRouter(tags=["turnos"])
 
+UsuarioActual = Annotated[TokenData, Depends(get_current_user)]
+MedicoActual = Annotated[TokenData, Depends(require_rol("medico"))]
+ClienteActual = Annotated[TokenData, Depends(require_rol("cliente"))]
+
+
+class FiltrosTurnos:
+    """Query params comunes a los listados de turnos (filtros + paginación keyset)."""
+
+    def __init__(
+        self,
+        estado: Annotated[Optional[List[EstadoTurno]], Query()] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        limit: Annotated[Optional[int], Query(ge=1, le=500)] = None,
+        cursor: Optional[str] = None,
+        orden: Literal["asc", "desc"] = "desc",
+        incluir_historial: bool = False,
+    ):
+        self.estados = estado
+        self.desde = desde
+        self.hasta = hasta
+        self.limit = limit
+        self.cursor = cursor
+        self.ascendente = orden == "asc"
+        self.incluir_historial = incluir_historial
+
+    def kwargs(self) -> dict:
+        return {"estados": self.estados, "desde": self.desde, "hasta": self.hasta,
+                "limit": self.limit, "cursor": self.cursor, "ascendente": self.ascendente,
+                "incluir_historial": self.incluir_historial}
+
+    def respuesta(self, turnos: list) -> RespuestaJSON:
+        """Si la página vino llena, agrega X-Next-Cursor para pedir la siguiente."""
+        headers = {}
+        if self.limit is not None and len(turnos) == self.limit:
+            ultimo = turnos[-1]
+            headers["X-Next-Cursor"] = codificar_cursor(ultimo["fecha_hora"], ultimo["id"])
+        return RespuestaJSON(turnos, headers=headers)
+
+
+def _verificar_paciente(usuario: TokenData, cliente_id: int):
+    """Un paciente solo puede ver sus propios turnos; los médicos pueden ver cualquiera."""
+    if usuario.rol == "cliente" and usuario.id != cliente_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puede acceder a turnos de otro paciente")
+
+
+def _verificar_medico(usuario: TokenData, medico_id: int):
+    """Un médico solo puede tocar los turnos de su propia agenda."""
+    if usuario.rol == "medico" and usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puede acceder a turnos de otro médico")
+
+
+async def _turno_propio(id: int, usuario: TokenData) -> dict:
+    """El turno completo, si es del paciente o está en la agenda del médico."""
+    turno = await service.get_turno_completo(id)
+    if not turno:
+        raise HTTPException(status_code=404, detail="Turno no encontrado")
+    _verificar_paciente(usuario, turno["clientes_id"])
+    _verificar_medico(usuario, turno["medico"]["id"])
+    return turno
+
 
 @router.get("/cliente/{cliente_id}", response_model=List[TurnoCompleto])
-async def get_turnos_cliente_completos(cliente_id:int):
-    return await service.get_turnos_cliente_completos(cliente_id)
+async def get_turnos_cliente_completos(cliente_id:int, usuario: UsuarioActual, filtros: Annotated[FiltrosTurnos, Depends()]):
+    _verificar_paciente(usuario, cliente_id)
+    return filtros.respuesta(await service.get_turnos_cliente_completos(cliente_id, **filtros.kwargs()))
 
 
 @router.get("/medico/{medico_id}", response_model=List[TurnoCompleto])
-async def get_turnos_medico_completos(medico_id:int):
-    return await service.get_turnos_medico_completos(medico_id)
+async def get_turnos_medico_completos(medico_id:int, usuario: MedicoActual, filtros: Annotated[FiltrosTurnos, Depends()]):
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puede acceder a turnos de otro médico")
+    return filtros.respuesta(await service.get_turnos_medico_completos(medico_id, **filtros.kwargs()))
+
+
+@router.get("/cliente/{cliente_id}/exportar", response_class=StreamingResponse)
+async def exportar_turnos_cliente(
+    cliente_id: int,
+    usuario: UsuarioActual,
+    filtros: Annotated[FiltrosTurnos, Depends()],
+    formato: FormatoExportacion = "csv",
+):
+    """Descarga los turnos del paciente en CSV o NDJSON, en streaming (sin límite de filas)."""
+    _verificar_paciente(usuario, cliente_id)
+    consulta = service.consulta_turnos(cliente_id=cliente_id, **filtros.kwargs())
+    return exportar_turnos(consulta, formato, f"turnos_cliente_{cliente_id}")
 
 
-@router.post("/", response_model=Turno)
-async def create_turno(turno: TurnoIn):
-    return await service.create_turno(turno)
+@router.get("/medico/{medico_id}/exportar", response_class=StreamingResponse)
+async def exportar_turnos_medico(
+    medico_id: int,
+    usuario: MedicoActual,
+    filtros: Annotated[FiltrosTurnos, Depends()],
+    formato: FormatoExportacion = "csv",
+):
+    """Descarga los turnos del médico en CSV o NDJSON, en streaming (sin límite de filas)."""
+    if usuario.id != medico_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puede acceder a turnos de otro médico")
+    consulta = service.consulta_turnos(medico_id=medico_id, **filtros.kwargs())
+    return exportar_turnos(consulta, formato, f"turnos_medico_{medico_id}")
+
+
+@router.get("/cliente/{cliente_id}/historial.pdf", response_class=Response,
+            responses={200: {"content": {"application/pdf": {}}}, 304: {"description": "Sin cambios (If-None-Match)"}})
+async def historial_pdf(
+    cliente_id: int,
+    usuario: UsuarioActual,
+    if_none_match: Annotated[Optional[str], Header(alias="If-None-Match")] = None,
+):
+    """Historial de turnos del paciente en PDF, generado en el servidor."""
+    _verificar_paciente(usuario, cliente_id)
+    cliente = dict(await cliente_service.get_cliente_by_id(cliente_id))
+    turnos = await service.get_historial_cliente(cliente_id)
+    return await pdf_turnos.historial(cliente, turnos, if_none_match)
+
+
+@router.post("/", response_model=Turno, responses={409: {"description": "El slot ya tiene un turno activo"}})
+async def create_turno(
+    turno: TurnoIn,
+    usuario: ClienteActual,
+    idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key", max_length=255)] = None,
+):
+    _verificar_paciente(usuario, turno.clientes_id)
+    return await service.create_turno(turno, idempotency_key)
+
+@router.post("/retenciones", response_model=RetencionOut, status_code=status.HTTP_201_CREATED,
+             responses={409: {"description": "El slot ya está reservado o apartado"}})
+async def retener_slot(retencion: RetencionIn, usuario: ClienteActual):
+    """
+    Aparta un slot por unos segundos mientras el paciente completa la reserva.
+    Mientras dure, el slot no aparece en /horarios_medicos/disponibles/.
+    """
+    r = await service.retener_slot(usuario.id, retencion.horarios_medicos_id, retencion.fecha_hora, retencion.segundos)
+    return RetencionOut(token=r.token, horarios_medicos_id=r.horarios_medicos_id, fecha_hora=r.fecha_hora, expira=r.expira)
+
+
+@router.post("/retenciones/{token}/confirmar", response_model=Turno,
+             responses={404: {"description": "La retención no existe o ya venció"}})
+async def confirmar_retencion(
+    token: str,
+    datos: ConfirmarRetencionIn,
+    usuario: ClienteActual,
+    idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key", max_length=255)] = None,
+):
+    return await service.confirmar_retencion(token, usuario.id, datos.motivo, idempotency_key)
+
+
+@router.delete("/retenciones/{token}", status_code=status.HTTP_204_NO_CONTENT)
+async def liberar_retencion(token: str, usuario: ClienteActual):
+    service.liberar_retencion(token, usuario.id)
+
+
+# Debe declararse antes de PUT /{id}: si no, "estado" se intenta leer como id
+@router.put("/estado", response_model=List[TurnoCompleto],
+            responses={404: {"description": "Algún turno no existe o no es del médico"},
+                       409: {"description": "Alguna transición de estado no es válida"}})
+async def update_estado_turnos(cambio: CambioEstadoIn, usuario: MedicoActual):
+    """Confirma, cancela o completa varios turnos del médico en una sola transacción."""
+    return RespuestaJSON(await service.update_estado_turnos(cambio.ids, cambio.estado, medico_id=usuario.id))
+
 
 @router.put("/{id}", response_model=Turno)
-async def update_turno(id: int, turno: TurnoIn):
+async def update_turno(id: int, turno: TurnoIn, usuario: UsuarioActual):
+    """Edita un turno propio. `estado` se ignora: se cambia con /confirmar, /cancelar o PUT /estado."""
+    await _turno_propio(id, usuario)
+    # Tampoco se puede pasar el turno a otro paciente o a la agenda de otro médico
+    _verificar_paciente(usuario, turno.clientes_id)
+    if usuario.rol == "medico":
+        horario = await referencias.horario(turno.horarios_medicos_id)
+        if horario is None:
+            raise HTTPException(status_code=404, detail="Horario médico no encontrado")
+        _verificar_medico(usuario, horario.medicos_id)
     return await service.update_turno(id, turno)
 
 @router.delete("/{id}")
-async def delete_turno(id: int):
+async def delete_turno(id: int, usuario: UsuarioActual):
+    await _turno_propio(id, usuario)
     return await service.delete_turno(id)
 
 @router.get("/cliente/{cliente_id}/proximo", response_model=TurnoCompleto)
-async def get_proximo_turno_cliente(cliente_id: int):
+async def get_proximo_turno_cliente(cliente_id: int, usuario: UsuarioActual):
+    _verificar_paciente(usuario, cliente_id)
     turno = await service.get_proximo_turno_cliente(cliente_id)
     if not turno:
         raise HTTPException(status_code=404, detail="No se encontró un próximo turno.")
     return turno
 
+@router.get("/{id}/comprobante.pdf", response_class=Response,
+            responses={200: {"content": {"application/pdf": {}}}, 304: {"description": "Sin cambios (If-None-Match)"}})
+async def comprobante_pdf(
+    id: int,
+    usuario: UsuarioActual,
+    if_none_match: Annotated[Optional[str], Header(alias="If-None-Match")] = None,
+):
+    """Comprobante del turno en PDF. Se cachea por (turno, estado) y responde 304 si no cambió."""
+    turno = await _turno_propio(id, usuario)
+    return await pdf_turnos.comprobante(turno, if_none_match)
+
+
 @router.put("/{id}/confirmar", response_model=TurnoCompleto)
-async def confirm_turno_endpoint(id: int):
+async def confirm_turno_endpoint(id: int, usuario: MedicoActual):
     """
-    Permite a un médico Aceptar (confirmar) un turno pendiente.
+    Permite a un médico Aceptar (confirmar) un turno pendiente de su agenda.
     """
-    try:
-        return await service.update_estado_turno(id, EstadoTurno.CONFIRMADO)
-    except HTTPException as http_exc:
-        raise http_exc
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error interno servidor: {e}")
+    return await service.update_estado_turno(id, EstadoTurno.CONFIRMADO, medico_id=usuario.id)
 
 @router.put("/{id}/cancelar", response_model=TurnoCompleto)
-async def cancel_turno_endpoint(id: int):
+async def cancel_turno_endpoint(id: int, usuario: UsuarioActual):
     """
-    Permite a un médico o paciente Cancelar un turno.
+    Permite a un médico o paciente Cancelar un turno (de su agenda o propio).
     """
-    try:
-        return await service.update_estado_turno(id, EstadoTurno.CANCELADO)
-    except HTTPException as http_exc:
-        raise http_exc
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error interno servidor: {e}")
+    if usuario.rol == "medico":
+        return await service.update_estado_turno(id, EstadoTurno.CANCELADO, medico_id=usuario.id)
+    await _turno_propio(id, usuario)
+    return await service.update_estado_turno(id, EstadoTurno.CANCELADO)
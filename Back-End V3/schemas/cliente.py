@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime,date
+from typing import Optional
 
 class ClienteIn(BaseModel):
     nombre : str
@@ -17,4 +18,12 @@ class Cliente(BaseModel):
     dni : int
     email : str
     telefono : str
-    fecha_nacimiento : date
\ No newline at end of file
+    fecha_nacimiento : date
+
+class PacienteMedico(Cliente):
+    """Cliente visto desde la agenda de un médico, con el resumen de sus turnos."""
+    total_turnos: int
+    turnos_activos: int
+    turnos_completados: int
+    ultima_visita: Optional[datetime] = None
+    proxima_visita: Optional[datetime] = None
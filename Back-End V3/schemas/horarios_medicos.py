@@ -1,10 +1,28 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
 from datetime import datetime, time, date
 
-class Horario_MedicoIn(BaseModel):
-    dia_semana: int
+class BloqueHorarioIn(BaseModel):
+    """Campos de un bloque de agenda, validados igual en todas las altas y modificaciones."""
+    # 0 = domingo ... 6 = sábado
+    dia_semana: int = Field(ge=0, le=6)
     hora_inicio: time
     hora_fin: time
+    # Minutos por turno dentro del bloque; None = un solo turno en hora_inicio
+    duracion_slot: Optional[int] = Field(default=None, ge=5, le=240)
+
+    @model_validator(mode="after")
+    def _validar_bloque(self):
+        # Un bloque invertido o más corto que un turno no genera ningún slot
+        if self.hora_fin <= self.hora_inicio:
+            raise ValueError(f"hora_fin debe ser posterior a hora_inicio ({self.dia_semana} {self.hora_inicio})")
+        if self.duracion_slot:
+            minutos = (self.hora_fin.hour * 60 + self.hora_fin.minute) - (self.hora_inicio.hour * 60 + self.hora_inicio.minute)
+            if minutos < self.duracion_slot:
+                raise ValueError(f"El bloque ({minutos} min) es más corto que duracion_slot ({self.duracion_slot} min)")
+        return self
+
+class Horario_MedicoIn(BloqueHorarioIn):
     medicos_id: int
     consultorios_id: int
 
@@ -13,9 +31,20 @@ class Horario_Medico(BaseModel):
     dia_semana: int
     hora_inicio: time
     hora_fin: time
+    duracion_slot: Optional[int] = None
     medicos_id: int
     consultorios_id: int 
 
+class HorarioSemanalIn(BloqueHorarioIn):
+    """Un bloque de la grilla semanal de un médico (el médico sale de la URL)."""
+    consultorios_id: int
+
+class ResultadoHorarioSemanal(BaseModel):
+    insertados: int
+    actualizados: int
+    eliminados: int
+    horarios: List[Horario_Medico]
+
 class HorarioDisponible(BaseModel):
     id: str 
     horarios_medico_id: int
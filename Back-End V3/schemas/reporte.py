@@ -0,0 +1,34 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class ReporteDia(BaseModel):
+    fecha: date
+    reservados: int
+    pendientes: int
+    confirmados: int
+    cancelados: int
+    completados: int
+    pacientes_unicos: int
+    # Slots programados ese día y fracción ocupada (pendientes + confirmados + completados)
+    capacidad: int
+    ocupacion: Optional[float] = None
+
+
+class ReporteTotales(BaseModel):
+    reservados: int
+    pendientes: int
+    confirmados: int
+    cancelados: int
+    completados: int
+    capacidad: int
+    ocupacion: Optional[float] = None
+
+
+class ReporteMedico(BaseModel):
+    medico_id: int
+    desde: date
+    hasta: date
+    dias: List[ReporteDia]
+    totales: ReporteTotales
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from schemas.medico import MedicoPublic
 from schemas.consultorio import Consultorio
 
@@ -31,4 +31,24 @@ class Turno(BaseModel):
 class TurnoCompleto(Turno):
     medico: MedicoPublic
     consultorio: Consultorio
-    cliente_nombre_completo: Optional[str] = None
\ No newline at end of file
+    cliente_nombre_completo: Optional[str] = None
+
+
+class CambioEstadoIn(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=200)
+    estado: EstadoTurno
+
+class RetencionIn(BaseModel):
+    horarios_medicos_id: int
+    fecha_hora: datetime
+    # Duración pedida; por defecto RETENCION_SEGUNDOS (services/retenciones.py)
+    segundos: Optional[int] = Field(default=None, ge=10, le=600)
+
+class RetencionOut(BaseModel):
+    token: str
+    horarios_medicos_id: int
+    fecha_hora: datetime
+    expira: datetime
+
+class ConfirmarRetencionIn(BaseModel):
+    motivo: str
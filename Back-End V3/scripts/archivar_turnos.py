@@ -0,0 +1,53 @@
+"""
+Archiva turnos completados/cancelados viejos en `turnos_historico`.
+
+Corre el mismo proceso que services.archivo_turnos (lotes cortos, una
+transacción por lote) como job independiente, p. ej. desde cron. Requiere
+haber aplicado sql/004_turnos_historico.sql y DATABASE_URL configurada.
+
+    python scripts/archivar_turnos.py --dias 365 --lote 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.databases import db
+from services.archivo_turnos import ArchivoTurnos, ARCHIVO_TURNOS_DIAS, ARCHIVO_TURNOS_LOTE, ARCHIVO_TURNOS_PAUSA_MS
+
+
+async def archivar(dias: int, lote: int, pausa_ms: int, max_lotes: int) -> None:
+    archivo = ArchivoTurnos(dias=dias, lote=lote, pausa_ms=pausa_ms)
+    await db.connect()
+    try:
+        total, t0 = 0, time.perf_counter()
+        async for n, movidas in _numerar(archivo.lotes(max_lotes or None)):
+            total += movidas
+            print(f"  lote {n:4d}: {movidas:6d} filas  (total {total})")
+        print(f"Archivados {total} turnos en {time.perf_counter() - t0:.1f} s")
+    finally:
+        await db.disconnect()
+
+
+async def _numerar(lotes):
+    n = 0
+    async for movidas in lotes:
+        n += 1
+        yield n, movidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=ARCHIVO_TURNOS_DIAS, help="Antigüedad mínima en días")
+    parser.add_argument("--lote", type=int, default=ARCHIVO_TURNOS_LOTE)
+    parser.add_argument("--pausa-ms", type=int, default=ARCHIVO_TURNOS_PAUSA_MS)
+    parser.add_argument("--max-lotes", type=int, default=0, help="0 = hasta terminar")
+    args = parser.parse_args()
+    asyncio.run(archivar(args.dias, args.lote, args.pausa_ms, args.max_lotes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Calibra el costo de bcrypt para este servidor.
+
+Mide cuánto tarda un hash en cada costo y recomienda el mayor costo cuyo
+tiempo no supera el objetivo. El valor se configura con la variable de
+entorno BCRYPT_ROUNDS; los hashes existentes con otro costo se migran solos
+en el próximo login exitoso (ver services.auth.needs_rehash).
+
+    python scripts/calibrar_bcrypt.py --objetivo-ms 250
+"""
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+COSTO_MINIMO = 10  # Por debajo de esto el hash deja de ser razonable frente a ataques offline
+COSTO_MAXIMO = 16
+
+
+def medir_ms(costo: int, repeticiones: int) -> float:
+    password = b"calibracion-bcrypt"
+    tiempos = []
+    for _ in range(repeticiones):
+        salt = bcrypt.gensalt(rounds=costo)
+        t0 = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def calibrar(objetivo_ms: float, repeticiones: int) -> int:
+    elegido = COSTO_MINIMO
+    for costo in range(COSTO_MINIMO, COSTO_MAXIMO + 1):
+        ms = medir_ms(costo, repeticiones)
+        marca = "ok" if ms <= objetivo_ms else "excede"
+        print(f"  costo {costo:2d}: {ms:8.1f} ms  ({marca})")
+        if ms > objetivo_ms:
+            break
+        elegido = costo
+    return elegido
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objetivo-ms", type=float, default=250.0,
+                        help="tiempo máximo aceptable por hash, en milisegundos")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Midiendo bcrypt (objetivo {args.objetivo_ms:.0f} ms por hash)...")
+    costo = calibrar(args.objetivo_ms, args.repeticiones)
+    print(f"\nCosto recomendado: BCRYPT_ROUNDS={costo}")
+
+
+if __name__ == "__main__":
+    main()
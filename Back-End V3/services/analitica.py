@@ -0,0 +1,388 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from config.databases import db
+from services.disponibilidad import motor, HorarioIndexado
+
+# Los tableros se piden seguido y toleran datos de hace un minuto
+ANALITICA_CACHE_SEGUNDOS = int(os.getenv("ANALITICA_CACHE_SEGUNDOS", "60"))
+
+ESTADOS = ("pendiente", "confirmado", "cancelado", "completado")
+_CANCELADO = ESTADOS.index("cancelado")
+# Mismo criterio que `dia_semana` en horarios_medicos: 0 = domingo
+DIAS = ("dom", "lun", "mar", "mie", "jue", "vie", "sab")
+HORAS = 24
+
+# Los turnos llegan ya agrupados por (médico, consultorio, día, hora, estado):
+# como mucho unos miles de filas aunque el rango tenga millones de turnos.
+# DAYOFWEEK devuelve 1 = domingo, así que restando 1 coincide con DIAS.
+# LEFT JOIN: los turnos de horarios ya borrados llegan con médico NULL y
+# cuentan en la demanda aunque no se puedan atribuir a un médico.
+_QUERY_TURNOS = """
+    SELECT hm.medicos_id, hm.consultorios_id, t.dia, t.hora, t.estado, COUNT(*) AS cantidad
+    FROM (
+        SELECT horarios_medicos_id, DAYOFWEEK(fecha_hora) - 1 AS dia, HOUR(fecha_hora) AS hora, estado
+        FROM turnos
+        WHERE estado IN ({estados}) AND fecha_hora >= :desde AND fecha_hora < :hasta
+        UNION ALL
+        SELECT horarios_medicos_id, DAYOFWEEK(fecha_hora) - 1 AS dia, HOUR(fecha_hora) AS hora, estado
+        FROM turnos_historico
+        WHERE estado IN ({estados}) AND fecha_hora >= :desde AND fecha_hora < :hasta
+    ) t
+    LEFT JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+    GROUP BY hm.medicos_id, hm.consultorios_id, t.dia, t.hora, t.estado
+"""
+
+
+# --- Datos de entrada como arreglos -------------------------------------------
+
+def slots_semanales(horarios: List[HorarioIndexado]) -> Dict[str, np.ndarray]:
+    """
+    Un elemento por slot de la agenda semanal: médico, consultorio, día y hora.
+
+    Expande todos los bloques a la vez (sin recorrer slot por slot), con la
+    misma regla que `disponibilidad.minutos_de_slots`: sin `duracion_slot`
+    el bloque es un único slot en `hora_inicio`.
+    """
+    if not horarios:
+        vacio = np.zeros(0, dtype=np.int64)
+        return {"medico": vacio, "consultorio": vacio, "dia": vacio, "hora": vacio}
+    inicio = np.array([h.inicio_min for h in horarios], dtype=np.int64)
+    fin = np.array([h.fin_min for h in horarios], dtype=np.int64)
+    paso = np.array([h.duracion_slot or 0 for h in horarios], dtype=np.int64)
+    con_paso = paso > 0
+    cantidad = np.where(
+        con_paso,
+        np.maximum(0, (fin - np.where(con_paso, paso, 0) - inicio) // np.where(con_paso, paso, 1) + 1),
+        1,
+    )
+    bloque = np.repeat(np.arange(len(horarios)), cantidad)
+    # Posición de cada slot dentro de su bloque: 0, 1, 2, ... reiniciando en cada bloque
+    posicion = np.arange(len(bloque)) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+    minuto = inicio[bloque] + posicion * paso[bloque]
+    return {
+        "medico": np.array([h.medicos_id for h in horarios], dtype=np.int64)[bloque],
+        "consultorio": np.array([h.consultorios_id for h in horarios], dtype=np.int64)[bloque],
+        "dia": np.array([h.dia_semana for h in horarios], dtype=np.int64)[bloque],
+        "hora": minuto // 60,
+    }
+
+
+def turnos_a_arreglos(rows) -> Dict[str, np.ndarray]:
+    """Filas agrupadas de `_QUERY_TURNOS` -> columnas numpy."""
+    indice_estado = {e: i for i, e in enumerate(ESTADOS)}
+    datos = np.array(
+        [
+            (r["medicos_id"], r["consultorios_id"], r["dia"], r["hora"], indice_estado[r["estado"]], r["cantidad"])
+            for r in rows
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 6)
+    return dict(zip(("medico", "consultorio", "dia", "hora", "estado", "cantidad"), datos.T))
+
+
+def ocurrencias_por_dia(desde: date, hasta: date) -> np.ndarray:
+    """Cuántas veces cae cada día de la semana en [desde, hasta]."""
+    primero = (desde.weekday() + 1) % 7
+    dias = (hasta - desde).days + 1
+    return np.bincount((np.arange(dias) + primero) % 7, minlength=7)
+
+
+# --- Cálculo -----------------------------------------------------------------
+
+def _acumular(indices: Tuple[np.ndarray, ...], forma: Tuple[int, ...], pesos: Optional[np.ndarray] = None) -> np.ndarray:
+    """Histograma multidimensional: suma `pesos` en la celda de cada elemento."""
+    plano = np.ravel_multi_index(indices, forma)
+    return np.bincount(plano, weights=pesos, minlength=int(np.prod(forma))).reshape(forma)
+
+
+def _indices(ids: np.ndarray, valores: np.ndarray) -> np.ndarray:
+    # `ids` está ordenado y contiene todos los valores: búsqueda binaria vectorizada
+    return np.searchsorted(ids, valores)
+
+
+def calcular_matrices(
+    slots: Dict[str, np.ndarray],
+    turnos: Dict[str, np.ndarray],
+    ocurrencias: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Matrices de capacidad y uso a partir de la agenda semanal y los turnos.
+
+    - capacidad/ocupados por médico x día x hora y por consultorio x día.
+    - reservas/cancelados por día x hora (demanda, todos los estados).
+
+    La capacidad es slots semanales por la cantidad de veces que cae cada día
+    en el rango. "Ocupados" son los turnos no cancelados.
+
+    La agenda es la vigente, no la que regía en cada fecha del rango: si un
+    médico tuvo más horarios en el pasado, en rangos viejos sus ocupados
+    pueden superar la capacidad (ocupación > 1).
+    """
+    medicos = np.union1d(slots["medico"], turnos["medico"])
+    consultorios = np.union1d(slots["consultorio"], turnos["consultorio"])
+    m_slot, m_turno = _indices(medicos, slots["medico"]), _indices(medicos, turnos["medico"])
+    c_slot, c_turno = _indices(consultorios, slots["consultorio"]), _indices(consultorios, turnos["consultorio"])
+
+    cantidad = turnos["cantidad"].astype(np.float64)
+    activos = np.where(turnos["estado"] != _CANCELADO, cantidad, 0.0)
+    cancelados = cantidad - activos
+
+    forma_medico = (len(medicos), 7, HORAS)
+    forma_consultorio = (len(consultorios), 7)
+    capacidad_medico = _acumular((m_slot, slots["dia"], slots["hora"]), forma_medico) * ocurrencias[None, :, None]
+    capacidad_consultorio = _acumular((c_slot, slots["dia"]), forma_consultorio) * ocurrencias[None, :]
+    return {
+        "medicos": medicos,
+        "consultorios": consultorios,
+        "capacidad_medico": capacidad_medico,
+        "ocupados_medico": _acumular((m_turno, turnos["dia"], turnos["hora"]), forma_medico, activos),
+        "capacidad_consultorio": capacidad_consultorio,
+        "ocupados_consultorio": _acumular((c_turno, turnos["dia"]), forma_consultorio, activos),
+        "reservas": _acumular((turnos["dia"], turnos["hora"]), (7, HORAS), cantidad),
+        "cancelados": _acumular((turnos["dia"], turnos["hora"]), (7, HORAS), cancelados),
+    }
+
+
+def _cociente(numerador: np.ndarray, denominador: np.ndarray) -> np.ndarray:
+    """División elemento a elemento; NaN donde el denominador es 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominador > 0, numerador / np.where(denominador > 0, denominador, 1), np.nan)
+
+
+def _lista(arreglo: np.ndarray, decimales: int = 4) -> list:
+    """A listas anidadas para JSON, con None en lugar de NaN."""
+    salida = np.round(arreglo, decimales).astype(object)
+    salida[np.isnan(arreglo)] = None
+    return salida.tolist()
+
+
+def _enteros(arreglo: np.ndarray) -> list:
+    return arreglo.astype(np.int64).tolist()
+
+
+def _rango_horas(*matrices: np.ndarray) -> slice:
+    """Horas con algo de capacidad o demanda: se recortan las columnas vacías."""
+    uso = sum(m.reshape(-1, HORAS).sum(axis=0) for m in matrices)
+    con_datos = np.flatnonzero(uso)
+    if not len(con_datos):
+        return slice(0, 0)
+    return slice(int(con_datos[0]), int(con_datos[-1]) + 1)
+
+
+# --- Cache --------------------------------------------------------------------
+
+class CacheTTL:
+    """
+    Resultados por clave durante `ttl_segundos`. Guarda la tarea del cálculo:
+    los pedidos que llegan mientras se calcula esperan esa misma tarea en
+    lugar de lanzar otra carga. Todos (incluido el primero) la esperan con
+    `asyncio.shield`, así que si un cliente se desconecta no se cancela el
+    cálculo de los demás. Si el cálculo falla, la entrada se descarta.
+    """
+
+    def __init__(self, ttl_segundos: int = ANALITICA_CACHE_SEGUNDOS, max_entradas: int = 64):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: Dict[Hashable, Tuple[float, asyncio.Task]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def obtener(self, clave: Hashable, calcular: Callable[[], Awaitable[Any]]) -> Any:
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            self.hits += 1
+            return await asyncio.shield(entrada[1])
+
+        self.misses += 1
+        ahora = time.monotonic()
+        for vieja in [c for c, (vence, tarea) in self._entradas.items() if vence <= ahora and tarea.done()]:
+            del self._entradas[vieja]
+        if len(self._entradas) >= self.max_entradas:
+            self._entradas.clear()
+        tarea = asyncio.ensure_future(calcular())
+        self._entradas[clave] = (ahora + self.ttl_segundos, tarea)
+        tarea.add_done_callback(lambda t: self._descartar_fallida(clave, t))
+        return await asyncio.shield(tarea)
+
+    def _descartar_fallida(self, clave: Hashable, tarea: asyncio.Task) -> None:
+        if tarea.cancelled() or tarea.exception() is not None:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] is tarea:
+                del self._entradas[clave]
+
+    def metricas(self) -> dict:
+        return {"ttl_segundos": self.ttl_segundos, "entradas": len(self._entradas), "hits": self.hits, "misses": self.misses}
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+
+cache_analitica = CacheTTL()
+
+
+# --- Carga y respuestas -------------------------------------------------------
+
+async def _cargar(desde: date, hasta: date) -> dict:
+    """Agenda (del índice en memoria) + turnos agrupados (una consulta) -> matrices."""
+    await motor.asegurar_cargado()
+    horarios = [h for dia in range(7) for h in motor.horarios_del_dia(dia)]
+
+    marcadores = ", ".join(f":estado_{i}" for i in range(len(ESTADOS)))
+    values = {f"estado_{i}": e for i, e in enumerate(ESTADOS)}
+    values.update(desde=datetime.combine(desde, datetime.min.time()),
+                  hasta=datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+    rows = await db.fetch_all(query=_QUERY_TURNOS.format(estados=marcadores), values=values)
+    con_horario = [r for r in rows if r["medicos_id"] is not None]
+    sin_horario = [r for r in rows if r["medicos_id"] is None]
+
+    matrices = calcular_matrices(slots_semanales(horarios), turnos_a_arreglos(con_horario), ocurrencias_por_dia(desde, hasta))
+    if sin_horario:
+        # Sin médico ni consultorio: solo suman a la demanda por día x hora
+        huerfanos = turnos_a_arreglos({**r, "medicos_id": 0, "consultorios_id": 0} for r in sin_horario)
+        cantidad = huerfanos["cantidad"].astype(np.float64)
+        cancelados = np.where(huerfanos["estado"] == _CANCELADO, cantidad, 0.0)
+        matrices["reservas"] += _acumular((huerfanos["dia"], huerfanos["hora"]), (7, HORAS), cantidad)
+        matrices["cancelados"] += _acumular((huerfanos["dia"], huerfanos["hora"]), (7, HORAS), cancelados)
+    datos = {
+        "desde": desde,
+        "hasta": hasta,
+        "generado_en": datetime.now(),
+        "matrices": matrices,
+        "medicos": {h.medicos_id: h for h in horarios},
+        "consultorios": {h.consultorios_id: h.consultorio_numero for h in horarios},
+        "turnos_sin_horario": int(sum(r["cantidad"] for r in sin_horario)),
+    }
+    # Se arman las dos respuestas juntas: ambas salen de la misma carga
+    return {"ocupacion": _ocupacion(datos), "demanda": _demanda(datos)}
+
+
+async def _analisis(desde: date, hasta: date) -> dict:
+    return await cache_analitica.obtener((desde, hasta), lambda: _cargar(desde, hasta))
+
+
+def _ocupacion(datos: dict) -> dict:
+    m = datos["matrices"]
+    cap_m, ocu_m = m["capacidad_medico"], m["ocupados_medico"]
+    cap_c, ocu_c = m["capacidad_consultorio"], m["ocupados_consultorio"]
+    horas = _rango_horas(cap_m, ocu_m)
+
+    cap_m_dia, ocu_m_dia = cap_m.sum(axis=2), ocu_m.sum(axis=2)
+    cap_m_total, ocu_m_total = cap_m_dia.sum(axis=1), ocu_m_dia.sum(axis=1)
+    cap_c_total, ocu_c_total = cap_c.sum(axis=1), ocu_c.sum(axis=1)
+    matriz_m = _lista(_cociente(ocu_m, cap_m)[:, :, horas])
+    por_dia_m = _lista(_cociente(ocu_m_dia, cap_m_dia))
+    total_m = _lista(_cociente(ocu_m_total, cap_m_total))
+    por_dia_c = _lista(_cociente(ocu_c, cap_c))
+    total_c = _lista(_cociente(ocu_c_total, cap_c_total))
+
+    medicos = []
+    for i, medico_id in enumerate(m["medicos"].tolist()):
+        horario = datos["medicos"].get(medico_id)
+        medicos.append({
+            "medico_id": medico_id,
+            "nombre": horario.profesional_nombre_completo if horario else None,
+            "especialidad": horario.especialidad if horario else None,
+            "capacidad": int(cap_m_total[i]),
+            "ocupados": int(ocu_m_total[i]),
+            "ocupacion": total_m[i],
+            "por_dia": por_dia_m[i],
+            "matriz": matriz_m[i],
+        })
+    consultorios = [
+        {
+            "consultorio_id": consultorio_id,
+            "numero": datos["consultorios"].get(consultorio_id),
+            "capacidad": int(cap_c_total[i]),
+            "ocupados": int(ocu_c_total[i]),
+            "ocupacion": total_c[i],
+            "por_dia": por_dia_c[i],
+        }
+        for i, consultorio_id in enumerate(m["consultorios"].tolist())
+    ]
+    capacidad, ocupados = cap_m_total.sum(), ocu_m_total.sum()
+    return {
+        "desde": datos["desde"],
+        "hasta": datos["hasta"],
+        "generado_en": datos["generado_en"],
+        "dias": list(DIAS),
+        "horas": list(range(HORAS))[horas],
+        # La capacidad sale de los horarios vigentes (ver calcular_matrices)
+        "capacidad_base": "horarios_vigentes",
+        "turnos_sin_horario": datos["turnos_sin_horario"],
+        "totales": {
+            "capacidad": int(capacidad),
+            "ocupados": int(ocupados),
+            "ocupacion": round(float(ocupados / capacidad), 4) if capacidad else None,
+        },
+        "medicos": medicos,
+        "consultorios": consultorios,
+    }
+
+
+def _especialidad(datos: dict, medico_id: int) -> str:
+    horario = datos["medicos"].get(medico_id)
+    return (horario.especialidad if horario else None) or "Sin especialidad"
+
+
+def _demanda(datos: dict, top: int = 5) -> dict:
+    m = datos["matrices"]
+    reservas, cancelados = m["reservas"], m["cancelados"]
+    horas = _rango_horas(reservas)
+
+    # Agregado por especialidad: grupo de cada médico y suma por grupos
+    etiquetas = [_especialidad(datos, medico_id) for medico_id in m["medicos"].tolist()]
+    nombres, grupo = np.unique(np.array(etiquetas, dtype=str), return_inverse=True)
+    cap_medico = m["capacidad_medico"].sum(axis=(1, 2))
+    ocu_medico = m["ocupados_medico"].sum(axis=(1, 2))
+    cap_esp = np.bincount(grupo, weights=cap_medico, minlength=len(nombres))
+    ocu_esp = np.bincount(grupo, weights=ocu_medico, minlength=len(nombres))
+    ocupacion_esp = _lista(_cociente(ocu_esp, cap_esp))
+    especialidades = sorted(
+        (
+            {"especialidad": nombre, "capacidad": int(cap_esp[i]), "ocupados": int(ocu_esp[i]), "ocupacion": ocupacion_esp[i]}
+            for i, nombre in enumerate(nombres.tolist())
+            if cap_esp[i] or ocu_esp[i]
+        ),
+        key=lambda e: -e["ocupados"],
+    )
+
+    # Franjas con más reservas, sin ordenar toda la matriz
+    plano = reservas.ravel()
+    cantidad = min(top, int(np.count_nonzero(plano)))
+    mejores = np.argpartition(-plano, cantidad - 1)[:cantidad] if cantidad else np.zeros(0, dtype=np.int64)
+    mejores = mejores[np.argsort(-plano[mejores], kind="stable")]
+    horas_pico = [
+        {"dia": DIAS[int(i) // HORAS], "hora": int(i) % HORAS, "reservas": int(plano[i])} for i in mejores
+    ]
+    return {
+        "desde": datos["desde"],
+        "hasta": datos["hasta"],
+        "generado_en": datos["generado_en"],
+        "dias": list(DIAS),
+        "horas": list(range(HORAS))[horas],
+        "reservas": _enteros(reservas[:, horas]),
+        "cancelados": _enteros(cancelados[:, horas]),
+        "tasa_cancelacion": _lista(_cociente(cancelados, reservas)[:, horas]),
+        "especialidades": especialidades,
+        "horas_pico": horas_pico,
+        # Incluidos en reservas/cancelados, no en las especialidades
+        "turnos_sin_horario": datos["turnos_sin_horario"],
+    }
+
+
+async def get_ocupacion(desde: date, hasta: date) -> dict:
+    """
+    Ocupación por médico x día x hora y por consultorio x día. La capacidad
+    se calcula con los horarios vigentes, así que en rangos pasados puede
+    quedar por debajo de los ocupados.
+    """
+    return (await _analisis(desde, hasta))["ocupacion"]
+
+
+async def get_demanda(desde: date, hasta: date) -> dict:
+    """Demanda por día x hora, cancelaciones, ocupación por especialidad y horas pico."""
+    return (await _analisis(desde, hasta))["demanda"]
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from config.databases import db
+
+ARCHIVO_TURNOS_ACTIVO = os.getenv("ARCHIVO_TURNOS_ACTIVO", "0") == "1"
+ARCHIVO_TURNOS_INTERVALO_SEGUNDOS = int(os.getenv("ARCHIVO_TURNOS_INTERVALO_SEGUNDOS", "3600"))
+# Antigüedad mínima (desde fecha_hora) para mover un turno finalizado al archivo
+ARCHIVO_TURNOS_DIAS = int(os.getenv("ARCHIVO_TURNOS_DIAS", "365"))
+ARCHIVO_TURNOS_LOTE = int(os.getenv("ARCHIVO_TURNOS_LOTE", "1000"))
+# Pausa entre lotes: deja pasar a las escrituras de la API entre transacciones
+ARCHIVO_TURNOS_PAUSA_MS = int(os.getenv("ARCHIVO_TURNOS_PAUSA_MS", "50"))
+
+# Columnas reales de turnos (sin la generada slot_activo de sql/003)
+_COLUMNAS = "id, fecha_hora, estado, motivo, fecha_creacion, clientes_id, horarios_medicos_id"
+
+
+class ArchivoTurnos:
+    """
+    Mueve turnos completados/cancelados viejos de `turnos` a `turnos_historico`.
+
+    Trabaja por lotes de `lote` ids (del más viejo al más nuevo, por el índice
+    (estado, fecha_hora)); cada lote es una transacción corta INSERT ... SELECT
+    + DELETE, así nunca se mantienen locks sobre muchas filas a la vez.
+    """
+
+    def __init__(
+        self,
+        dias: int = ARCHIVO_TURNOS_DIAS,
+        lote: int = ARCHIVO_TURNOS_LOTE,
+        pausa_ms: int = ARCHIVO_TURNOS_PAUSA_MS,
+        intervalo_segundos: int = ARCHIVO_TURNOS_INTERVALO_SEGUNDOS,
+    ):
+        self.dias = dias
+        self.lote = lote
+        self.pausa_ms = pausa_ms
+        self.intervalo_segundos = intervalo_segundos
+        self._tarea: Optional[asyncio.Task] = None
+        # Métricas
+        self.ejecuciones = 0
+        self.filas_total = 0
+        self.ultima_filas = 0
+        self.ultima_duracion_ms = 0.0
+        self.ultima_ejecucion: Optional[datetime] = None
+        self.ultimo_error: Optional[str] = None
+
+    async def _ids_candidatos(self, corte: datetime) -> List[int]:
+        rows = await db.fetch_all(
+            query=f"""
+                SELECT id FROM turnos
+                WHERE estado IN ('completado', 'cancelado') AND fecha_hora < :corte
+                ORDER BY fecha_hora, id
+                LIMIT {int(self.lote)}
+            """,
+            values={"corte": corte},
+        )
+        return [row["id"] for row in rows]
+
+    async def _mover(self, ids: List[int]) -> int:
+        marcadores = ", ".join(f":id_{i}" for i in range(len(ids)))
+        values = {f"id_{i}": v for i, v in enumerate(ids)}
+        async with db.transaction():
+            # INSERT IGNORE: si un lote anterior se cortó después del INSERT, no falla por PK duplicada.
+            # Se vuelve a exigir el estado final por si algo cambió entre el SELECT y la transacción
+            await db.execute(
+                query=f"""
+                    INSERT IGNORE INTO turnos_historico ({_COLUMNAS})
+                    SELECT {_COLUMNAS} FROM turnos
+                    WHERE id IN ({marcadores}) AND estado IN ('completado', 'cancelado')
+                """,
+                values=values,
+            )
+            # Solo se borran los que quedaron en el archivo: una fila que el INSERT IGNORE
+            # descartó sigue en turnos en lugar de perderse
+            return await db.execute(
+                query=f"""
+                    DELETE t FROM turnos t
+                    JOIN turnos_historico h ON h.id = t.id
+                    WHERE t.id IN ({marcadores}) AND t.estado IN ('completado', 'cancelado')
+                """,
+                values=values,
+            ) or 0
+
+    async def lotes(self, max_lotes: Optional[int] = None) -> AsyncIterator[int]:
+        """Archiva lote por lote y va informando cuántas filas movió cada uno."""
+        corte = datetime.now() - timedelta(days=self.dias)
+        hechos = 0
+        while max_lotes is None or hechos < max_lotes:
+            ids = await self._ids_candidatos(corte)
+            if not ids:
+                return
+            yield await self._mover(ids)
+            hechos += 1
+            if len(ids) < self.lote:
+                return
+            await asyncio.sleep(self.pausa_ms / 1000)
+
+    async def ejecutar(self, max_lotes: Optional[int] = None) -> int:
+        inicio = time.perf_counter()
+        filas = 0
+        try:
+            async for movidas in self.lotes(max_lotes):
+                filas += movidas
+            self.ultimo_error = None
+        except Exception as e:
+            print(f"[archivo_turnos] Error: {e}")
+            self.ultimo_error = str(e)
+        self.ejecuciones += 1
+        self.ultima_filas = filas
+        self.filas_total += filas
+        self.ultima_duracion_ms = (time.perf_counter() - inicio) * 1000
+        self.ultima_ejecucion = datetime.now()
+        return filas
+
+    # --- Ejecución periódica (opcional, ARCHIVO_TURNOS_ACTIVO=1) --------
+
+    def iniciar(self) -> None:
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle(), name="archivo_turnos")
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def _bucle(self) -> None:
+        while True:
+            await self.ejecutar()
+            await asyncio.sleep(self.intervalo_segundos)
+
+    def metricas(self) -> dict:
+        return {
+            "activo": self._tarea is not None and not self._tarea.done(),
+            "dias": self.dias,
+            "lote": self.lote,
+            "ejecuciones": self.ejecuciones,
+            "filas_total": self.filas_total,
+            "ultima_filas": self.ultima_filas,
+            "ultima_duracion_ms": self.ultima_duracion_ms,
+            "ultima_ejecucion": self.ultima_ejecucion,
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+archivo_turnos = ArchivoTurnos()
@@ -1,14 +1,36 @@
-from fastapi import HTTPException
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from config.databases import db
-from typing import Literal
+from typing import Annotated, Literal, Optional, Set, Tuple
+from schemas.auth import TokenData
+from services.workers import PoolAcotado
+import services.sesiones as sesiones
 
 # --- Configuración de Seguridad (sin cambios) ---
 SECRET_KEY = "tu_clave_secreta_muy_segura_¡cambiala!"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15 
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# --- Configuración de bcrypt ---
+# Costo (log2 de iteraciones) para hashes nuevos. 12 es el default de bcrypt.gensalt().
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt libera el GIL, así que alcanza con hilos; uno por núcleo como máximo.
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Trabajos que pueden esperar un hilo libre antes de responder 503.
+BCRYPT_MAX_COLA = int(os.getenv("BCRYPT_MAX_COLA", "32"))
+
+# Tokens decodificados que se guardan en memoria (0 = sin cache).
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "10000"))
+
+pool_hashing = PoolAcotado("bcrypt", max_workers=BCRYPT_WORKERS, max_cola=BCRYPT_MAX_COLA)
 
 # --- Funciones de Hashing (MODIFICADAS) ---
 
@@ -35,8 +57,8 @@ def get_password_hash(password: str) -> str:
     # bcrypt requiere que la contraseña esté en bytes
     password_bytes = password.encode('utf-8')
     
-    # Generamos un "salt" (factor aleatorio)
-    salt = bcrypt.gensalt()
+    # Generamos un "salt" (factor aleatorio) con el costo configurado
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     
     # Hasheamos la contraseña
     hashed_bytes = bcrypt.hashpw(password_bytes, salt)
@@ -44,6 +66,30 @@ def get_password_hash(password: str) -> str:
     # Devolvemos el hash como un string (decodificado) para guardarlo en la BD
     return hashed_bytes.decode('utf-8')
 
+
+def get_hash_cost(hashed_password: str) -> Optional[int]:
+    """Extrae el costo de un hash bcrypt ('$2b$12$...' -> 12)."""
+    partes = hashed_password.split("$")
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash fue generado con un costo distinto a BCRYPT_ROUNDS."""
+    costo = get_hash_cost(hashed_password)
+    return costo is not None and costo != BCRYPT_ROUNDS
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Igual que `verify_password`, pero en el pool de bcrypt para no bloquear el event loop."""
+    return await pool_hashing.ejecutar(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Igual que `get_password_hash`, pero en el pool de bcrypt para no bloquear el event loop."""
+    return await pool_hashing.ejecutar(get_password_hash, password)
+
 # --- FIN DE MODIFICACIONES DE HASHING ---
 
 
@@ -55,7 +101,167 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# --- Lógica de Autenticación (sin cambios) ---
+# --- Verificación de tokens ---
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token/paciente")
+
+
+class CacheTokens:
+    """
+    LRU acotado de tokens ya verificados -> claims. Cada entrada vale hasta el
+    `exp` del propio token, así que nunca se acepta un token vencido.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[TokenData]:
+        item = self._items.get(token)
+        if item is None:
+            self.misses += 1
+            return None
+        datos, exp = item
+        if exp <= time.time():
+            del self._items[token]
+            self.misses += 1
+            return None
+        self._items.move_to_end(token)
+        self.hits += 1
+        return datos
+
+    def put(self, token: str, datos: TokenData, exp: float) -> None:
+        if self.max_items <= 0:
+            return
+        self._items[token] = (datos, exp)
+        self._items.move_to_end(token)
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def invalidar(self, token: str) -> None:
+        self._items.pop(token, None)
+
+    def limpiar(self) -> None:
+        self._items.clear()
+        self.hits = self.misses = 0
+
+
+cache_tokens = CacheTokens(JWT_CACHE_MAX)
+
+_credenciales_invalidas = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="No se pudieron validar las credenciales",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_access_token(token: str) -> TokenData:
+    """Valida firma y expiración del token; usa el cache si ya fue verificado."""
+    datos = cache_tokens.get(token)
+    if datos is not None:
+        return datos
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _credenciales_invalidas
+    rol = payload.get("rol")
+    if payload.get("sub") is None or payload.get("id") is None or rol not in ("cliente", "medico"):
+        raise _credenciales_invalidas
+    datos = TokenData(username=payload["sub"], id=payload["id"], rol=rol, nombre=payload.get("nombre"))
+    cache_tokens.put(token, datos, float(payload["exp"]))
+    return datos
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    """Dependencia: usuario autenticado a partir del header Authorization: Bearer."""
+    return decode_access_token(token)
+
+
+def require_rol(*roles: Literal['cliente', 'medico']):
+    """Dependencia que además exige que el token tenga uno de los roles indicados."""
+    async def _verificar(usuario: Annotated[TokenData, Depends(get_current_user)]) -> TokenData:
+        if usuario.rol not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos para esta operación")
+        return usuario
+    return _verificar
+
+
+# --- Refresh tokens ---
+
+async def _emitir_tokens(sesion: sesiones.Sesion) -> dict:
+    """Crea un access token y un refresh token nuevo para la sesión."""
+    access_token = create_access_token(data={
+        "sub": sesion.email,
+        "id": sesion.user_id,
+        "rol": sesion.rol,
+        "nombre": sesion.nombre,
+    })
+    refresh_token = sesiones.nuevo_token()
+    await sesiones.store.guardar(sesiones.hash_token(refresh_token), sesion)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+async def refresh_session(refresh_token: str) -> dict:
+    """
+    Renueva la sesión con rotación: el refresh token usado se invalida y se
+    entrega uno nuevo. Cuesta una búsqueda por hash, sin verificar contraseña.
+
+    Si llega un token que ya fue rotado, alguien más tiene una copia (el
+    usuario o quien se lo robó): se revoca toda la familia y ambos tienen
+    que volver a iniciar sesión.
+    """
+    token_hash = sesiones.hash_token(refresh_token)
+    sesion = await sesiones.store.consumir(token_hash)
+    if sesion is None:
+        familia = await sesiones.store.familia_consumida(token_hash)
+        if familia is not None:
+            print(f"Reuso de refresh token detectado: se revoca la sesión {familia}")
+            await sesiones.store.revocar_familia(familia)
+    if sesion is None or sesion.expira <= time.time():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o vencido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _emitir_tokens(sesion)
+
+
+async def revoke_session(refresh_token: str) -> None:
+    """Cierra la sesión del refresh token (logout)."""
+    sesion = await sesiones.store.consumir(sesiones.hash_token(refresh_token))
+    if sesion is not None:
+        await sesiones.store.revocar_familia(sesion.familia)
+
+
+# --- Lógica de Autenticación ---
+
+# Referencias a las tareas de rehash en curso (si no, el GC puede cortarlas)
+_tareas_rehash: Set[asyncio.Task] = set()
+
+
+async def _rehash_password(user_id: int, user_type: Literal['cliente', 'medico'], password: str, hash_anterior: str):
+    """
+    Regenera el hash con el costo actual y lo guarda. Solo actualiza si el hash
+    en la BD sigue siendo el que verificamos (no pisa un cambio de contraseña).
+    """
+    table_name = "clientes" if user_type == 'cliente' else "medicos"
+    try:
+        nuevo_hash = await get_password_hash_async(password)
+        query = f"UPDATE {table_name} SET contraseña = :nuevo WHERE id = :id AND contraseña = :anterior"
+        await db.execute(query=query, values={"nuevo": nuevo_hash, "id": user_id, "anterior": hash_anterior})
+        print(f"Rehash de contraseña: {user_type} {user_id} -> costo {BCRYPT_ROUNDS}")
+    except Exception as e:
+        # Es una optimización: si falla, se reintenta en el próximo login
+        print(f"No se pudo rehashear la contraseña de {user_type} {user_id}: {e}")
+
+
+def _programar_rehash(user_id: int, user_type: Literal['cliente', 'medico'], password: str, hash_anterior: str):
+    tarea = asyncio.create_task(_rehash_password(user_id, user_type, password, hash_anterior))
+    _tareas_rehash.add(tarea)
+    tarea.add_done_callback(_tareas_rehash.discard)
+
 
 async def get_user(email: str, user_type: Literal['cliente', 'medico']):
     """Busca un usuario (cliente o medico) por su email."""
@@ -66,8 +272,8 @@ async def get_user(email: str, user_type: Literal['cliente', 'medico']):
 
 async def authenticate_user(email: str, password: str, user_type: Literal['cliente', 'medico']):
     """
-    Autentica a un usuario. Si es exitoso, devuelve un token de acceso
-    que ahora incluye el nombre del usuario.
+    Autentica a un usuario. Si es exitoso, devuelve el access token (que
+    incluye el nombre del usuario) y un refresh token para renovarlo.
     """
     user = await get_user(email, user_type)
     if not user:
@@ -77,16 +283,22 @@ async def authenticate_user(email: str, password: str, user_type: Literal['clien
     user_dict = dict(user)
 
     # Verificamos la contraseña (AHORA USA LA NUEVA FUNCIÓN)
-    if not verify_password(password, user_dict["contraseña"]):
+    if not await verify_password_async(password, user_dict["contraseña"]):
         print(f"Auth attempt failed: Invalid password for email {email}")
         return False 
 
-    access_token_payload = {
-        "sub": user_dict["email"],
-        "id": user_dict["id"],
-        "rol": user_type,
-        "nombre": user_dict.get("nombre", "") 
-    }
-    access_token = create_access_token(data=access_token_payload)
+    # Migración transparente de costo: se hace en segundo plano para no demorar el login
+    if needs_rehash(user_dict["contraseña"]):
+        _programar_rehash(user_dict["id"], user_type, password, user_dict["contraseña"])
+
+    sesion = sesiones.Sesion(
+        familia=sesiones.nueva_familia(),
+        user_id=user_dict["id"],
+        rol=user_type,
+        email=user_dict["email"],
+        nombre=user_dict.get("nombre", ""),
+        expira=time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+    )
+    tokens = await _emitir_tokens(sesion)
     print(f"Auth successful for email {email}. Token created.")
-    return access_token
\ No newline at end of file
+    return tokens
\ No newline at end of file
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# Cuerpos JSON ya serializados que se guardan (uno por URL)
+CACHE_HTTP_MAX = int(os.getenv("CACHE_HTTP_MAX", "256"))
+
+# Recursos con versión. Cada servicio que los modifica llama a `versiones.incrementar`.
+CONSULTORIOS = "consultorios"
+HORARIOS = "horarios"
+# Índice de disponibilidad (services.disponibilidad) y retenciones de slots
+DISPONIBILIDAD = "disponibilidad"
+
+
+class Versiones:
+    """
+    Un contador por recurso y la hora del último cambio. El ETag de una
+    respuesta sale de los contadores de los recursos que usa, así que se
+    calcula sin consultar la BD. Incluye el arranque del proceso: después de
+    un reinicio ningún ETag viejo coincide.
+
+    Los contadores son del proceso. Los cambios hechos por otro worker (o
+    directo en la BD) los mueven las recargas periódicas de
+    `services.referencias` y del índice de disponibilidad, que comparan lo
+    leído con lo que tenían: por eso los endpoints llaman a su
+    `asegurar_cargado()` antes de `responder`. Hasta esa recarga (como mucho
+    REFERENCIAS_REFRESCO_SEGUNDOS) otro worker puede seguir respondiendo 304.
+    """
+
+    def __init__(self):
+        self._inicio = datetime.now(timezone.utc).replace(microsecond=0)
+        self._prefijo = f"{int(time.time()):x}"
+        self._contadores: Dict[str, int] = {}
+        self._modificado: Dict[str, datetime] = {}
+
+    def incrementar(self, *recursos: str) -> None:
+        ahora = datetime.now(timezone.utc).replace(microsecond=0)
+        for recurso in recursos:
+            self._contadores[recurso] = self._contadores.get(recurso, 0) + 1
+            self._modificado[recurso] = ahora
+
+    def version(self, recurso: str) -> int:
+        return self._contadores.get(recurso, 0)
+
+    def modificado(self, recursos: Sequence[str]) -> datetime:
+        return max((self._modificado.get(r, self._inicio) for r in recursos), default=self._inicio)
+
+    def etag(self, recursos: Sequence[str], variable: str = "") -> str:
+        partes = ".".join(str(self.version(r)) for r in recursos)
+        return f'"{self._prefijo}-{partes}{"-" + variable if variable else ""}"'
+
+    def metricas(self) -> dict:
+        return dict(self._contadores)
+
+
+versiones = Versiones()
+
+
+class CacheEtag:
+    """
+    Respuestas ya generadas, LRU por cantidad. Cada clave guarda un solo
+    valor con su ETag: si los datos cambiaron (otro ETag) se vuelve a generar
+    y se reemplaza, así que la memoria queda acotada a una entrada por clave.
+    Se guarda el future de la generación: los pedidos que llegan mientras se
+    genera esperan ese mismo resultado. Si falla, la entrada se descarta.
+    """
+
+    def __init__(self, max_entradas: int, tamano: Callable[[Any], int] = len):
+        self.max_entradas = max_entradas
+        self.tamano = tamano
+        self._entradas: "OrderedDict[Hashable, Tuple[str, asyncio.Future]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def obtener(self, clave: Hashable, etag: str, generar: Callable[[], Awaitable[Any]]) -> Any:
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] == etag:
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return await asyncio.shield(entrada[1])
+        self.misses += 1
+        if self.max_entradas <= 0:
+            return await generar()
+        future = asyncio.get_running_loop().create_future()
+        self._entradas[clave] = (etag, future)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+        try:
+            valor = await generar()
+        except BaseException as e:
+            if self._entradas.get(clave, (None, None))[1] is future:
+                del self._entradas[clave]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        future.set_result(valor)
+        return valor
+
+    def metricas(self) -> dict:
+        listos = [f.result() for _, f in self._entradas.values() if f.done() and not f.cancelled() and f.exception() is None]
+        return {
+            "entradas": len(self._entradas),
+            "bytes": sum(self.tamano(v) for v in listos),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+
+# Valores: (cuerpo JSON, headers propios de la respuesta, p. ej. X-Next-Cursor)
+cache_respuestas = CacheEtag(CACHE_HTTP_MAX, tamano=lambda valor: len(valor[0]))
+
+
+def serializar(adaptador: TypeAdapter, datos: Any) -> bytes:
+    """Valida contra el modelo (como `response_model`) y serializa a JSON."""
+    return adaptador.dump_json(adaptador.validate_python(datos))
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+
+
+def _no_modificado_desde(if_modified_since: Optional[str], modificado: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        fecha = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return fecha.tzinfo is not None and modificado <= fecha
+
+
+def _clave(request: Request) -> str:
+    # Mismos parámetros en otro orden -> misma entrada
+    return request.url.path + "?" + "&".join(sorted(request.url.query.split("&")))
+
+
+async def responder(
+    request: Request,
+    recursos: Sequence[str],
+    generar: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+    variable: str = "",
+) -> Response:
+    """
+    GET condicional sobre `recursos`: con If-None-Match (o If-Modified-Since)
+    al día responde 304 sin llamar a `generar`; si no, devuelve el cuerpo
+    guardado para esta URL y versión, o lo genera una vez.
+
+    `variable` entra en el ETag para respuestas que además cambian con el
+    tiempo (p. ej. el minuto actual); esas no llevan Last-Modified.
+    """
+    etag = versiones.etag(recursos, variable)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    modificado = None if variable else versiones.modificado(recursos)
+    if modificado is not None:
+        headers["Last-Modified"] = format_datetime(modificado, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        no_modificado = coincide_etag(if_none_match, etag)
+    else:
+        # If-Modified-Since solo cuenta si el cliente no mandó un ETag
+        no_modificado = modificado is not None and _no_modificado_desde(request.headers.get("if-modified-since"), modificado)
+    if no_modificado:
+        return Response(status_code=304, headers=headers)
+
+    cuerpo, propios = await cache_respuestas.obtener(_clave(request), etag, generar)
+    return Response(content=cuerpo, media_type="application/json", headers={**headers, **propios})
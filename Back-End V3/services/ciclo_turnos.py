@@ -0,0 +1,189 @@
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+from config.databases import db
+from services.reportes import refresco_reportes
+import services.eventos as eventos
+
+CICLO_TURNOS_ACTIVO = os.getenv("CICLO_TURNOS_ACTIVO", "1") == "1"
+CICLO_TURNOS_INTERVALO_SEGUNDOS = int(os.getenv("CICLO_TURNOS_INTERVALO_SEGUNDOS", "60"))
+# Filas por UPDATE y máximo de UPDATEs por pasada: acotan cuánto se bloquea la tabla
+CICLO_TURNOS_LOTE = int(os.getenv("CICLO_TURNOS_LOTE", "500"))
+CICLO_TURNOS_MAX_LOTES = int(os.getenv("CICLO_TURNOS_MAX_LOTES", "20"))
+# Un turno se da por terminado recién cuando pasó este margen desde su hora de inicio
+CICLO_TURNOS_GRACIA_MINUTOS = int(os.getenv("CICLO_TURNOS_GRACIA_MINUTOS", "60"))
+
+
+@dataclass
+class Barrido:
+    """Transición automática de turnos vencidos: `origen` -> `destino`."""
+    nombre: str
+    origen: str
+    destino: str
+    # Métricas
+    ejecuciones: int = 0
+    filas_total: int = 0
+    ultima_filas: int = 0
+    ultima_duracion_ms: float = 0.0
+    ultima_ejecucion: Optional[datetime] = None
+    # Antigüedad (s) del turno vencido más viejo que quedó sin barrer tras la última pasada
+    atraso_segundos: float = 0.0
+    ultimo_error: Optional[str] = None
+
+
+def _barridos() -> List[Barrido]:
+    return [
+        # El médico lo confirmó y la hora ya pasó: se atendió
+        Barrido("completar_confirmados", origen="confirmado", destino="completado"),
+        # Nunca se confirmó y la hora ya pasó: no se presentó / quedó sin atender
+        Barrido("cancelar_pendientes", origen="pendiente", destino="cancelado"),
+    ]
+
+
+class CicloTurnos:
+    """
+    Tarea asyncio que pasa los turnos vencidos a su estado final.
+
+    Cada pasada lee de a `lote` turnos vencidos con `WHERE estado = ? AND
+    fecha_hora < ? ORDER BY fecha_hora LIMIT n`, que recorre el índice
+    (estado, fecha_hora) de sql/002 desde el más viejo, y los actualiza por
+    id. Así el conjunto de turnos activos se mantiene chico, cada UPDATE
+    bloquea pocas filas y en el resumen diario se recalculan solo las celdas
+    (médico, día) de los turnos barridos.
+
+    Con varios workers cada uno corre su propio ciclo; los UPDATE son
+    condicionales, así que repetirlos no tiene efecto.
+    """
+
+    def __init__(
+        self,
+        intervalo_segundos: int = CICLO_TURNOS_INTERVALO_SEGUNDOS,
+        lote: int = CICLO_TURNOS_LOTE,
+        max_lotes: int = CICLO_TURNOS_MAX_LOTES,
+        gracia_minutos: int = CICLO_TURNOS_GRACIA_MINUTOS,
+    ):
+        self.intervalo_segundos = intervalo_segundos
+        self.lote = lote
+        self.max_lotes = max_lotes
+        self.gracia = timedelta(minutes=gracia_minutos)
+        self.barridos = _barridos()
+        self._tarea: Optional[asyncio.Task] = None
+        self._proxima: float = 0.0
+        # Cuánto tarde arrancó la última pasada respecto de lo programado (event loop ocupado)
+        self.retraso_inicio_ms: float = 0.0
+
+    # --- Ciclo de vida ---------------------------------------------------
+
+    def iniciar(self) -> None:
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle(), name="ciclo_turnos")
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def _bucle(self) -> None:
+        self._proxima = time.monotonic()
+        while True:
+            self.retraso_inicio_ms = max(0.0, (time.monotonic() - self._proxima) * 1000)
+            await self.ejecutar()
+            self._proxima += self.intervalo_segundos
+            await asyncio.sleep(max(0.0, self._proxima - time.monotonic()))
+
+    # --- Pasada ----------------------------------------------------------
+
+    async def ejecutar(self) -> None:
+        corte = datetime.now() - self.gracia
+        for barrido in self.barridos:
+            inicio = time.perf_counter()
+            try:
+                filas = await self._barrer(barrido, corte)
+                barrido.ultimo_error = None
+                barrido.atraso_segundos = await self._atraso(barrido, corte)
+            except Exception as e:
+                # Un error (BD caída, lock timeout) no debe matar la tarea: se reintenta en la próxima pasada
+                print(f"[ciclo_turnos] Error en {barrido.nombre}: {e}")
+                barrido.ultimo_error = str(e)
+                filas = 0
+            barrido.ejecuciones += 1
+            barrido.ultima_filas = filas
+            barrido.filas_total += filas
+            barrido.ultima_duracion_ms = (time.perf_counter() - inicio) * 1000
+            barrido.ultima_ejecucion = datetime.now()
+
+    async def _barrer(self, barrido: Barrido, corte: datetime) -> int:
+        query_lote = f"""
+            SELECT t.id, t.fecha_hora, hm.medicos_id
+            FROM turnos t
+            LEFT JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+            WHERE t.estado = :origen AND t.fecha_hora < :corte
+            ORDER BY t.fecha_hora
+            LIMIT {int(self.lote)}
+        """
+        values = {"origen": barrido.origen, "corte": corte}
+        total = 0
+        for _ in range(self.max_lotes):
+            filas = await db.fetch_all(query=query_lote, values=values)
+            if not filas:
+                break
+            marcadores = ", ".join(f":id_{i}" for i in range(len(filas)))
+            ids = {f"id_{i}": fila["id"] for i, fila in enumerate(filas)}
+            # Condicional al estado: si otro worker ya lo barrió, no se toca
+            filas_cambiadas = await db.execute(
+                query=f"UPDATE turnos SET estado = :destino WHERE id IN ({marcadores}) AND estado = :origen",
+                values={"destino": barrido.destino, "origen": barrido.origen, **ids},
+            ) or 0
+            total += filas_cambiadas
+            if filas_cambiadas < len(filas):
+                # Algunos los cambió otro (worker o médico): se avisa solo de los que quedaron en destino
+                cambiados = {
+                    row["id"] for row in await db.fetch_all(
+                        query=f"SELECT id FROM turnos WHERE id IN ({marcadores}) AND estado = :destino",
+                        values={"destino": barrido.destino, **ids},
+                    )
+                }
+            else:
+                cambiados = {fila["id"] for fila in filas}
+            for fila in filas:
+                # Solo las celdas (médico, día) tocadas; sin médico (horario borrado) se recalcula el día
+                refresco_reportes.marcar(fila["fecha_hora"], medico_id=fila["medicos_id"])
+                # La agenda abierta del médico (SSE/WS) se entera sin recargar
+                if fila["id"] in cambiados and fila["medicos_id"] is not None:
+                    eventos.publicar_estado(fila["id"], barrido.destino, fila["medicos_id"])
+            if len(filas) < self.lote:
+                break
+            # Entre lotes cedemos el event loop (y los locks de fila) a los pedidos
+            await asyncio.sleep(0)
+        return total
+
+    async def _mas_viejo(self, barrido: Barrido, corte: datetime) -> Optional[datetime]:
+        return await db.fetch_val(
+            query="SELECT MIN(fecha_hora) FROM turnos WHERE estado = :origen AND fecha_hora < :corte",
+            values={"origen": barrido.origen, "corte": corte},
+        )
+
+    async def _atraso(self, barrido: Barrido, corte: datetime) -> float:
+        mas_viejo = await self._mas_viejo(barrido, corte)
+        return (corte - mas_viejo).total_seconds() if mas_viejo else 0.0
+
+    def metricas(self) -> dict:
+        return {
+            "activo": self._tarea is not None and not self._tarea.done(),
+            "intervalo_segundos": self.intervalo_segundos,
+            "lote": self.lote,
+            "max_lotes": self.max_lotes,
+            "gracia_minutos": int(self.gracia.total_seconds() // 60),
+            "retraso_inicio_ms": self.retraso_inicio_ms,
+            "barridos": [asdict(b) for b in self.barridos],
+        }
+
+
+ciclo_turnos = CicloTurnos()
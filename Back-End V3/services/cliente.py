@@ -1,9 +1,10 @@
-from typing import List
+from typing import Iterable, List
 from fastapi import HTTPException
 from config.databases import db
 from schemas.cliente import Cliente, ClienteIn
 # Importa la función de hashing del servicio de auth (que ahora usa argon2)
-from services.auth import get_password_hash
+from services.auth import get_password_hash_async
+import services.sesiones as sesiones
 
 
 # Esta función es necesaria para devolver el cliente después de crearlo
@@ -15,6 +16,20 @@ async def get_cliente_by_id(id: int) -> Cliente:
     return row  # type: ignore
 
 
+async def get_clientes_by_ids(ids: Iterable[int]) -> List[Cliente]:
+    """Varios clientes en una sola consulta. Los ids inexistentes se omiten."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    marcadores = ", ".join(f":id_{i}" for i in range(len(ids)))
+    query = f"""
+        SELECT id, nombre, apellido, dni, email, telefono, fecha_nacimiento
+        FROM clientes WHERE id IN ({marcadores}) ORDER BY id
+    """
+    rows = await db.fetch_all(query=query, values={f"id_{i}": v for i, v in enumerate(ids)})
+    return rows  # type: ignore
+
+
 # ESTA ES LA FUNCIÓN CORRECTA QUE USA TU SP
 async def registrar_cliente_sp(cliente: ClienteIn) -> Cliente:
     """
@@ -22,7 +37,7 @@ async def registrar_cliente_sp(cliente: ClienteIn) -> Cliente:
     """
     try:
         # 1. Hashea la contraseña usando argon2 (desde services/auth.py)
-        hashed_password = get_password_hash(cliente.contraseña)
+        hashed_password = await get_password_hash_async(cliente.contraseña)
 
         # 2. Llama al procedimiento almacenado
         query = """
@@ -50,6 +65,8 @@ async def registrar_cliente_sp(cliente: ClienteIn) -> Cliente:
         # 4. Devuelve el objeto Cliente completo (sin contraseña)
         return await get_cliente_by_id(new_client_id)
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Si el SP devuelve el error '45000' (DNI/email duplicado), se captura aquí
         raise HTTPException(status_code=400, detail=f"Error al registrar el cliente: {str(e)}")
@@ -68,11 +85,13 @@ async def update_cliente(cliente_id: int, cliente: ClienteIn) -> Cliente:
             contraseña = :contraseña
         WHERE id = :id
     """
-    hashed_password = get_password_hash(cliente.contraseña)
+    hashed_password = await get_password_hash_async(cliente.contraseña)
     values = {**cliente.dict(), "id": cliente_id, "contraseña": hashed_password}
 
     await db.execute(query=query, values=values)
-    
+    # La contraseña se reemplaza siempre: se cierran las sesiones abiertas (refresh tokens)
+    await sesiones.store.revocar_usuario("cliente", cliente_id)
+
     return await get_cliente_by_id(cliente_id)
 
 #-----------------------------------------------------------------------------------------------
@@ -82,4 +101,5 @@ async def delete_cliente(id: int) -> dict:
     result = await db.execute(query=query, values={"id": id})
     if not result:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    await sesiones.store.revocar_usuario("cliente", id)
     return {"message": "Cliente eliminado correctamente"}
\ No newline at end of file
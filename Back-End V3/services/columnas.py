@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, Optional
+
+# Decodificación de columnas MySQL a valores de Python listos para usar.
+# Se aplica una vez por fila, al leerla de la BD o al cargarla en una cache;
+# después el resto del código no vuelve a mirar tipos.
+
+MINUTOS_DIA = 24 * 60
+
+# Las horas de los horarios son minutos enteros: un time y un "HH:MM" por minuto del día
+_TIME_DE_MINUTO = tuple(time(m // 60, m % 60) for m in range(MINUTOS_DIA))
+_TEXTO_DE_MINUTO = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTOS_DIA))
+
+
+def a_time(valor: Any) -> Any:
+    """TIME: MySQL lo devuelve como timedelta desde las 00:00; lo pasamos a time."""
+    if not isinstance(valor, timedelta):
+        return valor
+    segundos = valor.days * 86400 + valor.seconds
+    if not 0 <= segundos < 86400:
+        print(f"Advertencia: No se pudo convertir timedelta {valor} a time.")
+        return time(0, 0, 0)
+    if segundos % 60 == 0 and not valor.microseconds:
+        return _TIME_DE_MINUTO[segundos // 60]
+    return time(segundos // 3600, segundos % 3600 // 60, segundos % 60, valor.microseconds)
+
+
+def a_datetime(valor: Any) -> Any:
+    """DATETIME: las fechas en la BD son naive; quitamos tzinfo para que las claves coincidan."""
+    if isinstance(valor, datetime) and valor.tzinfo is not None:
+        return valor.replace(tzinfo=None)
+    return valor
+
+
+def a_minutos(valor: Any) -> Optional[int]:
+    """Minuto del día de un TIME (time o timedelta); None si no es una hora del día."""
+    if isinstance(valor, time):
+        return valor.hour * 60 + valor.minute
+    if isinstance(valor, timedelta):
+        minutos = (valor.days * 86400 + valor.seconds) // 60
+        return minutos if 0 <= minutos < MINUTOS_DIA else None
+    return None
+
+
+def time_de_minutos(minutos: int) -> time:
+    return _TIME_DE_MINUTO[minutos]
+
+
+def formatear_minutos(minutos: int) -> str:
+    """Texto "HH:MM" de un minuto del día."""
+    if 0 <= minutos < MINUTOS_DIA:
+        return _TEXTO_DE_MINUTO[minutos]
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+# Conversores por columna de cada tabla
+COLUMNAS_HORARIO: Dict[str, Callable[[Any], Any]] = {"hora_inicio": a_time, "hora_fin": a_time}
+
+
+def decodificar(fila, columnas: Dict[str, Callable[[Any], Any]]) -> Optional[dict]:
+    """La fila como dict, con las columnas de `columnas` ya convertidas."""
+    if not fila:
+        return None
+    datos = dict(fila)
+    for columna, conversor in columnas.items():
+        if columna in datos:
+            datos[columna] = conversor(datos[columna])
+    return datos
@@ -0,0 +1,191 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from config.databases import db
+from schemas.turno import EstadoTurno
+
+# SELECT/JOIN único para armar un TurnoCompleto (antes estaba copiado en cada función).
+# `{tabla}` es `turnos` o el archivo `turnos_historico` (ver services/archivo_turnos.py).
+_SELECT_TURNO_COMPLETO = """
+    SELECT
+        t.id AS turno_id, t.fecha_hora, t.estado, t.motivo, t.fecha_creacion,
+        t.clientes_id, t.horarios_medicos_id,
+        m.id AS medico_id, m.nombre, m.apellido, m.especialidad, m.matricula,
+        c.id AS consultorio_id, c.numero, c.ubicacion, c.tipo,
+        cl.nombre AS cliente_nombre,
+        cl.apellido AS cliente_apellido
+    FROM {tabla} t
+    JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+    JOIN medicos m ON hm.medicos_id = m.id
+    JOIN consultorios c ON hm.consultorios_id = c.id
+    LEFT JOIN clientes cl ON t.clientes_id = cl.id
+"""
+
+
+def codificar_cursor(fecha_hora: datetime, turno_id: int) -> str:
+    """Cursor opaco de keyset: posición (fecha_hora, id) del último turno devuelto."""
+    crudo = f"{fecha_hora.isoformat()}|{turno_id}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        fecha_hora, turno_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha_hora), int(turno_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+class ConsultaTurnos:
+    """
+    Builder de consultas sobre turnos completos (turno + médico + consultorio + cliente).
+    Los resultados son dicts con la forma de `TurnoCompleto`.
+
+    Cada método agrega un filtro y devuelve la misma instancia, para encadenar:
+
+        await ConsultaTurnos().por_medico(3).con_estados([EstadoTurno.PENDIENTE]).fetch_all()
+    """
+
+    def __init__(self):
+        self._condiciones: List[str] = []
+        self._valores: Dict[str, Any] = {}
+        self._ascendente = False
+        self._limite: Optional[int] = None
+        self._cursor: Optional[Tuple[datetime, int]] = None
+        self._historial = False
+
+    def _agregar(self, condicion: str, **valores: Any) -> "ConsultaTurnos":
+        self._condiciones.append(condicion)
+        self._valores.update(valores)
+        return self
+
+    # --- Filtros ---------------------------------------------------------
+
+    def por_id(self, turno_id: int) -> "ConsultaTurnos":
+        return self._agregar("t.id = :turno_id", turno_id=turno_id)
+
+    def por_ids(self, turno_ids: Iterable[int]) -> "ConsultaTurnos":
+        ids = list(turno_ids)
+        if not ids:
+            return self._agregar("1 = 0")
+        marcadores = ", ".join(f":tid_{i}" for i in range(len(ids)))
+        return self._agregar(f"t.id IN ({marcadores})", **{f"tid_{i}": v for i, v in enumerate(ids)})
+
+    def por_cliente(self, cliente_id: int) -> "ConsultaTurnos":
+        return self._agregar("t.clientes_id = :cliente_id", cliente_id=cliente_id)
+
+    def por_medico(self, medico_id: int) -> "ConsultaTurnos":
+        # Filtramos por hm.medicos_id (indexado) en lugar de m.id
+        return self._agregar("hm.medicos_id = :medico_id", medico_id=medico_id)
+
+    def con_estados(self, estados: Iterable[EstadoTurno]) -> "ConsultaTurnos":
+        lista = [e.value if isinstance(e, EstadoTurno) else e for e in estados]
+        if not lista:
+            return self
+        marcadores = ", ".join(f":estado_{i}" for i in range(len(lista)))
+        return self._agregar(f"t.estado IN ({marcadores})", **{f"estado_{i}": v for i, v in enumerate(lista)})
+
+    def desde(self, fecha_hora: datetime) -> "ConsultaTurnos":
+        return self._agregar("t.fecha_hora >= :desde", desde=fecha_hora)
+
+    def hasta(self, fecha_hora: datetime) -> "ConsultaTurnos":
+        return self._agregar("t.fecha_hora < :hasta", hasta=fecha_hora)
+
+    def futuros(self) -> "ConsultaTurnos":
+        return self._agregar("t.fecha_hora > NOW()")
+
+    # --- Orden y límite --------------------------------------------------
+
+    def ascendente(self) -> "ConsultaTurnos":
+        self._ascendente = True
+        return self
+
+    def limitar(self, limite: int) -> "ConsultaTurnos":
+        self._limite = limite
+        return self
+
+    def con_historial(self) -> "ConsultaTurnos":
+        """Incluye también los turnos archivados en `turnos_historico`."""
+        self._historial = True
+        return self
+
+    def despues_de(self, cursor: Optional[str]) -> "ConsultaTurnos":
+        """Paginación keyset: solo turnos posteriores al cursor en el orden elegido."""
+        self._cursor = decodificar_cursor(cursor) if cursor else None
+        return self
+
+    # --- Ejecución -------------------------------------------------------
+
+    def sql(self):
+        condiciones, valores = list(self._condiciones), dict(self._valores)
+        if self._cursor is not None:
+            # Equivale a (fecha_hora, id) > / < (cursor), escrito de forma que MySQL use el índice
+            op = ">" if self._ascendente else "<"
+            condiciones.append(
+                f"(t.fecha_hora {op} :cursor_fh OR (t.fecha_hora = :cursor_fh AND t.id {op} :cursor_id))"
+            )
+            valores.update(cursor_fh=self._cursor[0], cursor_id=self._cursor[1])
+
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        direccion = "ASC" if self._ascendente else "DESC"
+        limite = f" LIMIT {int(self._limite)}" if self._limite is not None else ""
+
+        if not self._historial:
+            query = _SELECT_TURNO_COMPLETO.format(tabla="turnos") + where
+            query += f" ORDER BY t.fecha_hora {direccion}, t.id {direccion}{limite}"
+            return query, valores
+
+        # UNION ALL con los filtros, el orden y el límite repetidos en cada rama:
+        # cada tabla resuelve su parte con sus índices y solo se mezclan 2*n filas
+        ramas = [
+            f"({_SELECT_TURNO_COMPLETO.format(tabla=tabla)}{where}"
+            f" ORDER BY t.fecha_hora {direccion}, t.id {direccion}{limite})"
+            for tabla in ("turnos", "turnos_historico")
+        ]
+        query = " UNION ALL ".join(ramas) + f" ORDER BY fecha_hora {direccion}, turno_id {direccion}{limite}"
+        return query, valores
+
+    async def fetch_all(self) -> List[dict]:
+        query, valores = self.sql()
+        rows = await db.fetch_all(query=query, values=valores)
+        return [fila_a_turno_completo(row) for row in rows]
+
+    async def fetch_one(self) -> Optional[dict]:
+        query, valores = self.sql()
+        row = await db.fetch_one(query=query, values=valores)
+        return fila_a_turno_completo(row) if row else None
+
+
+def fila_a_turno_completo(row) -> dict:
+    """
+    Convierte una fila del SELECT en un dict con la forma de TurnoCompleto.
+
+    No construimos modelos Pydantic por fila: las filas vienen de nuestra BD con
+    los tipos ya correctos, y los routers serializan la lista de una sola vez
+    (ver `services.respuestas.RespuestaJSON`).
+    """
+    cliente_nombre_completo = f"{row['cliente_nombre'] or ''} {row['cliente_apellido'] or ''}".strip()
+    return {
+        "id": row["turno_id"],
+        "fecha_hora": row["fecha_hora"],
+        "estado": row["estado"],
+        "motivo": row["motivo"],
+        "fecha_creacion": row["fecha_creacion"],
+        "clientes_id": row["clientes_id"],
+        "horarios_medicos_id": row["horarios_medicos_id"],
+        "medico": {
+            "id": row["medico_id"],
+            "nombre": row["nombre"],
+            "apellido": row["apellido"],
+            "especialidad": row["especialidad"],
+            "matricula": row["matricula"],
+        },
+        "consultorio": {
+            "id": row["consultorio_id"],
+            "numero": row["numero"],
+            "ubicacion": row["ubicacion"],
+            "tipo": row["tipo"],
+        },
+        "cliente_nombre_completo": cliente_nombre_completo or "N/A",
+    }
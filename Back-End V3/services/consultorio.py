@@ -1,13 +1,15 @@
 from typing import List
 from fastapi import HTTPException
 from config.databases import db
+from services.disponibilidad import motor
+from services.cache_http import versiones, CONSULTORIOS
+from services.referencias import referencias
 from schemas.consultorio import Consultorio,ConsultorioIn
 
 async def get_all_consultorios() -> List[Consultorio]:
-    """Obtiene todos los consultorios de la base de datos."""
-    query = "SELECT id, numero, ubicacion, tipo FROM consultorios ORDER BY numero"
+    """Obtiene todos los consultorios (de la cache de referencias), ordenados por número."""
     try:
-        return await db.fetch_all(query=query) # type: ignore
+        return [c.a_dict() for c in await referencias.consultorios()] # type: ignore
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener consultorios: {str(e)}")
 
@@ -22,4 +24,9 @@ async def update_consultorio(consultorio_id: int, consultorio: ConsultorioIn) ->
     """
     values = {**consultorio.dict(), "id": consultorio_id}
     await db.execute(query=query, values=values)
+    # Solo si existe: un UPDATE sin filas no debe agregar un consultorio a la cache
+    if await referencias.consultorio(consultorio_id) is not None:
+        referencias.guardar_consultorio(consultorio_id, consultorio.dict())
+    motor.invalidar_horarios()
+    versiones.incrementar(CONSULTORIOS)
     return {**consultorio.dict(), "id": consultorio_id} # type: ignore
@@ -0,0 +1,291 @@
+import asyncio
+import bisect
+import heapq
+import time as _reloj
+from datetime import date, datetime, timedelta, time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from config.databases import db
+from services.cache_http import versiones, DISPONIBILIDAD
+from services.referencias import referencias, HorarioRef, MedicoRef, ConsultorioRef
+from services.columnas import a_datetime
+
+# Cada cuánto se recarga el índice completo desde la BD. Entre recargas el
+# índice se mantiene con los hooks incrementales de los servicios; la recarga
+# periódica cubre cambios hechos por otros procesos/workers.
+REFRESCO_SEGUNDOS = 300
+
+_QUERY_RESERVAS = """
+    SELECT horarios_medicos_id, fecha_hora
+    FROM turnos
+    WHERE estado IN ('pendiente', 'confirmado') AND fecha_hora > NOW()
+"""
+
+
+class HorarioIndexado(NamedTuple):
+    """
+    Horario ya resuelto (con su médico y consultorio) listo para generar slots.
+    Las horas se guardan como minutos desde las 00:00.
+    """
+    id: int
+    dia_semana: int
+    inicio_min: int
+    fin_min: int
+    duracion_slot: Optional[int]
+    medicos_id: int
+    consultorios_id: int
+    medico_nombre: str
+    medico_apellido: str
+    especialidad: str
+    profesional_nombre_completo: str
+    consultorio_numero: str
+
+
+def _orden(horario: HorarioIndexado):
+    """Orden estable dentro de un día: (hora, id), el mismo que usa el cursor."""
+    return (horario.inicio_min, horario.id)
+
+
+def _indexar(horario: HorarioRef, medico: MedicoRef, consultorio: ConsultorioRef) -> Optional[HorarioIndexado]:
+    # Los minutos ya vienen calculados desde la carga de la cache de referencias
+    if horario.inicio_min is None:
+        print(f"Advertencia: 'hora_inicio' no es un objeto 'time' válido: {horario.hora_inicio}")
+        return None
+    return HorarioIndexado(
+        id=horario.id,
+        dia_semana=horario.dia_semana,
+        inicio_min=horario.inicio_min,
+        fin_min=horario.fin_min if horario.fin_min is not None else horario.inicio_min,
+        duracion_slot=horario.duracion_slot or None,
+        medicos_id=horario.medicos_id,
+        consultorios_id=horario.consultorios_id,
+        medico_nombre=medico.nombre,
+        medico_apellido=medico.apellido,
+        especialidad=medico.especialidad,
+        profesional_nombre_completo=f"{medico.nombre} {medico.apellido}".strip(),
+        consultorio_numero=consultorio.numero,
+    )
+
+
+def minutos_de_slots(horario: HorarioIndexado, desde_min: int = 0) -> Iterator[int]:
+    """
+    Minutos de inicio de cada slot del bloque, a partir de `desde_min`.
+
+    Sin `duracion_slot` el bloque es un único slot en `hora_inicio`. Con
+    duración, el primer slot válido se calcula aritméticamente (sin recorrer
+    los anteriores) y el resto se genera perezosamente con `range`.
+    """
+    paso = horario.duracion_slot
+    if not paso:
+        if horario.inicio_min >= desde_min:
+            yield horario.inicio_min
+        return
+    primero = horario.inicio_min
+    if desde_min > primero:
+        primero += -(-(desde_min - primero) // paso) * paso
+    yield from range(primero, horario.fin_min - paso + 1, paso)
+
+
+def _claves_de_slots(horario: HorarioIndexado, desde_min: int) -> Iterator[Tuple[int, int, HorarioIndexado]]:
+    for minuto in minutos_de_slots(horario, desde_min):
+        yield minuto, horario.id, horario
+
+
+class MotorDisponibilidad:
+    """
+    Índice en memoria de horarios por día de la semana y de slots reservados.
+
+    Se carga perezosamente en la primera consulta y luego se actualiza de forma
+    incremental desde los servicios de turnos y horarios, de modo que
+    `get_available_slots` solo hace búsquedas en el índice. Cada cambio mueve
+    la versión DISPONIBILIDAD de `services.cache_http` (ETag de /disponibles/).
+    """
+
+    def __init__(self, refresco_segundos: int = REFRESCO_SEGUNDOS):
+        self.refresco_segundos = refresco_segundos
+        self._por_dia: Dict[int, List[HorarioIndexado]] = {d: [] for d in range(7)}
+        self._por_id: Dict[int, HorarioIndexado] = {}
+        self._reservados: Set[Tuple[int, datetime]] = set()
+        # Reservas/liberaciones hechas mientras se consulta la BD en una recarga:
+        # se aplican sobre el resultado para no perderlas al reemplazar el set
+        self._cambios_en_carga: Optional[List[Tuple[bool, Tuple[int, datetime]]]] = None
+        self._horarios_ok = False
+        self._reservas_ok = False
+        self._cargado_en = 0.0
+        self._lock = asyncio.Lock()
+
+    # --- Carga -----------------------------------------------------------
+
+    def _vencido(self) -> bool:
+        return _reloj.monotonic() - self._cargado_en > self.refresco_segundos
+
+    async def asegurar_cargado(self) -> None:
+        if self._horarios_ok and self._reservas_ok and not self._vencido():
+            return
+        async with self._lock:
+            if self._vencido():
+                self._horarios_ok = self._reservas_ok = False
+            if not self._horarios_ok:
+                await self._cargar_horarios()
+            if not self._reservas_ok:
+                await self._cargar_reservas()
+            if self._vencido():
+                self._cargado_en = _reloj.monotonic()
+
+    async def _cargar_horarios(self) -> None:
+        # Se arma desde la cache de referencias: sin consultar la BD
+        await referencias.asegurar_cargado()
+        por_dia: Dict[int, List[HorarioIndexado]] = {d: [] for d in range(7)}
+        por_id: Dict[int, HorarioIndexado] = {}
+        for horario_ref, medico, consultorio in referencias.horarios_con_datos():
+            horario = _indexar(horario_ref, medico, consultorio)
+            if horario is None:
+                continue
+            por_id[horario.id] = horario
+            por_dia.setdefault(horario.dia_semana, []).append(horario)
+        for horarios in por_dia.values():
+            horarios.sort(key=_orden)
+        self._por_dia, self._por_id = por_dia, por_id
+        self._horarios_ok = True
+        versiones.incrementar(DISPONIBILIDAD)
+
+    async def _cargar_reservas(self) -> None:
+        self._cambios_en_carga = []
+        try:
+            rows = await db.fetch_all(_QUERY_RESERVAS)
+            reservados = {
+                (row["horarios_medicos_id"], a_datetime(row["fecha_hora"]))
+                for row in rows
+                if isinstance(row["fecha_hora"], datetime)
+            }
+            # En orden: el último cambio sobre cada slot es el que vale
+            for reservado, clave in self._cambios_en_carga:
+                if reservado:
+                    reservados.add(clave)
+                else:
+                    reservados.discard(clave)
+        finally:
+            self._cambios_en_carga = None
+        self._reservados = reservados
+        self._reservas_ok = True
+        versiones.incrementar(DISPONIBILIDAD)
+
+    # --- Consultas -------------------------------------------------------
+
+    def horarios_del_dia(self, dia_semana: int) -> List[HorarioIndexado]:
+        """Horarios de un día de la semana, ordenados por (hora_inicio, id)."""
+        return self._por_dia.get(dia_semana, [])
+
+    def especialidades(self) -> List[str]:
+        return sorted({h.especialidad for h in self._por_id.values() if h.especialidad})
+
+    def get_horario(self, horario_id: int) -> Optional[HorarioIndexado]:
+        return self._por_id.get(horario_id)
+
+    def esta_reservado(self, horario_id: int, fecha_hora: datetime) -> bool:
+        return (horario_id, fecha_hora) in self._reservados
+
+    def es_slot_valido(self, horario_id: int, fecha_hora: datetime) -> bool:
+        """True si `fecha_hora` es el inicio de un slot del horario (día y minuto correctos)."""
+        horario = self._por_id.get(horario_id)
+        if horario is None or (fecha_hora.weekday() + 1) % 7 != horario.dia_semana:
+            return False
+        if fecha_hora.second or fecha_hora.microsecond:
+            return False
+        minuto = fecha_hora.hour * 60 + fecha_hora.minute
+        return next(minutos_de_slots(horario, minuto), None) == minuto
+
+    def iter_slots(
+        self,
+        primer_dia: date,
+        ultimo_dia: date,
+        ahora: datetime,
+        filtro: Optional[Callable[[HorarioIndexado], bool]] = None,
+        despues_de: Optional[Tuple[datetime, int]] = None,
+        excluir: Optional[Callable[[int, datetime], bool]] = None,
+    ) -> Iterator[Tuple[HorarioIndexado, datetime]]:
+        """
+        Genera (horario, fecha_hora) de los slots libres en orden (fecha_hora, id).
+        `excluir(horario_id, fecha_hora)` descarta además otros slots ocupados
+        (p. ej. los apartados temporalmente, ver `services.retenciones`).
+
+        Es un generador: dentro de cada día mezcla perezosamente los bloques con
+        `heapq.merge`, así que el trabajo es proporcional a los slots consumidos
+        y no a todos los slots posibles del rango.
+        """
+        candidatos = {
+            d: [h for h in self.horarios_del_dia(d) if filtro is None or filtro(h)]
+            for d in range(7)
+        }
+        current_date = primer_dia
+        while current_date <= ultimo_dia:
+            horarios = candidatos[(current_date.weekday() + 1) % 7]
+            inicio_dia = datetime.combine(current_date, time())
+
+            desde_min, cursor_min, cursor_id = 0, -1, -1
+            if current_date == ahora.date():
+                # Redondeamos hacia arriba: un slot a las 10:00 ya no sirve a las 10:00:30
+                desde_min = ahora.hour * 60 + ahora.minute + (1 if ahora.second or ahora.microsecond else 0)
+            if despues_de and current_date == despues_de[0].date():
+                cursor_min = despues_de[0].hour * 60 + despues_de[0].minute
+                cursor_id = despues_de[1]
+                desde_min = max(desde_min, cursor_min)
+
+            bloques = [_claves_de_slots(h, desde_min) for h in horarios]
+            for minuto, horario_id, horario in heapq.merge(*bloques):
+                if (minuto, horario_id) <= (cursor_min, cursor_id):
+                    continue
+                slot_datetime = inicio_dia + timedelta(minutes=minuto)
+                if (horario_id, slot_datetime) in self._reservados:
+                    continue
+                if excluir is not None and excluir(horario_id, slot_datetime):
+                    continue
+                yield horario, slot_datetime
+
+            current_date += timedelta(days=1)
+
+    # --- Hooks incrementales ---------------------------------------------
+
+    def reservar(self, horario_id: int, fecha_hora: datetime) -> None:
+        clave = (horario_id, a_datetime(fecha_hora))
+        self._reservados.add(clave)
+        if self._cambios_en_carga is not None:
+            self._cambios_en_carga.append((True, clave))
+        versiones.incrementar(DISPONIBILIDAD)
+
+    def liberar(self, horario_id: int, fecha_hora: datetime) -> None:
+        clave = (horario_id, a_datetime(fecha_hora))
+        self._reservados.discard(clave)
+        if self._cambios_en_carga is not None:
+            self._cambios_en_carga.append((False, clave))
+        versiones.incrementar(DISPONIBILIDAD)
+
+    async def recargar_horario(self, horario_id: int) -> None:
+        """Reemplaza un único horario en el índice con lo que tiene la cache de referencias."""
+        if not self._horarios_ok:
+            return
+        horario_ref = await referencias.horario(horario_id)
+        medico = await referencias.medico(horario_ref.medicos_id) if horario_ref else None
+        consultorio = await referencias.consultorio(horario_ref.consultorios_id) if horario_ref else None
+        self.quitar_horario(horario_id)
+        horario = _indexar(horario_ref, medico, consultorio) if medico and consultorio else None
+        if horario is not None:
+            self._por_id[horario.id] = horario
+            bisect.insort(self._por_dia.setdefault(horario.dia_semana, []), horario, key=_orden)
+
+    def quitar_horario(self, horario_id: int) -> None:
+        anterior = self._por_id.pop(horario_id, None)
+        if anterior is not None:
+            self._por_dia[anterior.dia_semana] = [
+                h for h in self._por_dia.get(anterior.dia_semana, []) if h.id != horario_id
+            ]
+        versiones.incrementar(DISPONIBILIDAD)
+
+    def invalidar_horarios(self) -> None:
+        """Fuerza la recarga de horarios (p. ej. cambió un médico o consultorio)."""
+        self._horarios_ok = False
+
+    def invalidar_reservas(self) -> None:
+        self._reservas_ok = False
+
+
+motor = MotorDisponibilidad()
@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import os
+from collections import deque
+from datetime import datetime
+from functools import cached_property
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set
+from fastapi import HTTPException
+from pydantic_core import to_json
+from services.consultas_turnos import ConsultaTurnos
+from services.disponibilidad import motor
+from services.horarios_medicos import id_slot, slot_disponible
+from services.retenciones import retenciones
+
+# Eventos pendientes por suscriptor: si un cliente lento llega al tope se le
+# pide que vuelva a cargar la lista en lugar de acumular memoria sin límite
+EVENTOS_COLA = int(os.getenv("EVENTOS_COLA", "256"))
+# Últimos eventos que se guardan para reenviar a quien se reconecta con Last-Event-ID
+EVENTOS_HISTORIAL = int(os.getenv("EVENTOS_HISTORIAL", "1024"))
+EVENTOS_MAX_SUSCRIPTORES = int(os.getenv("EVENTOS_MAX_SUSCRIPTORES", "1000"))
+# Comentario/ping periódico para que proxies y navegador no corten la conexión
+EVENTOS_HEARTBEAT_SEGUNDOS = float(os.getenv("EVENTOS_HEARTBEAT_SEGUNDOS", "15"))
+
+# Tipos de evento
+SLOT_OCUPADO = "slot_ocupado"
+SLOT_LIBERADO = "slot_liberado"
+TURNO_CREADO = "turno_creado"
+TURNO_ESTADO = "turno_estado"
+TURNO_ELIMINADO = "turno_eliminado"
+# El cliente perdió eventos (cola llena o historial insuficiente): debe recargar
+RESINCRONIZAR = "resincronizar"
+
+# Todos los cambios de disponibilidad (la vista de turnos sin filtros)
+TOPICO_DISPONIBILIDAD = "disponibilidad"
+
+
+def topico_medico(medico_id: int) -> str:
+    """Disponibilidad de un médico (público, como /horarios_medicos/disponibles/)."""
+    return f"medico:{medico_id}"
+
+
+def topico_especialidad(especialidad: str) -> str:
+    """Disponibilidad de una especialidad (público)."""
+    return f"especialidad:{especialidad}"
+
+
+def topico_agenda(medico_id: int) -> str:
+    """Turnos del médico con datos del paciente: solo para el propio médico."""
+    return f"agenda:{medico_id}"
+
+
+class Evento:
+    def __init__(self, id: int, tipo: str, datos: dict, topicos: frozenset):
+        self.id = id
+        self.tipo = tipo
+        self.datos = datos
+        self.topicos = topicos
+
+    @cached_property
+    def json(self) -> bytes:
+        # Se serializa una vez por evento, no una vez por suscriptor
+        return to_json({"id": self.id, "tipo": self.tipo, **self.datos})
+
+    @cached_property
+    def sse(self) -> bytes:
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self.id, self.tipo.encode(), self.json)
+
+
+class Suscripcion:
+    def __init__(self, topicos: Iterable[str], max_cola: int):
+        self.topicos = frozenset(topicos)
+        self.cola: "asyncio.Queue[Evento]" = asyncio.Queue(max_cola)
+
+    async def siguiente(self, timeout: float) -> Optional[Evento]:
+        """Próximo evento, o None si pasaron `timeout` segundos sin novedades."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BusEventos:
+    """
+    Pub/sub en memoria por tópicos. Publicar no espera a nadie: cada
+    suscriptor tiene su cola acotada y el evento se serializa una sola vez.
+    Vale para un proceso, igual que el índice de disponibilidad; con varios
+    workers cada uno solo ve los cambios que pasan por él.
+    """
+
+    def __init__(
+        self,
+        max_cola: int = EVENTOS_COLA,
+        historial: int = EVENTOS_HISTORIAL,
+        max_suscriptores: int = EVENTOS_MAX_SUSCRIPTORES,
+    ):
+        self.max_cola = max_cola
+        self.max_suscriptores = max_suscriptores
+        self._por_topico: Dict[str, Set[Suscripcion]] = {}
+        self._historial: Deque[Evento] = deque(maxlen=historial)
+        self._ids = itertools.count(1)
+        self.suscriptores = 0
+        self.publicados = 0
+        self.entregados = 0
+        self.desbordes = 0
+
+    def hay_suscriptores(self, topicos: Iterable[str]) -> bool:
+        return any(self._por_topico.get(t) for t in topicos)
+
+    def publicar(self, tipo: str, datos: dict, topicos: Iterable[str]) -> Evento:
+        evento = Evento(next(self._ids), tipo, datos, frozenset(topicos))
+        self._historial.append(evento)
+        self.publicados += 1
+        # Un suscriptor de varios tópicos recibe el evento una sola vez
+        destinatarios: Set[Suscripcion] = set()
+        for topico in evento.topicos:
+            destinatarios.update(self._por_topico.get(topico, ()))
+        for suscripcion in destinatarios:
+            self._entregar(suscripcion, evento)
+        return evento
+
+    def _entregar(self, suscripcion: Suscripcion, evento: Evento) -> None:
+        try:
+            suscripcion.cola.put_nowait(evento)
+            self.entregados += 1
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta lo pendiente y se le pide recargar
+            self.desbordes += 1
+            self._quitar(suscripcion)
+            while not suscripcion.cola.empty():
+                suscripcion.cola.get_nowait()
+            suscripcion.cola.put_nowait(Evento(evento.id, RESINCRONIZAR, {}, suscripcion.topicos))
+
+    def _quitar(self, suscripcion: Suscripcion) -> None:
+        for topico in suscripcion.topicos:
+            conjunto = self._por_topico.get(topico)
+            if conjunto is not None and suscripcion in conjunto:
+                conjunto.discard(suscripcion)
+                if not conjunto:
+                    del self._por_topico[topico]
+
+    def verificar_capacidad(self) -> None:
+        """Se llama antes de abrir el stream, para poder responder 503 con un status real."""
+        if self.suscriptores >= self.max_suscriptores:
+            raise HTTPException(status_code=503, detail="Demasiadas conexiones de eventos abiertas")
+
+    def _ultimo_id(self) -> int:
+        return self._historial[-1].id if self._historial else 0
+
+    def _pendientes_desde(self, suscripcion: Suscripcion, ultimo_id: int) -> List[Evento]:
+        """Eventos posteriores a `ultimo_id` que le corresponden al suscriptor."""
+        ultimo = self._ultimo_id()
+        if ultimo_id == ultimo:
+            return []
+        # Un id de antes de un reinicio del servidor, o más viejo que el historial
+        if ultimo_id > ultimo or ultimo_id + 1 < self._historial[0].id:
+            return [Evento(ultimo, RESINCRONIZAR, {}, suscripcion.topicos)]
+        return [e for e in self._historial if e.id > ultimo_id and e.topicos & suscripcion.topicos]
+
+    async def suscribir(self, topicos: Iterable[str], ultimo_id: Optional[int] = None) -> AsyncIterator[Optional[Evento]]:
+        """
+        Generador de eventos para un cliente; entrega None cada
+        EVENTOS_HEARTBEAT_SEGUNDOS sin novedades. Con `ultimo_id` (el
+        Last-Event-ID de una reconexión) primero reenvía lo que se perdió.
+        Termina después de un evento RESINCRONIZAR.
+        """
+        suscripcion = Suscripcion(topicos, self.max_cola)
+        for topico in suscripcion.topicos:
+            self._por_topico.setdefault(topico, set()).add(suscripcion)
+        self.suscriptores += 1
+        try:
+            if ultimo_id is not None:
+                for evento in self._pendientes_desde(suscripcion, ultimo_id):
+                    yield evento
+                    if evento.tipo == RESINCRONIZAR:
+                        return
+            while True:
+                evento = await suscripcion.siguiente(EVENTOS_HEARTBEAT_SEGUNDOS)
+                yield evento
+                if evento is not None and evento.tipo == RESINCRONIZAR:
+                    return
+        finally:
+            self._quitar(suscripcion)
+            self.suscriptores -= 1
+
+    def metricas(self) -> dict:
+        return {
+            "suscriptores": self.suscriptores,
+            "topicos": len(self._por_topico),
+            "publicados": self.publicados,
+            "entregados": self.entregados,
+            "desbordes": self.desbordes,
+            "ultimo_id": self._ultimo_id(),
+        }
+
+
+bus = BusEventos()
+
+
+# --- Eventos de turnos y disponibilidad ----------------------------------------
+
+# Referencias a las tareas que arman eventos con datos de la BD (si no, el GC puede cortarlas)
+_tareas: Set[asyncio.Task] = set()
+
+
+def _topicos_slot(horario) -> List[str]:
+    return [TOPICO_DISPONIBILIDAD, topico_medico(horario.medicos_id), topico_especialidad(horario.especialidad)]
+
+
+def publicar_slot_ocupado(horario_id: int, fecha_hora: datetime) -> None:
+    """El slot dejó de estar disponible (reservado o apartado)."""
+    horario = motor.get_horario(horario_id)
+    topicos = _topicos_slot(horario) if horario else [TOPICO_DISPONIBILIDAD]
+    bus.publicar(SLOT_OCUPADO, {
+        "slot_id": id_slot(horario_id, fecha_hora),
+        "horarios_medico_id": horario_id,
+        "fecha_hora": fecha_hora,
+    }, topicos)
+
+
+def publicar_slot_liberado(horario_id: int, fecha_hora: datetime) -> None:
+    """
+    El slot vuelve a ofrecerse. Lleva el slot completo (mismo formato que
+    /horarios_medicos/disponibles/) para que el cliente lo agregue sin otra
+    consulta. Los slots pasados o apartados por otro paciente no se publican.
+    """
+    horario = motor.get_horario(horario_id)
+    if horario is None or fecha_hora <= datetime.now():
+        return
+    if motor.esta_reservado(horario_id, fecha_hora) or retenciones.esta_retenido(horario_id, fecha_hora):
+        return
+    slot = slot_disponible(horario, fecha_hora)
+    bus.publicar(SLOT_LIBERADO, {"slot": slot.model_dump()}, _topicos_slot(horario))
+
+
+# Una retención abandonada (checkout sin confirmar) devuelve el slot a la lista
+retenciones.al_vencer = lambda retencion: publicar_slot_liberado(retencion.horarios_medicos_id, retencion.fecha_hora)
+
+
+def publicar_turno_creado(turno_id: int, horario_id: int) -> None:
+    """
+    Turno nuevo en la agenda del médico. El evento lleva el TurnoCompleto,
+    así que solo se consulta la BD si el médico tiene la agenda abierta.
+    """
+    horario = motor.get_horario(horario_id)
+    if horario is None:
+        return
+    topico = topico_agenda(horario.medicos_id)
+    if not bus.hay_suscriptores([topico]):
+        return
+    tarea = asyncio.create_task(_publicar_turno_creado(turno_id, topico))
+    _tareas.add(tarea)
+    tarea.add_done_callback(_tareas.discard)
+
+
+async def _publicar_turno_creado(turno_id: int, topico: str) -> None:
+    try:
+        turno = await ConsultaTurnos().por_id(turno_id).fetch_one()
+    except Exception as e:
+        print(f"[eventos] No se pudo leer el turno {turno_id}: {e}")
+        return
+    if turno is not None:
+        bus.publicar(TURNO_CREADO, {"turno": turno}, [topico])
+
+
+def publicar_turno_estado(turno: dict) -> None:
+    """Cambio de estado de un turno (TurnoCompleto ya leído por quien lo cambió)."""
+    publicar_estado(turno["id"], turno["estado"], turno["medico"]["id"])
+
+
+def publicar_estado(turno_id: int, estado: str, medico_id: int) -> None:
+    """Cambio de estado cuando solo se conocen el id y el médico (p. ej. el ciclo de turnos)."""
+    bus.publicar(TURNO_ESTADO, {"turno_id": turno_id, "estado": estado}, [topico_agenda(medico_id)])
+
+
+def publicar_turno_eliminado(turno_id: int, horario_id: int) -> None:
+    horario = motor.get_horario(horario_id)
+    if horario is not None:
+        bus.publicar(TURNO_ELIMINADO, {"turno_id": turno_id}, [topico_agenda(horario.medicos_id)])
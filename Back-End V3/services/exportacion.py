@@ -0,0 +1,150 @@
+import csv
+import io
+import os
+import re
+import weakref
+from datetime import datetime
+from typing import AsyncIterator, Callable, Literal
+import aiomysql
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from config.databases import db
+from services.consultas_turnos import ConsultaTurnos, fila_a_turno_completo
+
+# Filas que se piden al servidor por vuelta y que se escriben juntas en un chunk
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", "500"))
+# Descargas simultáneas por proceso. Cada una tiene tomada una conexión del pool
+# mientras el cliente lee, así que tiene que ser bastante menor que DB_POOL_MAX
+EXPORTACION_MAX_SIMULTANEAS = int(os.getenv("EXPORTACION_MAX_SIMULTANEAS", "2"))
+
+FormatoExportacion = Literal["csv", "ndjson"]
+
+_COLUMNAS_CSV = (
+    "id", "fecha_hora", "estado", "motivo", "fecha_creacion",
+    "clientes_id", "cliente", "horarios_medicos_id",
+    "medico_id", "medico", "especialidad", "matricula",
+    "consultorio_id", "consultorio_numero", "consultorio_ubicacion",
+)
+
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _a_pyformat(query: str) -> str:
+    """`:nombre` (estilo de `databases`) -> `%(nombre)s` (estilo del driver)."""
+    return re.sub(r"(?<!:):(\w+)", r"%(\1)s", query)
+
+
+async def iterar_filas(query: str, values: dict, lote: int = EXPORTACION_LOTE) -> AsyncIterator[list]:
+    """
+    Recorre el resultado con un cursor del lado del servidor (SSDictCursor),
+    de a `lote` filas. `db.iterate` no sirve para esto con aiomysql: usa el
+    cursor por defecto, que trae todo el resultado a memoria en el execute.
+
+    La conexión queda tomada del pool mientras dura la descarga.
+    """
+    async with db.connection() as conexion:
+        cursor = await conexion.raw_connection.cursor(aiomysql.SSDictCursor)
+        try:
+            await cursor.execute(_a_pyformat(query), values)
+            while True:
+                filas = await cursor.fetchmany(lote)
+                if not filas:
+                    break
+                yield filas
+        finally:
+            # Si el cliente corta la descarga, cerrar el cursor descarta el resto del resultado
+            await cursor.close()
+
+
+def _fila_csv(turno: dict) -> tuple:
+    medico, consultorio = turno["medico"], turno["consultorio"]
+    return (
+        turno["id"], turno["fecha_hora"].isoformat() if turno["fecha_hora"] else "", turno["estado"],
+        turno["motivo"], turno["fecha_creacion"].isoformat() if turno["fecha_creacion"] else "",
+        turno["clientes_id"], turno["cliente_nombre_completo"], turno["horarios_medicos_id"],
+        medico["id"], f"{medico['nombre']} {medico['apellido']}".strip(), medico["especialidad"], medico["matricula"],
+        consultorio["id"], consultorio["numero"], consultorio["ubicacion"],
+    )
+
+
+async def _csv(consulta: ConsultaTurnos) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(_COLUMNAS_CSV)
+    # BOM para que Excel abra el archivo como UTF-8 (acentos en nombres y motivos)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    async for filas in iterar_filas(*consulta.sql()):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(_fila_csv(fila_a_turno_completo(fila)) for fila in filas)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _ndjson(consulta: ConsultaTurnos) -> AsyncIterator[bytes]:
+    async for filas in iterar_filas(*consulta.sql()):
+        yield b"".join(to_json(fila_a_turno_completo(fila)) + b"\n" for fila in filas)
+
+
+class LimiteDescargas:
+    """
+    Cupo de descargas en curso. Sin cupo se responde 503 enseguida, antes de
+    tomar una conexión: unas pocas descargas lentas no dejan sin pool al resto.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self.en_curso = 0
+        self.rechazadas = 0
+
+    def tomar(self) -> Callable[[], None]:
+        """Toma un lugar; devuelve la función que lo libera (se puede llamar más de una vez)."""
+        if self.en_curso >= self.maximo:
+            self.rechazadas += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Hay demasiadas exportaciones en curso, intentá nuevamente en unos segundos",
+                headers={"Retry-After": "5"},
+            )
+        self.en_curso += 1
+        liberado = False
+
+        def liberar() -> None:
+            nonlocal liberado
+            if not liberado:
+                liberado = True
+                self.en_curso -= 1
+        return liberar
+
+    def metricas(self) -> dict:
+        return {"maximo": self.maximo, "en_curso": self.en_curso, "rechazadas": self.rechazadas}
+
+
+limite_descargas = LimiteDescargas(EXPORTACION_MAX_SIMULTANEAS)
+
+
+async def _liberando(generador: AsyncIterator[bytes], liberar: Callable[[], None]) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in generador:
+            yield chunk
+    finally:
+        liberar()
+
+
+def exportar_turnos(consulta: ConsultaTurnos, formato: FormatoExportacion, nombre: str) -> StreamingResponse:
+    """
+    Descarga de turnos en CSV o NDJSON (un TurnoCompleto por línea). Se
+    escribe a medida que llegan las filas: la memoria no depende de la
+    cantidad de turnos y el primer byte sale antes de que termine la consulta.
+    Como mucho EXPORTACION_MAX_SIMULTANEAS a la vez (503 si no hay lugar).
+    """
+    liberar = limite_descargas.tomar()
+    generador = _liberando(_csv(consulta) if formato == "csv" else _ndjson(consulta), liberar)
+    # Si la respuesta nunca llega a recorrer el generador, su `finally` no corre
+    weakref.finalize(generador, liberar)
+    archivo = f"{nombre}_{datetime.now():%Y%m%d_%H%M%S}.{formato}"
+    return StreamingResponse(
+        generador,
+        media_type=_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{archivo}"'},
+    )
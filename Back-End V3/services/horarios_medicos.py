@@ -1,69 +1,43 @@
-from typing import List
+import base64
+from itertools import islice
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
+from pymysql.err import IntegrityError
 from config.databases import db
-from schemas.horarios_medicos import Horario_Medico, Horario_MedicoIn, HorarioDisponible
-from datetime import datetime, timedelta, date, time
-import datetime as dt # <-- MODIFICACIÓN: Importar dt
-
-# --- MODIFICACIÓN: Añadir esta función helper al inicio ---
-def _convert_timedelta_to_time(td: dt.timedelta) -> time:
-    """Convierte un objeto timedelta a time."""
-    total_seconds = int(td.total_seconds())
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
-    try:
-        return time(hour=hours, minute=minutes, second=seconds)
-    except ValueError:
-        print(f"Advertencia: No se pudo convertir timedelta {td} a time.")
-        return time(0, 0, 0)
-
-# --- MODIFICACIÓN: Añadir helper para procesar la fila ---
-def _process_horario_row(row):
-    """Convierte los timedelta de una fila de horario a time."""
-    if not row:
-        return None
-    row_dict = dict(row) # Convertir el Record a dict
-    
-    # Corregir tipos de hora
-    if 'hora_inicio' in row_dict and isinstance(row_dict['hora_inicio'], dt.timedelta):
-        row_dict['hora_inicio'] = _convert_timedelta_to_time(row_dict['hora_inicio'])
-    if 'hora_fin' in row_dict and isinstance(row_dict['hora_fin'], dt.timedelta):
-        row_dict['hora_fin'] = _convert_timedelta_to_time(row_dict['hora_fin'])
-        
-    return row_dict
-# --- FIN DE MODIFICACIONES ---
+from services.disponibilidad import motor
+from services.retenciones import retenciones
+from services.cache_http import versiones, HORARIOS
+from services.referencias import referencias
+from services.columnas import COLUMNAS_HORARIO, decodificar, formatear_minutos
+from schemas.horarios_medicos import Horario_Medico, Horario_MedicoIn, HorarioDisponible, HorarioSemanalIn
+from datetime import datetime, timedelta, date
 
 
 async def get_all_horarios_medicos() -> List[Horario_Medico]:
-    query = "SELECT * from horarios_medicos"
-    rows = await db.fetch_all(query=query)
-    # --- MODIFICACIÓN: Procesar las filas ---
-    return [_process_horario_row(row) for row in rows]  # type: ignore
+    return [h.a_dict() for h in await referencias.horarios()]  # type: ignore
 
 async def get_horarios_medico_by_id(medico_id: int) -> List[Horario_Medico]:
-    query = "SELECT * from horarios_medicos WHERE medicos_id = :medico_id"
-    rows = await db.fetch_all(query=query, values={"medico_id": medico_id})
-    if not rows:
+    horarios = await referencias.horarios(medico_id)
+    if not horarios:
         raise HTTPException(status_code=404, detail="Horarios del médico no encontrados")
-    # --- MODIFICACIÓN: Procesar las filas ---
-    return [_process_horario_row(row) for row in rows]  # type: ignore
+    return [h.a_dict() for h in horarios]  # type: ignore
 
 async def get_horario_id(id: int) -> Horario_Medico:
-    query = "SELECT * from horarios_medicos WHERE id = :id"
-    row = await db.fetch_one(query=query, values={"id": id})
-    if not row:
+    horario = await referencias.horario(id)
+    if horario is None:
         raise HTTPException(status_code=404, detail="Horario médico no encontrado")
-    # --- MODIFICACIÓN: Procesar la fila ---
-    return _process_horario_row(row)  # type: ignore
+    return horario.a_dict()  # type: ignore
 
 async def create_horario_medico(horario_medico:Horario_MedicoIn)-> Horario_Medico:
     query = """
-        INSERT INTO horarios_medicos (dia_semana, hora_inicio, hora_fin, medicos_id, consultorios_id)
-        VALUES (:dia_semana, :hora_inicio, :hora_fin, :medicos_id, :consultorios_id)
+        INSERT INTO horarios_medicos (dia_semana, hora_inicio, hora_fin, duracion_slot, medicos_id, consultorios_id)
+        VALUES (:dia_semana, :hora_inicio, :hora_fin, :duracion_slot, :medicos_id, :consultorios_id)
     """
     values = horario_medico.dict()
     last_record_id = await db.execute(query=query, values=values)
+    referencias.guardar_horario(last_record_id, values)
+    await motor.recargar_horario(last_record_id)
+    versiones.incrementar(HORARIOS)
     
     # Retornamos un dict que coincide con el schema (incluyendo el ID)
     # No es necesario convertir el tiempo aquí, ya que Pydantic lo manejó
@@ -75,12 +49,17 @@ async def update_horario_medico(id: int, horario_medico: Horario_MedicoIn) -> Ho
         SET dia_semana = :dia_semana,
             hora_inicio = :hora_inicio,
             hora_fin = :hora_fin,
-            medicos_id = :medicos_id
+            duracion_slot = :duracion_slot,
+            medicos_id = :medicos_id,
             consultorios_id = :consultorios_id
         WHERE id = :id
     """
     values = {**horario_medico.dict(), "id": id}
     await db.execute(query=query, values=values)
+    if await referencias.horario(id) is not None:
+        referencias.guardar_horario(id, values)
+    await motor.recargar_horario(id)
+    versiones.incrementar(HORARIOS)
     return {**values, "id": id}  # type: ignore
 
 async def delete_horario_medico(id: int) -> dict:
@@ -88,87 +67,202 @@ async def delete_horario_medico(id: int) -> dict:
     result = await db.execute(query=query, values={"id": id})
     if not result:
         raise HTTPException(status_code=404, detail="Horario médico no encontrado")
+    referencias.quitar_horario(id)
+    motor.quitar_horario(id)
+    versiones.incrementar(HORARIOS)
     return {"message": "Horario médico eliminado correctamente"}
 
 
-async def get_available_slots(days_in_future: int = 14) -> List[HorarioDisponible]:
+# --- Grilla semanal completa (alta/baja/modificación en bloque) -----------
+
+_COLUMNAS_HORARIO = ("dia_semana", "hora_inicio", "hora_fin", "duracion_slot", "medicos_id", "consultorios_id")
+
+
+def _valores_multifila(filas: List[dict], columnas: Tuple[str, ...]) -> Tuple[str, dict]:
+    """Arma `(...), (...)` con placeholders numerados para un INSERT de varias filas."""
+    grupos, valores = [], {}
+    for i, fila in enumerate(filas):
+        grupos.append("(" + ", ".join(f":{c}_{i}" for c in columnas) + ")")
+        valores.update({f"{c}_{i}": fila[c] for c in columnas})
+    return ", ".join(grupos), valores
+
+
+def _difiere(existente: dict, deseado: HorarioSemanalIn) -> bool:
+    return (existente["hora_fin"] != deseado.hora_fin
+            or (existente["duracion_slot"] or None) != deseado.duracion_slot
+            or existente["consultorios_id"] != deseado.consultorios_id)
+
+
+async def reemplazar_horarios_medico(medico_id: int, horarios: List[HorarioSemanalIn]) -> dict:
     """
-    Genera una lista de slots de horarios disponibles que aún no han sido reservados.
+    Deja los horarios del médico exactamente como la grilla recibida.
+
+    Compara contra las filas actuales por (dia_semana, hora_inicio) y aplica
+    el diff en una transacción: un DELETE ... IN, un INSERT ... ON DUPLICATE
+    KEY UPDATE para los modificados y un INSERT de varias filas para los
+    nuevos. El índice de disponibilidad se invalida una sola vez al final.
     """
-    query_schedules = """
-        SELECT 
-            hm.id AS horarios_medico_id, hm.dia_semana, hm.hora_inicio,
-            m.nombre AS medico_nombre, m.apellido AS medico_apellido, m.especialidad,
-            c.numero AS consultorio_numero
-        FROM horarios_medicos hm
-        JOIN medicos m ON hm.medicos_id = m.id
-        JOIN consultorios c ON hm.consultorios_id = c.id
+    deseados = {}
+    # Los rangos de cada bloque ya los valida el schema (BloqueHorarioIn)
+    for h in horarios:
+        clave = (h.dia_semana, h.hora_inicio)
+        if clave in deseados:
+            raise HTTPException(status_code=422, detail=f"Horario repetido: día {h.dia_semana} a las {h.hora_inicio}")
+        deseados[clave] = h
+
+    try:
+        async with db.transaction():
+            rows = await db.fetch_all(
+                query="SELECT * FROM horarios_medicos WHERE medicos_id = :medico_id FOR UPDATE",
+                values={"medico_id": medico_id},
+            )
+            existentes, eliminar = {}, []
+            for row in rows:
+                fila = decodificar(row, COLUMNAS_HORARIO)
+                clave = (fila["dia_semana"], fila["hora_inicio"])
+                if clave in existentes:
+                    eliminar.append(fila["id"])  # duplicado previo en la BD
+                else:
+                    existentes[clave] = fila
+
+            eliminar += [fila["id"] for clave, fila in existentes.items() if clave not in deseados]
+            actualizar = [
+                {**h.dict(), "id": existentes[clave]["id"], "medicos_id": medico_id}
+                for clave, h in deseados.items()
+                if clave in existentes and _difiere(existentes[clave], h)
+            ]
+            insertar = [
+                {**h.dict(), "medicos_id": medico_id}
+                for clave, h in deseados.items()
+                if clave not in existentes
+            ]
+
+            if eliminar:
+                marcadores = ", ".join(f":id_{i}" for i in range(len(eliminar)))
+                await db.execute(
+                    query=f"DELETE FROM horarios_medicos WHERE id IN ({marcadores})",
+                    values={f"id_{i}": v for i, v in enumerate(eliminar)},
+                )
+            if actualizar:
+                columnas = ("id",) + _COLUMNAS_HORARIO
+                filas, valores = _valores_multifila(actualizar, columnas)
+                await db.execute(
+                    query=f"""
+                        INSERT INTO horarios_medicos ({", ".join(columnas)}) VALUES {filas}
+                        ON DUPLICATE KEY UPDATE
+                            hora_fin = VALUES(hora_fin),
+                            duracion_slot = VALUES(duracion_slot),
+                            consultorios_id = VALUES(consultorios_id)
+                    """,
+                    values=valores,
+                )
+            if insertar:
+                filas, valores = _valores_multifila(insertar, _COLUMNAS_HORARIO)
+                await db.execute(
+                    query=f"INSERT INTO horarios_medicos ({', '.join(_COLUMNAS_HORARIO)}) VALUES {filas}",
+                    values=valores,
+                )
+    except IntegrityError as e:
+        # 1451: el horario a borrar tiene turnos; 1452: consultorio/médico inexistente
+        raise HTTPException(status_code=409, detail=f"No se pudo aplicar la grilla de horarios: {e.args[-1]}")
+
+    rows = await db.fetch_all(
+        query="SELECT * FROM horarios_medicos WHERE medicos_id = :medico_id ORDER BY dia_semana, hora_inicio",
+        values={"medico_id": medico_id},
+    )
+    if eliminar or actualizar or insertar:
+        referencias.reemplazar_horarios(medico_id, rows)
+        motor.invalidar_horarios()
+        versiones.incrementar(HORARIOS)
+
+    return {
+        "insertados": len(insertar),
+        "actualizados": len(actualizar),
+        "eliminados": len(eliminar),
+        "horarios": [decodificar(row, COLUMNAS_HORARIO) for row in rows],
+    }
+
+
+def codificar_cursor_slot(slot: HorarioDisponible) -> str:
+    """Cursor opaco con la posición (fecha_hora, horario) del último slot devuelto."""
+    crudo = f"{slot.fecha_hora.isoformat()}|{slot.horarios_medico_id}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def _decodificar_cursor_slot(cursor: str) -> Tuple[datetime, int]:
+    try:
+        fecha_hora, horario_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha_hora), int(horario_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def id_slot(horario_id: int, fecha_hora: datetime) -> str:
+    """Id estable de un slot en la respuesta de /disponibles/ (y en los eventos)."""
+    return f"{horario_id}-{fecha_hora.isoformat()}"
+
+
+def slot_disponible(horario, slot_datetime: datetime) -> HorarioDisponible:
+    return HorarioDisponible(
+        id=id_slot(horario.id, slot_datetime),
+        horarios_medico_id=horario.id,
+        fecha_hora=slot_datetime,
+        fecha_turno=slot_datetime.date(),
+        hora_turno=formatear_minutos(slot_datetime.hour * 60 + slot_datetime.minute),
+        medico_nombre=horario.medico_nombre,
+        medico_apellido=horario.medico_apellido,
+        especialidad=horario.especialidad,
+        profesional_nombre_completo=horario.profesional_nombre_completo,
+        consultorio_numero=horario.consultorio_numero
+    )
+
+
+async def get_especialidades_disponibles() -> List[str]:
+    await motor.asegurar_cargado()
+    return motor.especialidades()
+
+
+async def get_available_slots(
+    days_in_future: int = 14,
+    especialidad: Optional[str] = None,
+    medico_id: Optional[int] = None,
+    consultorio_id: Optional[int] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> List[HorarioDisponible]:
     """
-    all_schedules = await db.fetch_all(query_schedules)
-    
-    query_turnos = """
-        SELECT horarios_medicos_id, fecha_hora
-        FROM turnos
-        WHERE estado IN ('pendiente', 'confirmado') AND fecha_hora > NOW()
+    Genera una lista de slots de horarios disponibles que aún no han sido reservados.
+    Usa el índice en memoria de `services.disponibilidad` en lugar de consultar la BD.
+
+    Los filtros se aplican sobre el índice antes de construir los modelos, y los
+    slots salen ordenados por (fecha_hora, horarios_medico_id) para poder paginar
+    con `cursor` (ver `codificar_cursor_slot`). Los bloques con `duracion_slot`
+    se parten en varios slots de forma perezosa.
     """
-    reserved_rows = await db.fetch_all(query_turnos)
-    
-    reserved_set = set()
-    for turno in reserved_rows:
-        if isinstance(turno['fecha_hora'], datetime):
-            reserved_set.add(f"{turno['horarios_medicos_id']}-{turno['fecha_hora'].isoformat()}")
-
-    available_slots = []
-    today = date.today()
-
-    for i in range(days_in_future):
-        current_date = today + timedelta(days=i)
-        
-        py_weekday = current_date.weekday()
-        db_dia_semana = (py_weekday + 1) % 7
-        
-        matching_schedules = [s for s in all_schedules if s['dia_semana'] == db_dia_semana]
-        
-        for schedule in matching_schedules:
-            
-            slot_time = schedule['hora_inicio']
-            
-            # AHORA usamos la función helper para convertir
-            if isinstance(slot_time, timedelta):
-                slot_time = _convert_timedelta_to_time(slot_time)
-            elif not isinstance(slot_time, time):
-                print(f"Advertencia: 'hora_inicio' no es un objeto 'time' válido: {slot_time}")
-                continue
-
-            try:
-                slot_datetime = datetime.combine(current_date, slot_time)
-            except TypeError:
-                print(f"Error combinando fecha {current_date} y hora {slot_time}")
-                continue
-
-            if slot_datetime < datetime.now():
-                continue
-                
-            slot_key = f"{schedule['horarios_medico_id']}-{slot_datetime.isoformat()}"
-            
-            if slot_key not in reserved_set:
-                
-                profesional_nombre = f"{schedule['medico_nombre']} {schedule['medico_apellido']}".strip()
-                hora_turno_str = slot_time.strftime('%H:%M')
-                
-                available_slots.append(
-                    HorarioDisponible(
-                        id=slot_key, 
-                        horarios_medico_id=schedule['horarios_medico_id'],
-                        fecha_hora=slot_datetime,
-                        fecha_turno=current_date,
-                        hora_turno=hora_turno_str,
-                        medico_nombre=schedule['medico_nombre'],
-                        medico_apellido=schedule['medico_apellido'],
-                        especialidad=schedule['especialidad'],
-                        profesional_nombre_completo=profesional_nombre,
-                        consultorio_numero=schedule['consultorio_numero']
-                    )
-                )
-                        
-    return available_slots
\ No newline at end of file
+    await motor.asegurar_cargado()
+
+    ahora = datetime.now()
+    today = ahora.date()
+    primer_dia = max(today, fecha_desde) if fecha_desde else today
+    ultimo_dia = today + timedelta(days=days_in_future - 1)
+    if fecha_hasta and fecha_hasta < ultimo_dia:
+        ultimo_dia = fecha_hasta
+
+    despues_de: Optional[Tuple[datetime, int]] = None
+    if cursor:
+        despues_de = _decodificar_cursor_slot(cursor)
+        primer_dia = max(primer_dia, despues_de[0].date())
+
+    def _coincide(h) -> bool:
+        return ((especialidad is None or h.especialidad == especialidad)
+                and (medico_id is None or h.medicos_id == medico_id)
+                and (consultorio_id is None or h.consultorios_id == consultorio_id))
+
+    slots = motor.iter_slots(
+        primer_dia, ultimo_dia, ahora,
+        filtro=_coincide, despues_de=despues_de, excluir=retenciones.esta_retenido,
+    )
+
+    return [slot_disponible(horario, slot_datetime) for horario, slot_datetime in islice(slots, limit)]
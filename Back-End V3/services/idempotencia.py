@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+from fastapi import HTTPException
+
+IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", "10000"))
+IDEMPOTENCIA_TTL_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+
+
+def huella(contenido: str) -> str:
+    """Identifica el cuerpo de un pedido para detectar claves reutilizadas con otros datos."""
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class CacheIdempotencia:
+    """
+    Resultados de operaciones por `Idempotency-Key`, acotado por tamaño (LRU) y TTL.
+
+    Se guarda el future de la operación, no solo el resultado: si llega un
+    reintento mientras la primera ejecución sigue en curso, espera ese mismo
+    future en lugar de ejecutar la operación otra vez.
+
+    Las HTTPException (p. ej. 409 por slot ocupado) también se recuerdan, porque
+    son la respuesta definitiva a ese pedido. Cualquier otro error se descarta
+    para que el cliente pueda reintentar.
+    """
+
+    def __init__(self, max_entradas: int = IDEMPOTENCIA_MAX, ttl_segundos: int = IDEMPOTENCIA_TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        # clave -> (expira, huella, future)
+        self._entradas: "OrderedDict[Hashable, Tuple[float, str, asyncio.Future]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _vigente(self, clave: Hashable) -> Optional[Tuple[float, str, asyncio.Future]]:
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] < time.monotonic():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    def _guardar(self, clave: Hashable, huella_pedido: str, future: asyncio.Future) -> None:
+        self._entradas[clave] = (time.monotonic() + self.ttl_segundos, huella_pedido, future)
+        while len(self._entradas) > self.max_entradas:
+            # Nunca desalojamos operaciones en curso: su future sigue siendo la referencia
+            clave_vieja, (_, _, fut) = next(iter(self._entradas.items()))
+            if not fut.done():
+                break
+            del self._entradas[clave_vieja]
+
+    async def ejecutar(self, clave: Hashable, huella_pedido: str, operacion: Callable[[], Awaitable[Any]]) -> Any:
+        entrada = self._vigente(clave)
+        if entrada is not None:
+            if entrada[1] != huella_pedido:
+                raise HTTPException(
+                    status_code=422,
+                    detail="La Idempotency-Key ya se usó con un pedido distinto",
+                )
+            self.hits += 1
+            return await asyncio.shield(entrada[2])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._guardar(clave, huella_pedido, future)
+        try:
+            resultado = await operacion()
+        except HTTPException as e:
+            self._resolver_con_error(future, e)
+            raise
+        except Exception as e:
+            self._entradas.pop(clave, None)
+            self._resolver_con_error(future, e)
+            raise
+        except BaseException:
+            # Cancelación del pedido original: los reintentos en espera también se cancelan
+            self._entradas.pop(clave, None)
+            future.cancel()
+            raise
+        future.set_result(resultado)
+        return resultado
+
+    @staticmethod
+    def _resolver_con_error(future: asyncio.Future, error: BaseException) -> None:
+        future.set_exception(error)
+        # Marca la excepción como leída: si ningún reintento la espera, asyncio no la reporta
+        future.exception()
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+        self.hits = self.misses = 0
+
+
+cache_idempotencia = CacheIdempotencia()
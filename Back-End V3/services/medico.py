@@ -1,31 +1,49 @@
-from typing import List
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
 from fastapi import HTTPException
 from config.databases import db
+from services.disponibilidad import motor
+from services.cache_http import versiones, HORARIOS
+from services.referencias import referencias
+from services.reportes import refresco_reportes
 from schemas.medico import Medico, MedicoIn
-from services.auth import get_password_hash
+from services.auth import get_password_hash_async
+import services.sesiones as sesiones
 
 
 async def get_medico_estadisticas(medico_id: int) -> dict:
     """Calcula estadísticas para el dashboard del médico."""
     try:
-        # 1. Contar turnos de hoy (pendientes o confirmados)
-        query_turnos_hoy = """
-            SELECT COUNT(t.id) 
-            FROM turnos t
-            JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-            WHERE hm.medicos_id = :medico_id
-              AND DATE(t.fecha_hora) = CURDATE()
-              AND t.estado IN ('pendiente', 'confirmado')
-        """
-        turnos_hoy = await db.fetch_val(query=query_turnos_hoy, values={"medico_id": medico_id})
-        
-        # 2. Contar pacientes totales (únicos)
-        query_pacientes = """
-            SELECT COUNT(DISTINCT t.clientes_id)
-            FROM turnos t
-            JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-            WHERE hm.medicos_id = :medico_id
-        """
+        # 1. Turnos de hoy (pendientes o confirmados): una fila del resumen diario
+        #    (sql/005) por PK, en lugar de contar turnos con DATE(fecha_hora).
+        #    Si la celda de hoy espera recálculo (o falló) se cuentan los turnos
+        #    del día directamente, por el índice (estado, fecha_hora)
+        hoy = date.today()
+        if refresco_reportes.sucia(medico_id, hoy):
+            query_turnos_hoy = """
+                SELECT COUNT(*)
+                FROM turnos t
+                JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+                WHERE t.estado IN ('pendiente', 'confirmado')
+                  AND t.fecha_hora >= :desde AND t.fecha_hora < :hasta
+                  AND hm.medicos_id = :medico_id
+            """
+            values_hoy = {
+                "medico_id": medico_id,
+                "desde": datetime.combine(hoy, time()),
+                "hasta": datetime.combine(hoy + timedelta(days=1), time()),
+            }
+        else:
+            query_turnos_hoy = """
+                SELECT pendientes + confirmados
+                FROM reportes_medico_dia
+                WHERE medicos_id = :medico_id AND fecha = :hoy
+            """
+            values_hoy = {"medico_id": medico_id, "hoy": hoy}
+        turnos_hoy = await db.fetch_val(query=query_turnos_hoy, values=values_hoy) or 0
+
+        # 2. Pacientes totales (únicos): rango de PK de medico_pacientes (sql/006)
+        query_pacientes = "SELECT COUNT(*) FROM medico_pacientes WHERE medicos_id = :medico_id"
         pacientes_totales = await db.fetch_val(query=query_pacientes, values={"medico_id": medico_id})
 
         return {
@@ -37,6 +55,67 @@ async def get_medico_estadisticas(medico_id: int) -> dict:
         raise HTTPException(status_code=500, detail=f"Error al calcular estadísticas: {str(e)}")
 
 
+# Un solo GROUP BY sobre los turnos del médico (activos + archivo de sql/004,
+# como en reportes_medico_dia y medico_pacientes): datos del paciente + resumen
+# de visitas. Cada rama filtra por médico y cursor antes de unirse.
+_QUERY_PACIENTES = """
+    SELECT
+        cl.id, cl.nombre, cl.apellido, cl.dni, cl.email, cl.telefono, cl.fecha_nacimiento,
+        COUNT(*) AS total_turnos,
+        SUM(t.estado IN ('pendiente', 'confirmado')) AS turnos_activos,
+        SUM(t.estado = 'completado') AS turnos_completados,
+        MAX(CASE WHEN t.fecha_hora <= NOW() AND t.estado <> 'cancelado' THEN t.fecha_hora END) AS ultima_visita,
+        MIN(CASE WHEN t.fecha_hora > NOW() AND t.estado IN ('pendiente', 'confirmado') THEN t.fecha_hora END) AS proxima_visita
+    FROM (
+        SELECT t.clientes_id, t.fecha_hora, t.estado
+        FROM turnos t
+        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+        WHERE hm.medicos_id = :medico_id {filtro_cursor}
+        UNION ALL
+        SELECT t.clientes_id, t.fecha_hora, t.estado
+        FROM turnos_historico t
+        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+        WHERE hm.medicos_id = :medico_id {filtro_cursor}
+    ) t
+    JOIN clientes cl ON t.clientes_id = cl.id
+    GROUP BY cl.id
+    {filtro_activos}
+    ORDER BY cl.id
+    LIMIT {limite}
+"""
+
+
+async def get_pacientes_medico(
+    medico_id: int,
+    limit: int = 100,
+    despues_de: Optional[int] = None,
+    solo_activos: bool = False,
+) -> List[dict]:
+    """
+    Pacientes de un médico con última/próxima visita y cantidad de turnos,
+    contando también los turnos archivados. Paginado por keyset sobre el id del cliente (`despues_de` = último id recibido).
+    """
+    values = {"medico_id": medico_id}
+    filtro_cursor = ""
+    if despues_de is not None:
+        filtro_cursor = "AND t.clientes_id > :despues_de"
+        values["despues_de"] = despues_de
+    query = _QUERY_PACIENTES.format(
+        filtro_cursor=filtro_cursor,
+        filtro_activos="HAVING turnos_activos > 0" if solo_activos else "",
+        limite=int(limit),
+    )
+    rows = await db.fetch_all(query=query, values=values)
+    pacientes = []
+    for row in rows:
+        paciente = dict(row)
+        # SUM() llega como Decimal desde MySQL
+        paciente["turnos_activos"] = int(paciente["turnos_activos"] or 0)
+        paciente["turnos_completados"] = int(paciente["turnos_completados"] or 0)
+        pacientes.append(paciente)
+    return pacientes
+
+
 async def update_medico(medico_id: int, medico: MedicoIn) -> Medico:
     query = """
         UPDATE medicos
@@ -51,10 +130,15 @@ async def update_medico(medico_id: int, medico: MedicoIn) -> Medico:
         WHERE id = :id
     """
     # MODIFICADO: Usa passlib (bcrypt) en lugar de sha256
-    hashed_password = get_password_hash(medico.contraseña)
+    hashed_password = await get_password_hash_async(medico.contraseña)
     values = {**medico.dict(), "id": medico_id, "contraseña": hashed_password}
 
     await db.execute(query=query, values=values)
+    # La contraseña se reemplaza siempre: se cierran las sesiones abiertas (refresh tokens)
+    await sesiones.store.revocar_usuario("medico", medico_id)
+    if await referencias.medico(medico_id) is not None:
+        referencias.guardar_medico(medico_id, medico.dict())
+    motor.invalidar_horarios()
     return {**medico.dict(), "id": medico_id}  # type: ignore
 
 #-Eliminamos medico-----------------------------------------------------------------------------
@@ -63,4 +147,9 @@ async def delete_medico(id: int) -> dict:
     result = await db.execute(query=query, values={"id": id})
     if not result:
         raise HTTPException(status_code=404, detail="Médico no encontrado")
+    await sesiones.store.revocar_usuario("medico", id)
+    referencias.quitar_medico(id)
+    motor.invalidar_horarios()
+    # Por si la BD borra sus horarios en cascada
+    versiones.incrementar(HORARIOS)
     return {"message": "Médico eliminado correctamente"}
\ No newline at end of file
@@ -0,0 +1,173 @@
+import io
+import os
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+from fastapi import Response
+from pydantic_core import to_json
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from services.cache_http import CacheEtag, coincide_etag
+from services.idempotencia import huella
+from services.workers import PoolAcotado
+
+# reportlab es Python puro: con pocos hilos alcanza para no frenar el event loop
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_MAX_COLA = int(os.getenv("PDF_MAX_COLA", "16"))
+PDF_CACHE_MAX = int(os.getenv("PDF_CACHE_MAX", "512"))
+# Logo opcional para el encabezado (ruta a un PNG/JPG)
+PDF_LOGO = os.getenv("PDF_LOGO", "")
+
+CENTRO = "Centro de Salud JAVA"
+
+pool_pdf = PoolAcotado("pdf", max_workers=PDF_WORKERS, max_cola=PDF_MAX_COLA)
+
+
+# --- Render (se ejecuta en pool_pdf) -------------------------------------------
+
+_estilos = getSampleStyleSheet()
+_TITULO = ParagraphStyle("titulo", parent=_estilos["Title"], fontSize=16, spaceAfter=2)
+_SUBTITULO = ParagraphStyle("subtitulo", parent=_estilos["Normal"], alignment=1, textColor=colors.HexColor("#6B7280"))
+_CAJA = ParagraphStyle("caja", parent=_estilos["Heading4"], textColor=colors.HexColor("#1E40AF"), spaceBefore=10)
+_NORMAL = ParagraphStyle("normal", parent=_estilos["Normal"], fontSize=10, leading=13)
+_CHICO = ParagraphStyle("chico", parent=_NORMAL, fontSize=8, leading=10)
+_PIE = ParagraphStyle("pie", parent=_CHICO, alignment=1, textColor=colors.HexColor("#6B7280"), spaceBefore=18)
+
+
+def _p(texto, estilo: ParagraphStyle = _NORMAL) -> Paragraph:
+    return Paragraph(escape("" if texto is None else str(texto)), estilo)
+
+
+def _fecha(valor: Optional[datetime]) -> str:
+    return valor.strftime("%d/%m/%Y") if valor else "N/A"
+
+
+def _hora(valor: Optional[datetime]) -> str:
+    return valor.strftime("%H:%M") if valor else "N/A"
+
+
+def _nombre(persona: dict) -> str:
+    return f"{persona.get('nombre') or ''} {persona.get('apellido') or ''}".strip() or "N/A"
+
+
+def _caja(titulo: str, filas: List[Tuple[str, str]]) -> list:
+    tabla = Table([[_p(etiqueta), _p(valor)] for etiqueta, valor in filas], colWidths=[45 * mm, None])
+    tabla.setStyle(TableStyle([
+        ("BOX", (0, 0), (-1, -1), 0.75, colors.HexColor("#D1D5DB")),
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    return [Paragraph(escape(titulo), _CAJA), tabla]
+
+
+def _documento(titulo: str, subtitulo: str, cuerpo: list) -> bytes:
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=titulo, author=CENTRO,
+        leftMargin=18 * mm, rightMargin=18 * mm, topMargin=15 * mm, bottomMargin=15 * mm,
+    )
+    encabezado = []
+    if PDF_LOGO and os.path.exists(PDF_LOGO):
+        encabezado.append(Image(PDF_LOGO, width=50 * mm, height=20 * mm, kind="proportional"))
+    encabezado += [Paragraph(escape(titulo), _TITULO), Paragraph(escape(subtitulo), _SUBTITULO), Spacer(1, 6 * mm)]
+    doc.build(encabezado + cuerpo)
+    return buffer.getvalue()
+
+
+def render_comprobante(turno: dict) -> bytes:
+    """Comprobante de un turno (mismos datos que mostraba ComprobantePDF.jsx)."""
+    medico, consultorio = turno["medico"], turno["consultorio"]
+    detalles = [
+        ("Especialidad:", medico.get("especialidad") or "N/A"),
+        ("Profesional:", _nombre(medico)),
+        ("Fecha:", _fecha(turno["fecha_hora"])),
+        ("Hora:", _hora(turno["fecha_hora"])),
+        ("Consultorio:", consultorio.get("numero") or "N/A"),
+        ("Estado:", str(turno["estado"]).upper()),
+    ]
+    if turno.get("motivo"):
+        detalles.append(("Motivo:", turno["motivo"]))
+    solicitado = turno["fecha_creacion"].strftime("%d/%m/%Y %H:%M") if turno.get("fecha_creacion") else "N/A"
+    cuerpo = (
+        _caja("Información del Paciente", [("Paciente:", turno["cliente_nombre_completo"])])
+        + _caja(f"Detalles de la Cita (Turno ID: {turno['id']})", detalles)
+        + [
+            Spacer(1, 6 * mm),
+            _p("Recuerde presentarse 10 minutos antes del horario indicado.", _CHICO),
+            _p("Si necesita cancelar el turno, por favor hágalo con la mayor anticipación posible.", _CHICO),
+            _p(f"Turno solicitado el: {solicitado}", _PIE),
+        ]
+    )
+    return _documento("Comprobante de Turno Médico", CENTRO, cuerpo)
+
+
+def render_historial(cliente: dict, turnos: List[dict]) -> bytes:
+    """Historial de turnos de un paciente: datos personales y una tabla por turno."""
+    nacimiento = cliente.get("fecha_nacimiento")
+    datos = [
+        ("Paciente:", _nombre(cliente)),
+        ("DNI:", cliente.get("dni") or "N/A"),
+        ("Email:", cliente.get("email") or "N/A"),
+        ("Fecha Nac.:", nacimiento.strftime("%d/%m/%Y") if nacimiento else "N/A"),
+    ]
+    filas = [[_p(t, _CHICO) for t in ("Fecha", "Hora", "Profesional", "Especialidad", "Consultorio", "Estado", "Motivo")]]
+    for turno in turnos:
+        filas.append([
+            _p(_fecha(turno["fecha_hora"]), _CHICO), _p(_hora(turno["fecha_hora"]), _CHICO),
+            _p(_nombre(turno["medico"]), _CHICO), _p(turno["medico"].get("especialidad"), _CHICO),
+            _p(turno["consultorio"].get("numero"), _CHICO), _p(str(turno["estado"]).upper(), _CHICO),
+            _p(turno.get("motivo"), _CHICO),
+        ])
+    tabla = Table(filas, repeatRows=1, colWidths=[20 * mm, 12 * mm, 32 * mm, 28 * mm, 20 * mm, 22 * mm, None])
+    tabla.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#F3F4F6")),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.HexColor("#E5E7EB")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]))
+    cuerpo = _caja("Información del Paciente", datos) + [
+        Paragraph(escape(f"Turnos ({len(turnos)})"), _CAJA),
+        tabla if turnos else _p("El paciente no registra turnos."),
+    ]
+    return _documento("Reporte de Historial Médico", CENTRO, cuerpo)
+
+
+# --- Cache + ETag --------------------------------------------------------------
+
+def etag_de(*datos) -> str:
+    """ETag fuerte a partir de los datos que se imprimen: si no cambian, el PDF tampoco."""
+    return f'"{huella(to_json(datos).decode())[:32]}"'
+
+
+cache_pdf = CacheEtag(PDF_CACHE_MAX)
+
+
+async def _respuesta(
+    clave: Hashable, etag: str, if_none_match: Optional[str], nombre: str, render: Callable, *args
+) -> Response:
+    # Datos personales: el navegador puede guardarlo, pero revalida siempre con el ETag
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    contenido = await cache_pdf.obtener(clave, etag, lambda: pool_pdf.ejecutar(render, *args))
+    headers["Content-Disposition"] = f'inline; filename="{nombre}"'
+    return Response(content=contenido, media_type="application/pdf", headers=headers)
+
+
+async def comprobante(turno: dict, if_none_match: Optional[str] = None) -> Response:
+    """Comprobante del turno, cacheado por (id, estado)."""
+    return await _respuesta(
+        ("comprobante", turno["id"], turno["estado"]), etag_de(turno), if_none_match,
+        f"comprobante_turno_{turno['id']}.pdf", render_comprobante, turno,
+    )
+
+
+async def historial(cliente: dict, turnos: List[dict], if_none_match: Optional[str] = None) -> Response:
+    """Historial del paciente; se regenera solo cuando cambian sus turnos."""
+    return await _respuesta(
+        ("historial", cliente["id"]), etag_de(cliente, turnos), if_none_match,
+        f"historial_{cliente['id']}.pdf", render_historial, cliente, turnos,
+    )
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time as _reloj
+from typing import Dict, List, Optional, Tuple
+from config.databases import db
+from services.columnas import a_minutos, a_time
+from services.cache_http import versiones, CONSULTORIOS, HORARIOS
+
+# Recarga completa periódica: cubre cambios hechos por otros procesos/workers
+# (los de este proceso se aplican en el momento, write-through)
+REFERENCIAS_REFRESCO_SEGUNDOS = int(os.getenv("REFERENCIAS_REFRESCO_SEGUNDOS", "300"))
+
+_QUERY_CONSULTORIOS = "SELECT id, numero, ubicacion, tipo FROM consultorios"
+_QUERY_MEDICOS = "SELECT id, nombre, apellido, especialidad, matricula FROM medicos"
+_QUERY_HORARIOS = """
+    SELECT id, dia_semana, hora_inicio, hora_fin, duracion_slot, medicos_id, consultorios_id
+    FROM horarios_medicos
+"""
+
+
+class _Registro:
+    """
+    Fila compacta: solo los atributos de `__slots__`, sin dict por instancia.
+    `columnas` son las de la tabla (las que devuelve `a_dict`); `__slots__`
+    puede agregar campos derivados.
+    """
+    __slots__ = ()
+    columnas: Tuple[str, ...] = ()
+
+    def __init__(self, **valores):
+        for campo in self.columnas:
+            setattr(self, campo, valores[campo])
+
+    @classmethod
+    def de_fila(cls, fila):
+        return cls(**{campo: fila[campo] for campo in cls.columnas})
+
+    def a_dict(self) -> dict:
+        return {campo: getattr(self, campo) for campo in self.columnas}
+
+    def __eq__(self, otro) -> bool:
+        return type(self) is type(otro) and all(getattr(self, c) == getattr(otro, c) for c in self.columnas)
+
+
+class ConsultorioRef(_Registro):
+    columnas = __slots__ = ("id", "numero", "ubicacion", "tipo")
+
+
+class MedicoRef(_Registro):
+    """Solo los datos públicos del médico (los de `MedicoPublic`)."""
+    columnas = __slots__ = ("id", "nombre", "apellido", "especialidad", "matricula")
+
+
+class HorarioRef(_Registro):
+    """Las horas quedan como time y además en minutos del día (None si no son válidas)."""
+    columnas = ("id", "dia_semana", "hora_inicio", "hora_fin", "duracion_slot", "medicos_id", "consultorios_id")
+    __slots__ = columnas + ("inicio_min", "fin_min")
+
+    def __init__(self, **valores):
+        super().__init__(**valores)
+        self.hora_inicio = a_time(self.hora_inicio)
+        self.hora_fin = a_time(self.hora_fin)
+        self.inicio_min = a_minutos(self.hora_inicio)
+        self.fin_min = a_minutos(self.hora_fin)
+
+
+class CacheReferencias:
+    """
+    Consultorios, médicos (datos públicos) y horarios en memoria del proceso.
+    Son tablas chicas que se leen en casi todos los pedidos y cambian poco.
+
+    Se carga al arrancar (`main.py`) y los servicios que escriben esas tablas
+    la actualizan en el momento (write-through) después de escribir en la BD.
+    Una búsqueda por id que no está en memoria va a la BD (read-through).
+    """
+
+    def __init__(self, refresco_segundos: int = REFERENCIAS_REFRESCO_SEGUNDOS):
+        self.refresco_segundos = refresco_segundos
+        self._consultorios: Dict[int, ConsultorioRef] = {}
+        self._medicos: Dict[int, MedicoRef] = {}
+        self._horarios: Dict[int, HorarioRef] = {}
+        self._cargado = False
+        self._cargado_en = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cargas = 0
+
+    # --- Carga -----------------------------------------------------------
+
+    def _al_dia(self) -> bool:
+        return self._cargado and _reloj.monotonic() - self._cargado_en <= self.refresco_segundos
+
+    async def cargar(self) -> None:
+        consultorios = await db.fetch_all(_QUERY_CONSULTORIOS)
+        medicos = await db.fetch_all(_QUERY_MEDICOS)
+        horarios = await db.fetch_all(_QUERY_HORARIOS)
+        nuevos_consultorios = {fila["id"]: ConsultorioRef.de_fila(fila) for fila in consultorios}
+        nuevos_medicos = {fila["id"]: MedicoRef.de_fila(fila) for fila in medicos}
+        nuevos_horarios = {fila["id"]: HorarioRef.de_fila(fila) for fila in horarios}
+        # Cambios hechos por otro worker o directo en la BD: se mueven las
+        # versiones de services.cache_http para que los ETag viejos dejen de coincidir
+        if nuevos_consultorios != self._consultorios:
+            versiones.incrementar(CONSULTORIOS)
+        if nuevos_horarios != self._horarios:
+            versiones.incrementar(HORARIOS)
+        self._consultorios, self._medicos, self._horarios = nuevos_consultorios, nuevos_medicos, nuevos_horarios
+        self._cargado = True
+        self._cargado_en = _reloj.monotonic()
+        self.cargas += 1
+
+    async def asegurar_cargado(self) -> None:
+        if self._al_dia():
+            self.hits += 1
+            return
+        async with self._lock:
+            if self._al_dia():
+                self.hits += 1
+                return
+            self.misses += 1
+            await self.cargar()
+
+    async def _por_id(self, tabla: Dict[int, _Registro], clase, query: str, id: int):
+        await self.asegurar_cargado()
+        registro = tabla.get(id)
+        if registro is not None:
+            return registro
+        # Puede haberse creado desde otro proceso después de la carga
+        self.misses += 1
+        fila = await db.fetch_one(f"{query} WHERE id = :id", values={"id": id})
+        if fila is None:
+            return None
+        registro = tabla[id] = clase.de_fila(fila)
+        return registro
+
+    # --- Lecturas --------------------------------------------------------
+
+    async def consultorios(self) -> List[ConsultorioRef]:
+        await self.asegurar_cargado()
+        return sorted(self._consultorios.values(), key=lambda c: c.numero)
+
+    async def consultorio(self, id: int) -> Optional[ConsultorioRef]:
+        return await self._por_id(self._consultorios, ConsultorioRef, _QUERY_CONSULTORIOS, id)
+
+    async def medico(self, id: int) -> Optional[MedicoRef]:
+        return await self._por_id(self._medicos, MedicoRef, _QUERY_MEDICOS, id)
+
+    async def horario(self, id: int) -> Optional[HorarioRef]:
+        return await self._por_id(self._horarios, HorarioRef, _QUERY_HORARIOS, id)
+
+    async def horarios(self, medico_id: Optional[int] = None) -> List[HorarioRef]:
+        """Horarios por id, todos o los de un médico."""
+        await self.asegurar_cargado()
+        return [
+            h for _, h in sorted(self._horarios.items())
+            if medico_id is None or h.medicos_id == medico_id
+        ]
+
+    def horarios_con_datos(self) -> List[tuple]:
+        """
+        (horario, médico, consultorio) de los horarios cuyo médico y consultorio
+        existen: lo que devolvía el JOIN del índice de disponibilidad.
+        Sin contar hits: se llama después de `asegurar_cargado`.
+        """
+        resultado = []
+        for horario in self._horarios.values():
+            medico = self._medicos.get(horario.medicos_id)
+            consultorio = self._consultorios.get(horario.consultorios_id)
+            if medico is not None and consultorio is not None:
+                resultado.append((horario, medico, consultorio))
+        return resultado
+
+    # --- Write-through (después de escribir en la BD) ----------------------
+
+    def guardar_consultorio(self, id: int, datos: dict) -> None:
+        if self._cargado:
+            self._consultorios[id] = ConsultorioRef.de_fila({**datos, "id": id})
+
+    def guardar_medico(self, id: int, datos: dict) -> None:
+        if self._cargado:
+            self._medicos[id] = MedicoRef.de_fila({**datos, "id": id})
+
+    def quitar_medico(self, id: int) -> None:
+        self._medicos.pop(id, None)
+        for horario_id in [h.id for h in self._horarios.values() if h.medicos_id == id]:
+            del self._horarios[horario_id]
+
+    def guardar_horario(self, id: int, datos: dict) -> None:
+        if self._cargado:
+            self._horarios[id] = HorarioRef.de_fila({**datos, "id": id})
+
+    def quitar_horario(self, id: int) -> None:
+        self._horarios.pop(id, None)
+
+    def reemplazar_horarios(self, medico_id: int, filas) -> None:
+        """La grilla completa del médico, tal como quedó en la BD."""
+        if not self._cargado:
+            return
+        for horario_id in [h.id for h in self._horarios.values() if h.medicos_id == medico_id]:
+            del self._horarios[horario_id]
+        for fila in filas:
+            self._horarios[fila["id"]] = HorarioRef.de_fila(fila)
+
+    def invalidar(self) -> None:
+        """Fuerza la recarga completa en la próxima lectura."""
+        self._cargado = False
+
+    def metricas(self) -> dict:
+        return {
+            "consultorios": len(self._consultorios),
+            "medicos": len(self._medicos),
+            "horarios": len(self._horarios),
+            "hits": self.hits,
+            "misses": self.misses,
+            "cargas": self.cargas,
+        }
+
+
+referencias = CacheReferencias()
@@ -0,0 +1,250 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from config.databases import db
+from services.disponibilidad import motor, minutos_de_slots
+
+# Espera antes de recalcular: varios cambios seguidos del mismo día
+# (p. ej. confirmar la lista de la mañana) terminan en un solo recálculo
+DEMORA_REFRESCO_SEGUNDOS = 1.0
+# Una celda que falló (BD caída, lock timeout) se reintenta con espera creciente hasta este tope
+REINTENTO_REFRESCO_MAX_SEGUNDOS = 60.0
+
+_ESTADOS = ("pendiente", "confirmado", "cancelado", "completado")
+
+# Recalcula las celdas (médico, día) de un rango. El filtro `estado IN (...)`
+# con los cuatro estados no descarta nada, pero permite recorrer el índice
+# (estado, fecha_hora) de sql/002 en lugar de toda la tabla.
+_QUERY_REFRESCO = """
+    INSERT INTO reportes_medico_dia
+        (medicos_id, fecha, reservados, pendientes, confirmados, cancelados, completados, pacientes_unicos)
+    SELECT
+        hm.medicos_id, DATE(t.fecha_hora), COUNT(*),
+        SUM(t.estado = 'pendiente'), SUM(t.estado = 'confirmado'),
+        SUM(t.estado = 'cancelado'), SUM(t.estado = 'completado'),
+        COUNT(DISTINCT t.clientes_id)
+    FROM (
+        SELECT horarios_medicos_id, fecha_hora, estado, clientes_id FROM turnos
+        WHERE estado IN ({estados}) AND fecha_hora >= :desde AND fecha_hora < :hasta
+        UNION ALL
+        SELECT horarios_medicos_id, fecha_hora, estado, clientes_id FROM turnos_historico
+        WHERE estado IN ({estados}) AND fecha_hora >= :desde AND fecha_hora < :hasta
+    ) t
+    JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+    {filtro_medico}
+    GROUP BY hm.medicos_id, DATE(t.fecha_hora)
+"""
+
+
+def _valores_estados() -> Tuple[str, dict]:
+    marcadores = ", ".join(f":estado_{i}" for i in range(len(_ESTADOS)))
+    return marcadores, {f"estado_{i}": e for i, e in enumerate(_ESTADOS)}
+
+
+async def refrescar_rango(desde: date, hasta: date, medico_id: Optional[int] = None) -> None:
+    """Recalcula el resumen de los días [desde, hasta] (de un médico o de todos)."""
+    marcadores, values = _valores_estados()
+    values.update(desde=datetime.combine(desde, time()), hasta=datetime.combine(hasta + timedelta(days=1), time()))
+    borrar = "DELETE FROM reportes_medico_dia WHERE fecha >= :desde_dia AND fecha <= :hasta_dia"
+    valores_borrar = {"desde_dia": desde, "hasta_dia": hasta}
+    filtro_medico = ""
+    if medico_id is not None:
+        borrar += " AND medicos_id = :medico_id"
+        valores_borrar["medico_id"] = medico_id
+        filtro_medico = "WHERE hm.medicos_id = :medico_id"
+        values["medico_id"] = medico_id
+    # Borrar + insertar: un día que se quedó sin turnos no debe conservar la fila vieja
+    async with db.transaction():
+        await db.execute(query=borrar, values=valores_borrar)
+        await db.execute(
+            query=_QUERY_REFRESCO.format(estados=marcadores, filtro_medico=filtro_medico),
+            values=values,
+        )
+
+
+class RefrescoReportes:
+    """
+    Acumula las celdas (médico, día) tocadas por cambios de turnos y las
+    recalcula en segundo plano tras una pequeña demora, una vez por celda.
+    Si no se conoce el médico (índice de horarios sin cargar) se recalcula
+    el día completo para todos. Las celdas que fallan vuelven a la cola y se
+    reintentan con espera creciente; mientras tanto `sucia()` avisa que su
+    fila del resumen puede estar desactualizada.
+    """
+
+    def __init__(self, demora_segundos: float = DEMORA_REFRESCO_SEGUNDOS):
+        self.demora_segundos = demora_segundos
+        self._pendientes: Set[Tuple[Optional[int], date]] = set()
+        self._en_curso: Set[Tuple[Optional[int], date]] = set()
+        self._tarea: Optional[asyncio.Task] = None
+        self._reintentando = False
+        self._cerrando = False
+        self.refrescos = 0
+        self.errores = 0
+        self.reintentos = 0
+
+    def marcar(self, fecha_hora: datetime, medico_id: Optional[int] = None, horario_id: Optional[int] = None) -> None:
+        if medico_id is None and horario_id is not None:
+            horario = motor.get_horario(horario_id)
+            medico_id = horario.medicos_id if horario else None
+        self._pendientes.add((medico_id, fecha_hora.date()))
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._vaciar())
+
+    def sucia(self, medico_id: int, dia: date) -> bool:
+        """True si la celda (o el día completo) espera recálculo en este proceso."""
+        celdas = self._pendientes | self._en_curso
+        return (medico_id, dia) in celdas or (None, dia) in celdas
+
+    async def _vaciar(self) -> None:
+        await asyncio.sleep(self.demora_segundos)
+        espera = self.demora_segundos
+        while self._pendientes:
+            celdas, self._pendientes = self._pendientes, set()
+            self._en_curso = celdas
+            # Si un día se recalcula completo, sus celdas por médico sobran
+            dias_completos = {dia for medico, dia in celdas if medico is None}
+            fallidas = set()
+            for medico_id, dia in celdas:
+                if medico_id is not None and dia in dias_completos:
+                    continue
+                try:
+                    await refrescar_rango(dia, dia, medico_id)
+                    self.refrescos += 1
+                except Exception as e:
+                    self.errores += 1
+                    fallidas.add((medico_id, dia))
+                    print(f"[reportes] Error al recalcular {medico_id} {dia}: {e}")
+            self._en_curso = set()
+            if fallidas and not self._cerrando:
+                self.reintentos += len(fallidas)
+                self._pendientes |= fallidas
+                espera = min(max(espera, 1.0) * 2, REINTENTO_REFRESCO_MAX_SEGUNDOS)
+                self._reintentando = True
+                try:
+                    await asyncio.sleep(espera)
+                finally:
+                    self._reintentando = False
+            else:
+                espera = self.demora_segundos
+
+    def metricas(self) -> dict:
+        return {
+            "demora_segundos": self.demora_segundos,
+            "pendientes": len(self._pendientes),
+            "refrescos": self.refrescos,
+            "errores": self.errores,
+            "reintentos": self.reintentos,
+        }
+
+    async def esperar(self) -> None:
+        """
+        Espera a que se apliquen los recálculos pendientes (útil en el cierre).
+        Lo que vuelve a fallar ya no se reintenta, y si estaba esperando para
+        reintentar se abandona: el cierre no queda colgado con la BD caída.
+        """
+        self._cerrando = True
+        if self._tarea is None:
+            return
+        if self._reintentando:
+            self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+
+
+refresco_reportes = RefrescoReportes()
+
+
+# --- Pacientes por médico (sql/006) ----------------------------------------
+
+async def registrar_paciente(horario_id: int, cliente_id: int) -> None:
+    """Anota al paciente entre los del médico del horario (si ya estaba, no hace nada)."""
+    try:
+        await db.execute(
+            query="""
+                INSERT IGNORE INTO medico_pacientes (medicos_id, clientes_id)
+                SELECT medicos_id, :cliente_id FROM horarios_medicos WHERE id = :horario_id
+            """,
+            values={"horario_id": horario_id, "cliente_id": cliente_id},
+        )
+    except Exception as e:
+        # El turno ya se guardó: un error acá no debe hacer fallar el pedido
+        print(f"[reportes] Error al registrar paciente {cliente_id} del horario {horario_id}: {e}")
+
+
+async def revisar_paciente(horario_id: int, cliente_id: int) -> None:
+    """Quita al paciente de los del médico si ya no le queda ningún turno con él."""
+    try:
+        await db.execute(
+            query="""
+                DELETE mp FROM medico_pacientes mp
+                JOIN horarios_medicos h ON h.id = :horario_id AND mp.medicos_id = h.medicos_id
+                WHERE mp.clientes_id = :cliente_id
+                  AND NOT EXISTS (
+                      SELECT 1 FROM turnos t JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+                      WHERE t.clientes_id = :cliente_id AND hm.medicos_id = mp.medicos_id
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM turnos_historico t JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+                      WHERE t.clientes_id = :cliente_id AND hm.medicos_id = mp.medicos_id
+                  )
+            """,
+            values={"horario_id": horario_id, "cliente_id": cliente_id},
+        )
+    except Exception as e:
+        print(f"[reportes] Error al revisar paciente {cliente_id} del horario {horario_id}: {e}")
+
+
+def capacidad_del_dia(medico_id: int, dia: date) -> int:
+    """Slots programados del médico ese día según los horarios vigentes."""
+    total = 0
+    for horario in motor.horarios_del_dia((dia.weekday() + 1) % 7):
+        if horario.medicos_id == medico_id:
+            total += sum(1 for _ in minutos_de_slots(horario))
+    return total
+
+
+async def get_reporte_medico(medico_id: int, desde: date, hasta: date) -> dict:
+    """
+    Reporte diario del médico entre `desde` y `hasta` (inclusive): una lectura
+    por rango de PK de `reportes_medico_dia`, más la capacidad de cada día.
+    """
+    await motor.asegurar_cargado()
+    rows = await db.fetch_all(
+        query="""
+            SELECT fecha, reservados, pendientes, confirmados, cancelados, completados, pacientes_unicos
+            FROM reportes_medico_dia
+            WHERE medicos_id = :medico_id AND fecha >= :desde AND fecha <= :hasta
+            ORDER BY fecha
+        """,
+        values={"medico_id": medico_id, "desde": desde, "hasta": hasta},
+    )
+    por_fecha: Dict[date, dict] = {row["fecha"]: dict(row) for row in rows}
+
+    dias: List[dict] = []
+    totales = dict.fromkeys(("reservados", "pendientes", "confirmados", "cancelados", "completados", "capacidad"), 0)
+    # Capacidad por día de la semana: se calcula una vez por cada uno
+    capacidad_semana = {d: None for d in range(7)}
+    dia = desde
+    while dia <= hasta:
+        fila = por_fecha.get(dia) or {
+            "fecha": dia, "reservados": 0, "pendientes": 0, "confirmados": 0,
+            "cancelados": 0, "completados": 0, "pacientes_unicos": 0,
+        }
+        dia_semana = dia.weekday()
+        if capacidad_semana[dia_semana] is None:
+            capacidad_semana[dia_semana] = capacidad_del_dia(medico_id, dia)
+        capacidad = capacidad_semana[dia_semana]
+        ocupados = fila["pendientes"] + fila["confirmados"] + fila["completados"]
+        fila["capacidad"] = capacidad
+        fila["ocupacion"] = round(ocupados / capacidad, 4) if capacidad else None
+        for clave in totales:
+            totales[clave] += fila[clave]
+        dias.append(fila)
+        dia += timedelta(days=1)
+
+    ocupados = totales["pendientes"] + totales["confirmados"] + totales["completados"]
+    totales["ocupacion"] = round(ocupados / totales["capacidad"], 4) if totales["capacidad"] else None
+    return {"medico_id": medico_id, "desde": desde, "hasta": hasta, "dias": dias, "totales": totales}
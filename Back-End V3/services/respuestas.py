@@ -0,0 +1,16 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    Respuesta JSON para listas grandes de dicts que ya tienen la forma del
+    `response_model` (p. ej. turnos armados por `services.consultas_turnos`).
+
+    Al devolver una Response, FastAPI no vuelve a validar cada elemento contra
+    el modelo; `to_json` serializa fechas y enums igual que FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
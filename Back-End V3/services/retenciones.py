@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from services.cache_http import versiones, DISPONIBILIDAD
+
+RETENCION_SEGUNDOS = int(os.getenv("RETENCION_SEGUNDOS", "180"))
+RETENCION_MAX_SEGUNDOS = int(os.getenv("RETENCION_MAX_SEGUNDOS", "600"))
+# Evita que un mismo paciente acapare slots abriendo muchos checkouts
+RETENCION_MAX_POR_CLIENTE = int(os.getenv("RETENCION_MAX_POR_CLIENTE", "3"))
+
+
+class Retencion(NamedTuple):
+    """Un slot apartado por un paciente mientras completa la reserva."""
+    token: str
+    cliente_id: int
+    horarios_medicos_id: int
+    fecha_hora: datetime
+    vence: float          # time.monotonic()
+    expira: datetime      # el mismo vencimiento en hora local, para informarlo al cliente
+
+
+class Retenciones:
+    """
+    Retenciones de slots con vencimiento, en memoria del proceso.
+
+    Los vencimientos se guardan en un heap y se purgan al comienzo de cada
+    operación (O(log n) por retención vencida) y con un timer del event loop
+    al vencer cada una, para avisar enseguida por `al_vencer` (los eventos
+    `slot_liberado`) aunque nadie más toque las retenciones. Solo vale para
+    un proceso; con varios workers el índice único de turnos sigue siendo la
+    garantía final.
+    """
+
+    def __init__(self):
+        # Se llama con cada retención que vence sin convertirse en turno
+        self.al_vencer: Optional[Callable[[Retencion], None]] = None
+        self._por_token: Dict[str, Retencion] = {}
+        self._por_slot: Dict[Tuple[int, datetime], str] = {}
+        self._por_cliente: Dict[int, List[str]] = {}
+        self._vencimientos: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        self._purgar()
+        return len(self._por_token)
+
+    def _purgar(self) -> None:
+        ahora = time.monotonic()
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            _, token = heapq.heappop(self._vencimientos)
+            retencion = self._por_token.get(token)
+            # Una retención renovada deja una entrada vieja en el heap: se ignora
+            if retencion is not None and retencion.vence <= ahora:
+                self._quitar(retencion)
+                if self.al_vencer is not None:
+                    try:
+                        self.al_vencer(retencion)
+                    except Exception as e:
+                        print(f"[retenciones] Error al avisar el vencimiento de {retencion.token}: {e}")
+
+    def _quitar(self, retencion: Retencion) -> None:
+        self._por_token.pop(retencion.token, None)
+        self._por_slot.pop((retencion.horarios_medicos_id, retencion.fecha_hora), None)
+        tokens = self._por_cliente.get(retencion.cliente_id)
+        if tokens is not None:
+            tokens.remove(retencion.token)
+            if not tokens:
+                del self._por_cliente[retencion.cliente_id]
+        versiones.incrementar(DISPONIBILIDAD)
+
+    # --- Consultas -------------------------------------------------------
+
+    def retenido_por(self, horario_id: int, fecha_hora: datetime) -> Optional[Retencion]:
+        self._purgar()
+        token = self._por_slot.get((horario_id, fecha_hora))
+        return self._por_token.get(token) if token else None
+
+    def esta_retenido(self, horario_id: int, fecha_hora: datetime) -> bool:
+        # Se llama por cada slot al listar disponibilidad: sin purgar, solo comparamos el vencimiento
+        token = self._por_slot.get((horario_id, fecha_hora))
+        if token is None:
+            return False
+        return self._por_token[token].vence > time.monotonic()
+
+    def obtener(self, token: str) -> Optional[Retencion]:
+        self._purgar()
+        return self._por_token.get(token)
+
+    # --- Operaciones -----------------------------------------------------
+
+    def retener(self, cliente_id: int, horario_id: int, fecha_hora: datetime, segundos: int) -> Retencion:
+        """
+        Aparta el slot por `segundos`. Si ya lo tiene el mismo paciente se
+        renueva; si lo tiene otro, 409.
+        """
+        self._purgar()
+        segundos = max(1, min(segundos, RETENCION_MAX_SEGUNDOS))
+        actual = self.retenido_por(horario_id, fecha_hora)
+        if actual is not None:
+            if actual.cliente_id != cliente_id:
+                raise HTTPException(status_code=409, detail="El horario está siendo reservado por otro paciente")
+            self._quitar(actual)
+            token = actual.token
+        else:
+            if len(self._por_cliente.get(cliente_id, [])) >= RETENCION_MAX_POR_CLIENTE:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Máximo {RETENCION_MAX_POR_CLIENTE} horarios apartados a la vez",
+                )
+            token = secrets.token_urlsafe(16)
+
+        vence = time.monotonic() + segundos
+        retencion = Retencion(
+            token=token,
+            cliente_id=cliente_id,
+            horarios_medicos_id=horario_id,
+            fecha_hora=fecha_hora,
+            vence=vence,
+            expira=datetime.now() + timedelta(seconds=segundos),
+        )
+        self._por_token[token] = retencion
+        self._por_slot[(horario_id, fecha_hora)] = token
+        self._por_cliente.setdefault(cliente_id, []).append(token)
+        heapq.heappush(self._vencimientos, (vence, token))
+        versiones.incrementar(DISPONIBILIDAD)
+        try:
+            # Un timer de una retención renovada o ya soltada no encuentra nada que purgar
+            asyncio.get_running_loop().call_later(segundos, self._purgar)
+        except RuntimeError:
+            pass  # fuera del event loop (scripts): queda la purga perezosa
+        return retencion
+
+    def soltar(self, token: str) -> Optional[Retencion]:
+        """Libera una retención (cancelada por el paciente o convertida en turno)."""
+        retencion = self.obtener(token)
+        if retencion is not None:
+            self._quitar(retencion)
+        return retencion
+
+    def limpiar(self) -> None:
+        self._por_token.clear()
+        self._por_slot.clear()
+        self._por_cliente.clear()
+        self._vencimientos.clear()
+
+
+retenciones = Retenciones()
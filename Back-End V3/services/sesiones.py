@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import heapq
+import secrets
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Sesion(NamedTuple):
+    """Datos de una sesión asociada a un refresh token."""
+    familia: str      # Id estable de la sesión; se mantiene en cada rotación
+    user_id: int
+    rol: str
+    email: str
+    nombre: str
+    expira: float     # epoch en segundos
+
+
+def hash_token(token: str) -> str:
+    """Los refresh tokens nunca se guardan en claro, solo su SHA-256."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def nuevo_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def nueva_familia() -> str:
+    return secrets.token_hex(8)
+
+
+class SessionStore(ABC):
+    """
+    Interfaz del almacén de sesiones. La implementación por defecto vive en
+    memoria; para varios workers se puede implementar sobre Redis o MySQL
+    respetando que `consumir` sea atómico (de eso depende la rotación).
+    """
+
+    @abstractmethod
+    async def guardar(self, token_hash: str, sesion: Sesion) -> None:
+        ...
+
+    @abstractmethod
+    async def consumir(self, token_hash: str) -> Optional[Sesion]:
+        """
+        Obtiene y elimina la sesión del token en un solo paso. El hash queda
+        registrado como consumido (con su familia) hasta que vence.
+        """
+
+    @abstractmethod
+    async def familia_consumida(self, token_hash: str) -> Optional[str]:
+        """Familia de un token que ya se usó (rotado o logout) y todavía no venció."""
+
+    @abstractmethod
+    async def revocar_familia(self, familia: str) -> None:
+        ...
+
+    @abstractmethod
+    async def revocar_usuario(self, rol: str, user_id: int) -> None:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Almacén en memoria con expiración por TTL (heap de vencimientos)."""
+
+    def __init__(self):
+        self._por_hash: Dict[str, Sesion] = {}
+        self._por_familia: Dict[str, str] = {}
+        # Hashes ya consumidos -> familia, para detectar el reuso de un token rotado
+        self._consumidos: Dict[str, str] = {}
+        self._vencimientos: List[Tuple[float, str]] = []
+        self._lock = asyncio.Lock()
+
+    def _purgar_vencidas(self) -> None:
+        ahora = time.time()
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            _, token_hash = heapq.heappop(self._vencimientos)
+            self._quitar(token_hash)
+            self._consumidos.pop(token_hash, None)
+
+    def _quitar(self, token_hash: str) -> Optional[Sesion]:
+        sesion = self._por_hash.pop(token_hash, None)
+        if sesion is not None and self._por_familia.get(sesion.familia) == token_hash:
+            del self._por_familia[sesion.familia]
+        return sesion
+
+    async def guardar(self, token_hash: str, sesion: Sesion) -> None:
+        async with self._lock:
+            self._purgar_vencidas()
+            self._por_hash[token_hash] = sesion
+            self._por_familia[sesion.familia] = token_hash
+            heapq.heappush(self._vencimientos, (sesion.expira, token_hash))
+
+    async def consumir(self, token_hash: str) -> Optional[Sesion]:
+        async with self._lock:
+            self._purgar_vencidas()
+            sesion = self._quitar(token_hash)
+            if sesion is not None:
+                # Su entrada en el heap de vencimientos limpia también esta marca
+                self._consumidos[token_hash] = sesion.familia
+            return sesion
+
+    async def familia_consumida(self, token_hash: str) -> Optional[str]:
+        async with self._lock:
+            self._purgar_vencidas()
+            return self._consumidos.get(token_hash)
+
+    async def revocar_familia(self, familia: str) -> None:
+        async with self._lock:
+            token_hash = self._por_familia.get(familia)
+            if token_hash is not None:
+                self._quitar(token_hash)
+
+    async def revocar_usuario(self, rol: str, user_id: int) -> None:
+        async with self._lock:
+            for token_hash, sesion in list(self._por_hash.items()):
+                if sesion.rol == rol and sesion.user_id == user_id:
+                    self._quitar(token_hash)
+
+    def __len__(self) -> int:
+        return len(self._por_hash)
+
+
+store: SessionStore = InMemorySessionStore()
+
+
+def configurar_store(nuevo: SessionStore) -> None:
+    """Permite reemplazar el almacén (p. ej. uno externo) al iniciar la app."""
+    global store
+    store = nuevo
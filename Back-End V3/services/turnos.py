@@ -1,128 +1,132 @@
-from typing import List
+from typing import Iterable, List, Optional
 from fastapi import HTTPException
+from pymysql.err import IntegrityError
 from config.databases import db
+from services.disponibilidad import motor
+from services.idempotencia import cache_idempotencia, huella
+from services.retenciones import Retencion, retenciones, RETENCION_SEGUNDOS
+from services.reportes import refresco_reportes, registrar_paciente, revisar_paciente
+import services.eventos as eventos
+from services.workers import LocksPorClave
 from schemas.turno import Turno, TurnoIn,TurnoCompleto, EstadoTurno
-from schemas.medico import MedicoPublic
-from schemas.consultorio import Consultorio
+from services.consultas_turnos import ConsultaTurnos
 from datetime import datetime, time, date
 import datetime as dt
 
+# Código de MySQL para clave duplicada. Con sql/003_turnos_slot_unico.sql es lo
+# que devuelve la BD cuando el slot ya tiene un turno pendiente o confirmado.
+ER_DUP_ENTRY = 1062
 
-# turnos por id de medico
-async def get_turnos_cliente_completos(cliente_id: int):
-    query = """
-        SELECT 
-            t.id AS turno_id, t.fecha_hora, t.estado, t.motivo, t.fecha_creacion,
-            t.clientes_id, t.horarios_medicos_id,
-            m.id AS medico_id, m.nombre, m.apellido, m.especialidad, m.matricula,
-            c.id AS consultorio_id, c.numero, c.ubicacion, c.tipo,
-            
-            -- --- AÑADIDO ---
-            cl.nombre AS cliente_nombre,
-            cl.apellido AS cliente_apellido
-            -- --- FIN ---
-            
-        FROM turnos t
-        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-        JOIN medicos m ON hm.medicos_id = m.id
-        JOIN consultorios c ON hm.consultorios_id = c.id
-        
-        -- --- AÑADIDO ---
-        LEFT JOIN clientes cl ON t.clientes_id = cl.id
-        -- --- FIN ---
-        
-        WHERE t.clientes_id = :cliente_id
-        ORDER BY t.fecha_hora DESC
+# Serializa dentro del proceso los pedidos que compiten por el mismo slot
+_locks_slot = LocksPorClave()
+
+
+def _es_slot_duplicado(error: Exception) -> bool:
+    return isinstance(error, IntegrityError) and bool(error.args) and error.args[0] == ER_DUP_ENTRY
+
+
+def _slot_ocupado() -> HTTPException:
+    return HTTPException(status_code=409, detail="El horario seleccionado ya fue reservado")
+
+
+def _filtrar(
+    consulta: ConsultaTurnos,
+    estados: Optional[Iterable[EstadoTurno]],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    limit: Optional[int],
+    cursor: Optional[str],
+    ascendente: bool,
+    incluir_historial: bool,
+) -> ConsultaTurnos:
     """
-    rows = await db.fetch_all(query=query, values={"cliente_id": cliente_id})
-
-    turnos = []
-    for row in rows:
-        cliente_nombre_completo = f"{row['cliente_nombre'] or ''} {row['cliente_apellido'] or ''}".strip()
-
-        turno = TurnoCompleto(
-            id=row["turno_id"],
-            fecha_hora=row["fecha_hora"],
-            estado=row["estado"],
-            motivo=row["motivo"],
-            fecha_creacion=row["fecha_creacion"],
-            clientes_id=row["clientes_id"],
-            horarios_medicos_id=row["horarios_medicos_id"],
-            medico=MedicoPublic(
-                id=row["medico_id"],
-                nombre=row["nombre"],
-                apellido=row["apellido"],
-                especialidad=row["especialidad"],
-                matricula=row["matricula"],
-            ),
-            consultorio=Consultorio(
-                id=row["consultorio_id"],
-                numero=row["numero"],
-                ubicacion=row["ubicacion"],
-                tipo=row["tipo"],
-            ),
-            cliente_nombre_completo=cliente_nombre_completo or "N/A"
-        )
-        turnos.append(turno)
-    return turnos
+    Aplica los filtros comunes de los listados (todos resueltos en SQL).
+    Por defecto solo se lee la tabla `turnos`; el archivo se suma a pedido.
+    """
+    if incluir_historial:
+        consulta.con_historial()
+    if estados:
+        consulta.con_estados(estados)
+    if desde:
+        consulta.desde(desde)
+    if hasta:
+        consulta.hasta(hasta)
+    if ascendente:
+        consulta.ascendente()
+    if limit is not None:
+        consulta.limitar(limit)
+    return consulta.despues_de(cursor)
+
+
+# turnos por id de cliente
+async def get_turnos_cliente_completos(
+    cliente_id: int,
+    estados: Optional[Iterable[EstadoTurno]] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    ascendente: bool = False,
+    incluir_historial: bool = False,
+):
+    consulta = ConsultaTurnos().por_cliente(cliente_id)
+    return await _filtrar(
+        consulta, estados, desde, hasta, limit, cursor, ascendente, incluir_historial
+    ).fetch_all()
 
 
 # turnos que tiene cada medico
-async def get_turnos_medico_completos(medico_id: int):
-    query = """
-        SELECT 
-            t.id AS turno_id, t.fecha_hora, t.estado, t.motivo, t.fecha_creacion,
-            t.clientes_id, t.horarios_medicos_id,
-            m.id AS medico_id, m.nombre, m.apellido, m.especialidad, m.matricula,
-            c.id AS consultorio_id, c.numero, c.ubicacion, c.tipo,
-
-            -- --- AÑADIDO ---
-            cl.nombre AS cliente_nombre,
-            cl.apellido AS cliente_apellido
-            -- --- FIN ---
-            
-        FROM turnos t
-        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-        JOIN medicos m ON hm.medicos_id = m.id
-        JOIN consultorios c ON hm.consultorios_id = c.id
-        
-        -- --- AÑADIDO ---
-        LEFT JOIN clientes cl ON t.clientes_id = cl.id
-        -- --- FIN ---
-        
-        WHERE m.id = :medico_id
-        ORDER BY t.fecha_hora DESC
-    """
-    rows = await db.fetch_all(query=query, values={"medico_id": medico_id})
-
-    turnos = []
-    for row in rows:
-        cliente_nombre_completo = f"{row['cliente_nombre'] or ''} {row['cliente_apellido'] or ''}".strip()
-        
-        turno = TurnoCompleto(
-            id=row["turno_id"],
-            fecha_hora=row["fecha_hora"],
-            estado=row["estado"],
-            motivo=row["motivo"],
-            fecha_creacion=row["fecha_creacion"],
-            clientes_id=row["clientes_id"],
-            horarios_medicos_id=row["horarios_medicos_id"],
-            medico=MedicoPublic(
-                id=row["medico_id"],
-                nombre=row["nombre"],
-                apellido=row["apellido"],
-                especialidad=row["especialidad"],
-                matricula=row["matricula"],
-            ),
-            consultorio=Consultorio(
-                id=row["consultorio_id"],
-                numero=row["numero"],
-                ubicacion=row["ubicacion"],
-                tipo=row["tipo"],
-            ),
-            cliente_nombre_completo=cliente_nombre_completo or "N/A"
-        )
-        turnos.append(turno)
+async def get_turnos_medico_completos(
+    medico_id: int,
+    estados: Optional[Iterable[EstadoTurno]] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    ascendente: bool = False,
+    incluir_historial: bool = False,
+):
+    consulta = ConsultaTurnos().por_medico(medico_id)
+    return await _filtrar(
+        consulta, estados, desde, hasta, limit, cursor, ascendente, incluir_historial
+    ).fetch_all()
+
+
+def consulta_turnos(
+    cliente_id: Optional[int] = None,
+    medico_id: Optional[int] = None,
+    estados: Optional[Iterable[EstadoTurno]] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    ascendente: bool = False,
+    incluir_historial: bool = False,
+) -> ConsultaTurnos:
+    """Consulta filtrada sin ejecutar, para recorrerla en streaming (services/exportacion.py)."""
+    consulta = ConsultaTurnos()
+    if cliente_id is not None:
+        consulta.por_cliente(cliente_id)
+    if medico_id is not None:
+        consulta.por_medico(medico_id)
+    return _filtrar(consulta, estados, desde, hasta, limit, cursor, ascendente, incluir_historial)
+
+
+# Tope de turnos en el PDF de historial (los más recientes)
+MAX_TURNOS_HISTORIAL_PDF = 1000
+
+
+async def get_turno_completo(id: int) -> Optional[dict]:
+    """Un turno completo por id, esté activo o archivado."""
+    return await ConsultaTurnos().con_historial().por_id(id).fetch_one()
+
+
+async def get_historial_cliente(cliente_id: int) -> List[dict]:
+    """Turnos del paciente (activos y archivados) del más viejo al más nuevo, para el PDF."""
+    turnos = await (
+        ConsultaTurnos().con_historial().por_cliente(cliente_id).limitar(MAX_TURNOS_HISTORIAL_PDF).fetch_all()
+    )
+    turnos.reverse()
     return turnos
 
 
@@ -131,68 +135,111 @@ async def get_proximo_turno_cliente(cliente_id: int):
     Busca el turno más próximo en el futuro para un cliente,
     que esté 'pendiente' o 'confirmado'.
     """
-    query = """
-        SELECT 
-            t.id AS turno_id, t.fecha_hora, t.estado, t.motivo, t.fecha_creacion,
-            t.clientes_id, t.horarios_medicos_id,
-            m.id AS medico_id, m.nombre, m.apellido, m.especialidad, m.matricula,
-            c.id AS consultorio_id, c.numero, c.ubicacion, c.tipo,
-
-            -- --- AÑADIDO ---
-            cl.nombre AS cliente_nombre,
-            cl.apellido AS cliente_apellido
-            -- --- FIN ---
-            
-        FROM turnos t
-        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-        JOIN medicos m ON hm.medicos_id = m.id
-        JOIN consultorios c ON hm.consultorios_id = c.id
-        
-        -- --- AÑADIDO ---
-        LEFT JOIN clientes cl ON t.clientes_id = cl.id
-        -- --- FIN ---
-        
-        WHERE t.clientes_id = :cliente_id
-          AND t.estado IN ('pendiente', 'confirmado')
-          AND t.fecha_hora > NOW()
-        ORDER BY t.fecha_hora ASC
-        LIMIT 1
-    """
-    row = await db.fetch_one(query=query, values={"cliente_id": cliente_id})
-
-    if not row:
-        return None
-
-    cliente_nombre_completo = f"{row['cliente_nombre'] or ''} {row['cliente_apellido'] or ''}".strip()
-
-    return TurnoCompleto(
-        id=row["turno_id"],
-        fecha_hora=row["fecha_hora"],
-        estado=row["estado"],
-        motivo=row["motivo"],
-        fecha_creacion=row["fecha_creacion"],
-        clientes_id=row["clientes_id"],
-        horarios_medicos_id=row["horarios_medicos_id"],
-        medico=MedicoPublic(
-            id=row["medico_id"],
-            nombre=row["nombre"],
-            apellido=row["apellido"],
-            especialidad=row["especialidad"],
-            matricula=row["matricula"],
-        ),
-        consultorio=Consultorio(
-            id=row["consultorio_id"],
-            numero=row["numero"],
-            ubicacion=row["ubicacion"],
-            tipo=row["tipo"],
-        ),
-        cliente_nombre_completo=cliente_nombre_completo or "N/A"
+    return await (
+        ConsultaTurnos()
+        .por_cliente(cliente_id)
+        .con_estados([EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO])
+        .futuros()
+        .ascendente()
+        .limitar(1)
+        .fetch_one()
     )
 # -------------------------
 
 
 #funcionando en postman
-async def create_turno(turno: TurnoIn) -> Turno:
+async def create_turno(turno: TurnoIn, idempotency_key: Optional[str] = None) -> Turno:
+    """
+    Reserva un slot. Con `idempotency_key`, los reintentos del mismo cliente
+    con la misma clave devuelven el resultado del primer pedido (o esperan a
+    que termine) en lugar de intentar reservar otra vez.
+    """
+    if idempotency_key is None:
+        return await _reservar_slot(turno)
+    datos = turno.model_dump_json(exclude={"fecha_creacion"})
+    return await cache_idempotencia.ejecutar(
+        (turno.clientes_id, idempotency_key), huella(datos), lambda: _reservar_slot(turno)
+    )
+
+
+async def _reservar_slot(turno: TurnoIn) -> Turno:
+    slot = (turno.horarios_medicos_id, turno.fecha_hora.replace(tzinfo=None))
+    async with _locks_slot.bloquear(slot):
+        # Quien espera detrás del ganador ve el slot ya reservado en el índice
+        # y responde 409 sin volver a llamar al SP
+        if motor.esta_reservado(*slot):
+            raise _slot_ocupado()
+        retencion = retenciones.retenido_por(*slot)
+        if retencion is not None and retencion.cliente_id != turno.clientes_id:
+            raise _slot_ocupado()
+        try:
+            creado = await _llamar_crear_turno(turno)
+        except IntegrityError as e:
+            if not _es_slot_duplicado(e):
+                raise
+            # Lo reservó otro proceso: lo reflejamos en el índice local
+            motor.reservar(*slot)
+            eventos.publicar_slot_ocupado(*slot)
+            raise _slot_ocupado()
+        # La retención del propio paciente se convierte en el turno
+        if retencion is not None:
+            retenciones.soltar(retencion.token)
+        refresco_reportes.marcar(slot[1], horario_id=slot[0])
+        await registrar_paciente(slot[0], turno.clientes_id)
+        eventos.publicar_slot_ocupado(*slot)
+        eventos.publicar_turno_creado(creado["id"], slot[0])
+        return creado
+
+
+# --- Retenciones temporales de slots (checkout) ---------------------------
+
+async def retener_slot(
+    cliente_id: int, horario_id: int, fecha_hora: datetime, segundos: Optional[int] = None
+) -> Retencion:
+    """Aparta un slot libre para el paciente mientras completa la reserva."""
+    fecha_hora = fecha_hora.replace(tzinfo=None)
+    await motor.asegurar_cargado()
+    if not motor.es_slot_valido(horario_id, fecha_hora):
+        raise HTTPException(status_code=404, detail="El horario no tiene un turno en esa fecha y hora")
+    if fecha_hora <= datetime.now():
+        raise HTTPException(status_code=400, detail="No se puede apartar un turno pasado")
+    if motor.esta_reservado(horario_id, fecha_hora):
+        raise _slot_ocupado()
+    retencion = retenciones.retener(cliente_id, horario_id, fecha_hora, segundos or RETENCION_SEGUNDOS)
+    # Mientras dura no se ofrece: para los demás pacientes es un slot ocupado
+    eventos.publicar_slot_ocupado(horario_id, fecha_hora)
+    return retencion
+
+
+def _retencion_propia(token: str, cliente_id: int) -> Retencion:
+    retencion = retenciones.obtener(token)
+    if retencion is None or retencion.cliente_id != cliente_id:
+        raise HTTPException(status_code=404, detail="La retención no existe o ya venció")
+    return retencion
+
+
+async def confirmar_retencion(
+    token: str, cliente_id: int, motivo: str, idempotency_key: Optional[str] = None
+) -> Turno:
+    """Convierte la retención en un turno pendiente."""
+    retencion = _retencion_propia(token, cliente_id)
+    turno = TurnoIn(
+        fecha_hora=retencion.fecha_hora,
+        estado=EstadoTurno.PENDIENTE,
+        motivo=motivo,
+        clientes_id=cliente_id,
+        horarios_medicos_id=retencion.horarios_medicos_id,
+    )
+    return await create_turno(turno, idempotency_key)
+
+
+def liberar_retencion(token: str, cliente_id: int) -> None:
+    retencion = retenciones.soltar(_retencion_propia(token, cliente_id).token)
+    if retencion is not None:
+        eventos.publicar_slot_liberado(retencion.horarios_medicos_id, retencion.fecha_hora)
+
+
+async def _llamar_crear_turno(turno: TurnoIn) -> Turno:
     query = """
         CALL crear_turno(:p_cliente_id, :p_horarios_medico_id, :p_fecha_hora, :p_motivo)
     """
@@ -210,108 +257,195 @@ async def create_turno(turno: TurnoIn) -> Turno:
         raise HTTPException(status_code=400, detail=error_detail)
 
     turno_id = row["id"]
+    motor.reservar(turno.horarios_medicos_id, turno.fecha_hora)
     return{**turno.dict(),"id":turno_id,"estado":"pendiente"}  #type: ignore
 
 
 async def update_turno(id: int, turno: TurnoIn) -> Turno:
+    """
+    Edita los datos de un turno. El estado no se cambia acá: se conserva el
+    guardado (las transiciones van por confirmar/cancelar y PUT /estado, que
+    las validan). Si el turno activo pasa a otro slot, se aplican los mismos
+    controles que al reservar: slot válido, lock por slot, reservas y retenciones.
+    """
     try:
-        query = """
-            UPDATE turnos
-            SET fecha_hora = :fecha_hora,
-                estado = :estado,
-                motivo = :motivo,
-                fecha_creacion = :fecha_creacion,
-                clientes_id = :clientes_id,
-                horarios_medicos_id = :horarios_medicos_id
-            WHERE id = :id
-        """
-        
-        values = {**turno.dict(), "id": id}
-        await db.execute(query=query, values=values)
-        return {**turno.dict(), "id": id} #type: ignore
+        # El turno puede cambiar de día o de médico: se recalculan ambos resúmenes
+        anterior = await db.fetch_one(
+            query="SELECT horarios_medicos_id, fecha_hora, clientes_id, estado FROM turnos WHERE id = :id",
+            values={"id": id},
+        )
+        if anterior is None:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
+        estado = EstadoTurno(anterior["estado"])
+        nuevo = (turno.horarios_medicos_id, turno.fecha_hora.replace(tzinfo=None))
+        if (anterior["horarios_medicos_id"], anterior["fecha_hora"]) == nuevo:
+            return await _guardar_edicion(id, turno, anterior, estado)
+
+        await motor.asegurar_cargado()
+        if not motor.es_slot_valido(*nuevo):
+            raise HTTPException(status_code=404, detail="El horario no tiene un turno en esa fecha y hora")
+        if estado not in (EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO):
+            # Un turno finalizado no ocupa el slot: no compite con nadie
+            return await _guardar_edicion(id, turno, anterior, estado)
+        async with _locks_slot.bloquear(nuevo):
+            if motor.esta_reservado(*nuevo):
+                raise _slot_ocupado()
+            retencion = retenciones.retenido_por(*nuevo)
+            if retencion is not None and retencion.cliente_id != turno.clientes_id:
+                raise _slot_ocupado()
+            editado = await _guardar_edicion(id, turno, anterior, estado)
+            if retencion is not None:
+                retenciones.soltar(retencion.token)
+            return editado
 
     except HTTPException:
         raise
+    except IntegrityError as e:
+        if _es_slot_duplicado(e):
+            raise _slot_ocupado()
+        raise HTTPException(status_code=500, detail=f"Error al actualizar turno: {str(e)}")
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al actualizar turno: {str(e)}"
         )
-    
 
-async def update_estado_turno(id: int, estado: EstadoTurno) -> TurnoCompleto:
-    """Actualiza solo el estado de un turno."""
-    try:
-        query_select = "SELECT * FROM turnos WHERE id = :id"
-        turno_db = await db.fetch_one(query=query_select, values={"id": id})
-        
-        if not turno_db:
-            raise HTTPException(status_code=404, detail="Turno no encontrado")
 
-        query_update = """
-            UPDATE turnos
-            SET estado = :estado
-            WHERE id = :id
-        """
-        await db.execute(query=query_update, values={"estado": estado.value, "id": id})
-        
-        query_completo = """
-            SELECT 
-                t.id AS turno_id, t.fecha_hora, t.estado, t.motivo, t.fecha_creacion,
-                t.clientes_id, t.horarios_medicos_id,
-                m.id AS medico_id, m.nombre, m.apellido, m.especialidad, m.matricula,
-                c.id AS consultorio_id, c.numero, c.ubicacion, c.tipo,
-                cl.nombre AS cliente_nombre,
-                cl.apellido AS cliente_apellido
-            FROM turnos t
-            JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
-            JOIN medicos m ON hm.medicos_id = m.id
-            JOIN consultorios c ON hm.consultorios_id = c.id
-            LEFT JOIN clientes cl ON t.clientes_id = cl.id
-            WHERE t.id = :id
-        """
-        row = await db.fetch_one(query=query_completo, values={"id": id})
-
-        if not row:
-             raise HTTPException(status_code=404, detail="Turno no encontrado post-actualización.")
-
-        cliente_nombre_completo = f"{row['cliente_nombre'] or ''} {row['cliente_apellido'] or ''}".strip()
-
-        return TurnoCompleto(
-            id=row["turno_id"],
-            fecha_hora=row["fecha_hora"],
-            estado=row["estado"],
-            motivo=row["motivo"],
-            fecha_creacion=row["fecha_creacion"],
-            clientes_id=row["clientes_id"],
-            horarios_medicos_id=row["horarios_medicos_id"],
-            medico=MedicoPublic(
-                id=row["medico_id"],
-                nombre=row["nombre"],
-                apellido=row["apellido"],
-                especialidad=row["especialidad"],
-                matricula=row["matricula"],
-            ),
-            consultorio=Consultorio(
-                id=row["consultorio_id"],
-                numero=row["numero"],
-                ubicacion=row["ubicacion"],
-                tipo=row["tipo"],
-            ),
-            cliente_nombre_completo=cliente_nombre_completo or "N/A"
-        )
+async def _guardar_edicion(id: int, turno: TurnoIn, anterior, estado: EstadoTurno) -> Turno:
+    query = """
+        UPDATE turnos
+        SET fecha_hora = :fecha_hora,
+            motivo = :motivo,
+            fecha_creacion = :fecha_creacion,
+            clientes_id = :clientes_id,
+            horarios_medicos_id = :horarios_medicos_id
+        WHERE id = :id
+    """
+    values = {**turno.dict(exclude={"estado"}), "id": id}
+    await db.execute(query=query, values=values)
+    refresco_reportes.marcar(anterior["fecha_hora"], horario_id=anterior["horarios_medicos_id"])
+    refresco_reportes.marcar(turno.fecha_hora, horario_id=turno.horarios_medicos_id)
+    # Si cambió el paciente o el horario, el par anterior puede haber quedado sin turnos
+    await registrar_paciente(turno.horarios_medicos_id, turno.clientes_id)
+    if (anterior["horarios_medicos_id"], anterior["clientes_id"]) != (turno.horarios_medicos_id, turno.clientes_id):
+        await revisar_paciente(anterior["horarios_medicos_id"], anterior["clientes_id"])
+    _publicar_edicion(anterior, turno, estado)
+    return {**turno.dict(), "estado": estado.value, "id": id}  # type: ignore
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al actualizar estado del turno: {str(e)}"
-        )
+
+def _publicar_edicion(anterior, turno: TurnoIn, estado: EstadoTurno) -> None:
+    """
+    Eventos de disponibilidad al editar un turno (puede cambiar de slot). Un
+    slot tiene a lo sumo un turno activo, así que el índice se puede ajustar
+    ya, sin esperar a la recarga de reservas.
+    """
+    if estado not in (EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO):
+        return
+    nuevo = (turno.horarios_medicos_id, turno.fecha_hora.replace(tzinfo=None))
+    if (anterior["horarios_medicos_id"], anterior["fecha_hora"]) != nuevo:
+        motor.liberar(anterior["horarios_medicos_id"], anterior["fecha_hora"])
+        eventos.publicar_slot_liberado(anterior["horarios_medicos_id"], anterior["fecha_hora"])
+        motor.reservar(*nuevo)
+        eventos.publicar_slot_ocupado(*nuevo)
+
+
+# Estados desde los que se puede pasar a cada estado. Incluir el propio estado
+# destino hace idempotente repetir la misma transición (p. ej. un doble clic).
+TRANSICIONES_VALIDAS = {
+    EstadoTurno.PENDIENTE: (),
+    EstadoTurno.CONFIRMADO: (EstadoTurno.PENDIENTE,),
+    EstadoTurno.CANCELADO: (EstadoTurno.PENDIENTE, EstadoTurno.CONFIRMADO),
+    EstadoTurno.COMPLETADO: (EstadoTurno.CONFIRMADO,),
+}
+
+
+async def _cambiar_estado(ids: List[int], estado: EstadoTurno, medico_id: Optional[int] = None) -> List[dict]:
+    """
+    Un UPDATE condicional (solo filas en un estado de origen válido) y un
+    SELECT de los turnos completos. Si algún id no existe -> 404; si alguno
+    quedó en otro estado es porque la transición no era válida -> 409.
+    """
+    origenes = [e.value for e in TRANSICIONES_VALIDAS[estado]] + [estado.value]
+    marcadores_ids = ", ".join(f":id_{i}" for i in range(len(ids)))
+    marcadores_origen = ", ".join(f":origen_{i}" for i in range(len(origenes)))
+    values = {
+        "estado": estado.value,
+        **{f"id_{i}": v for i, v in enumerate(ids)},
+        **{f"origen_{i}": v for i, v in enumerate(origenes)},
+    }
+    filtro_medico = ""
+    if medico_id is not None:
+        filtro_medico = "AND hm.medicos_id = :medico_id"
+        values["medico_id"] = medico_id
+    query = f"""
+        UPDATE turnos t
+        JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+        SET t.estado = :estado
+        WHERE t.id IN ({marcadores_ids}) AND t.estado IN ({marcadores_origen}) {filtro_medico}
+    """
+    await db.execute(query=query, values=values)
+
+    consulta = ConsultaTurnos().por_ids(ids)
+    if medico_id is not None:
+        consulta.por_medico(medico_id)
+    turnos = await consulta.fetch_all()
+
+    encontrados = {t["id"] for t in turnos}
+    faltantes = [i for i in ids if i not in encontrados]
+    if faltantes:
+        raise HTTPException(status_code=404, detail=f"Turnos no encontrados: {faltantes}")
+    invalidos = [t for t in turnos if t["estado"] != estado.value]
+    if invalidos:
+        detalle = ", ".join(f"{t['id']} ({t['estado']})" for t in invalidos)
+        raise HTTPException(status_code=409, detail=f"No se puede pasar a '{estado.value}' desde el estado actual: {detalle}")
+    return turnos
+
+
+def _sincronizar_motor(turnos: List[dict], estado: EstadoTurno) -> None:
+    for turno in turnos:
+        if estado in (EstadoTurno.CANCELADO, EstadoTurno.COMPLETADO):
+            motor.liberar(turno["horarios_medicos_id"], turno["fecha_hora"])
+            eventos.publicar_slot_liberado(turno["horarios_medicos_id"], turno["fecha_hora"])
+        else:
+            motor.reservar(turno["horarios_medicos_id"], turno["fecha_hora"])
+        refresco_reportes.marcar(turno["fecha_hora"], medico_id=turno["medico"]["id"])
+        eventos.publicar_turno_estado(turno)
+
+
+async def update_estado_turno(id: int, estado: EstadoTurno, medico_id: Optional[int] = None) -> TurnoCompleto:
+    """Actualiza solo el estado de un turno (valida la transición). Con `medico_id`, solo si es de su agenda."""
+    turnos = await _cambiar_estado([id], estado, medico_id)
+    _sincronizar_motor(turnos, estado)
+    return turnos[0]  # type: ignore
+
+
+async def update_estado_turnos(ids: List[int], estado: EstadoTurno, medico_id: Optional[int] = None) -> List[TurnoCompleto]:
+    """
+    Cambia el estado de varios turnos en una transacción: o pasan todos o
+    ninguno (un id inexistente o una transición inválida revierte el lote).
+    """
+    ids = list(dict.fromkeys(ids))
+    async with db.transaction():
+        turnos = await _cambiar_estado(ids, estado, medico_id)
+    _sincronizar_motor(turnos, estado)
+    return turnos  # type: ignore
 # -------------------------
 
 
 async def delete_turno(id: int) -> dict:
+    # Leemos el slot antes de borrar para liberarlo en el índice de disponibilidad
+    slot = await db.fetch_one(
+        query="SELECT horarios_medicos_id, fecha_hora, clientes_id FROM turnos WHERE id = :id",
+        values={"id": id},
+    )
     query = "DELETE FROM turnos WHERE id = :id"
     result = await db.execute(query=query, values={"id": id})
     if not result:
         raise HTTPException(status_code=404,detail="Cliente no encontrado")
+    if slot:
+        motor.liberar(slot["horarios_medicos_id"], slot["fecha_hora"])
+        refresco_reportes.marcar(slot["fecha_hora"], horario_id=slot["horarios_medicos_id"])
+        await revisar_paciente(slot["horarios_medicos_id"], slot["clientes_id"])
+        eventos.publicar_slot_liberado(slot["horarios_medicos_id"], slot["fecha_hora"])
+        eventos.publicar_turno_eliminado(id, slot["horarios_medicos_id"])
     return {"message": "Turno eliminado correctamente"}
\ No newline at end of file
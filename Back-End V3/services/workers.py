@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Hashable
+from fastapi import HTTPException
+
+
+class PoolAcotado:
+    """
+    Pool de hilos para trabajo bloqueante (CPU) fuera del event loop.
+
+    Limita los hilos (`max_workers`) y también cuántos trabajos pueden esperar
+    en cola (`max_cola`). Si la cola está llena se responde 503 enseguida, en
+    lugar de acumular pedidos que igual van a terminar en timeout.
+    """
+
+    def __init__(self, nombre: str, max_workers: int, max_cola: int):
+        self.nombre = nombre
+        self.max_workers = max_workers
+        self.max_cola = max_cola
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=nombre)
+        # Solo se tocan desde el event loop, no hace falta lock
+        self._en_curso = 0
+        self.rechazados = 0
+        self.completados = 0
+
+    @property
+    def en_cola(self) -> int:
+        return max(0, self._en_curso - self.max_workers)
+
+    async def ejecutar(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._en_curso >= self.max_workers + self.max_cola:
+            self.rechazados += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Servidor ocupado, intentá nuevamente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        self._en_curso += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args))
+        finally:
+            self._en_curso -= 1
+            self.completados += 1
+
+    def metricas(self) -> dict:
+        return {
+            "pool": self.nombre,
+            "max_workers": self.max_workers,
+            "max_cola": self.max_cola,
+            "en_curso": self._en_curso,
+            "en_cola": self.en_cola,
+            "completados": self.completados,
+            "rechazados": self.rechazados,
+        }
+
+    def cerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LocksPorClave:
+    """
+    Un `asyncio.Lock` por clave (p. ej. por slot de turno), creado a demanda.
+
+    Los locks se eliminan cuando nadie los usa, así que la memoria es
+    proporcional a las claves con pedidos en curso y no a todas las vistas.
+    Solo sirve dentro de un proceso; entre workers la garantía la da la BD.
+    """
+
+    def __init__(self):
+        # clave -> [lock, cantidad de corrutinas que lo usan o esperan]
+        self._locks: Dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def bloquear(self, clave: Hashable) -> AsyncIterator[None]:
+        entrada = self._locks.get(clave)
+        if entrada is None:
+            entrada = self._locks[clave] = [asyncio.Lock(), 0]
+        entrada[1] += 1
+        try:
+            async with entrada[0]:
+                yield
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del self._locks[clave]
@@ -0,0 +1,4 @@
+-- Duración (en minutos) de cada turno dentro de un bloque de horario.
+-- NULL mantiene el comportamiento anterior: un único turno en hora_inicio.
+ALTER TABLE horarios_medicos
+    ADD COLUMN duracion_slot SMALLINT UNSIGNED NULL DEFAULT NULL AFTER hora_fin;
@@ -0,0 +1,15 @@
+-- Índices compuestos para los listados paginados de turnos (keyset sobre
+-- fecha_hora, id) y para las consultas de disponibilidad.
+
+-- /turnos/cliente/{id}: WHERE clientes_id = ? [AND fecha_hora ...] ORDER BY fecha_hora, id
+CREATE INDEX idx_turnos_cliente_fecha ON turnos (clientes_id, fecha_hora, id);
+
+-- /turnos/medico/{id}: se llega por horarios_medicos.medicos_id y luego por slot.
+-- Del lado de horarios_medicos alcanza el índice de la clave foránea medicos_id:
+-- en InnoDB un índice secundario ya lleva la PK, así que equivale a (medicos_id, id).
+-- (Si se aplicó una versión anterior de este archivo, sobra el duplicado:
+--  DROP INDEX idx_horarios_medico ON horarios_medicos;)
+CREATE INDEX idx_turnos_horario_fecha ON turnos (horarios_medicos_id, fecha_hora, id);
+
+-- Reservas activas futuras (índice de disponibilidad) y filtros por estado
+CREATE INDEX idx_turnos_estado_fecha ON turnos (estado, fecha_hora);
@@ -0,0 +1,19 @@
+-- Un solo turno activo (pendiente o confirmado) por slot.
+--
+-- slot_activo vale 1 para los turnos activos y NULL para cancelados/completados.
+-- Como un índice UNIQUE admite varios NULL, los turnos cancelados no bloquean
+-- volver a reservar el mismo slot, pero dos turnos activos en el mismo
+-- (horarios_medicos_id, fecha_hora) fallan con ER_DUP_ENTRY (1062), que la API
+-- devuelve como 409.
+--
+-- Antes de aplicarla, verificar que no haya duplicados activos:
+--   SELECT horarios_medicos_id, fecha_hora, COUNT(*)
+--   FROM turnos
+--   WHERE estado IN ('pendiente', 'confirmado')
+--   GROUP BY horarios_medicos_id, fecha_hora
+--   HAVING COUNT(*) > 1;
+
+ALTER TABLE turnos
+    ADD COLUMN slot_activo TINYINT
+        AS (IF(estado IN ('pendiente', 'confirmado'), 1, NULL)) STORED,
+    ADD UNIQUE INDEX uq_turnos_slot_activo (horarios_medicos_id, fecha_hora, slot_activo);
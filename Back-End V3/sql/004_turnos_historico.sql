@@ -0,0 +1,18 @@
+-- Archivo de turnos finalizados (completados o cancelados) con cierta antigüedad.
+--
+-- Misma estructura e índices que `turnos` (incluye los de 002) pero sin
+-- claves foráneas, más la fecha en que se archivó cada fila. Lo llena por
+-- lotes services/archivo_turnos.py (o scripts/archivar_turnos.py) y la API lo
+-- lee solo si el pedido trae `incluir_historial=true`.
+--
+-- LIKE también copia la columna generada slot_activo y el índice único de 003:
+-- en el archivo no tienen sentido (todos sus turnos están finalizados) y un
+-- índice único de más solo puede hacer que el INSERT del archivado descarte
+-- filas, así que se quitan.
+
+CREATE TABLE IF NOT EXISTS turnos_historico LIKE turnos;
+
+ALTER TABLE turnos_historico
+    DROP INDEX uq_turnos_slot_activo,
+    DROP COLUMN slot_activo,
+    ADD COLUMN archivado_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
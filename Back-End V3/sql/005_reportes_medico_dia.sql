@@ -0,0 +1,36 @@
+-- Resumen diario por médico para los reportes y el panel del médico.
+--
+-- Una fila por (médico, día) con la cantidad de turnos en cada estado y los
+-- pacientes distintos. services/reportes.py la recalcula por celda cuando
+-- cambia un turno de ese día, así que los reportes leen O(días) filas por PK
+-- en lugar de agregar todos los turnos. La capacidad (slots programados) se
+-- calcula al leer, a partir de los horarios vigentes.
+
+CREATE TABLE IF NOT EXISTS reportes_medico_dia (
+    medicos_id        INT NOT NULL,
+    fecha             DATE NOT NULL,
+    reservados        INT UNSIGNED NOT NULL DEFAULT 0,
+    pendientes        INT UNSIGNED NOT NULL DEFAULT 0,
+    confirmados       INT UNSIGNED NOT NULL DEFAULT 0,
+    cancelados        INT UNSIGNED NOT NULL DEFAULT 0,
+    completados       INT UNSIGNED NOT NULL DEFAULT 0,
+    pacientes_unicos  INT UNSIGNED NOT NULL DEFAULT 0,
+    actualizado_en    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (medicos_id, fecha)
+);
+
+-- Carga inicial con todo lo existente (turnos activos + archivo de 004)
+INSERT INTO reportes_medico_dia
+    (medicos_id, fecha, reservados, pendientes, confirmados, cancelados, completados, pacientes_unicos)
+SELECT
+    hm.medicos_id, DATE(t.fecha_hora), COUNT(*),
+    SUM(t.estado = 'pendiente'), SUM(t.estado = 'confirmado'),
+    SUM(t.estado = 'cancelado'), SUM(t.estado = 'completado'),
+    COUNT(DISTINCT t.clientes_id)
+FROM (
+    SELECT horarios_medicos_id, fecha_hora, estado, clientes_id FROM turnos
+    UNION ALL
+    SELECT horarios_medicos_id, fecha_hora, estado, clientes_id FROM turnos_historico
+) t
+JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id
+GROUP BY hm.medicos_id, DATE(t.fecha_hora);
@@ -0,0 +1,22 @@
+-- Pacientes distintos de cada médico, para el panel del médico.
+--
+-- Una fila por (médico, paciente) con al menos un turno, activo o archivado.
+-- services/reportes.py la mantiene al crear, editar y borrar turnos, así que
+-- "pacientes totales" es un COUNT(*) sobre un rango de la PK en lugar de un
+-- COUNT(DISTINCT clientes_id) sobre todos los turnos del médico.
+
+CREATE TABLE IF NOT EXISTS medico_pacientes (
+    medicos_id   INT NOT NULL,
+    clientes_id  INT NOT NULL,
+    PRIMARY KEY (medicos_id, clientes_id)
+);
+
+-- Carga inicial con todo lo existente (turnos activos + archivo de 004)
+INSERT IGNORE INTO medico_pacientes (medicos_id, clientes_id)
+SELECT DISTINCT hm.medicos_id, t.clientes_id
+FROM (
+    SELECT horarios_medicos_id, clientes_id FROM turnos
+    UNION ALL
+    SELECT horarios_medicos_id, clientes_id FROM turnos_historico
+) t
+JOIN horarios_medicos hm ON t.horarios_medicos_id = hm.id;
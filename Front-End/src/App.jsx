@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect } from 'react';
 import { Routes, Route, useNavigate, useLocation } from 'react-router-dom';
 import { AnimatePresence, motion } from 'framer-motion'; //eslint-disable-line
 import './App.css'; 
@@ -12,6 +12,10 @@ import Register from './pages/Register';
 
 // --- 1. Importaciones de Rutas Protegidas ---
 import ProtectedRoute from './components/ProtectedRoute'; // Asegúrate de tener este componente
+import { refreshAccessToken } from './utils/auth';
+
+// El access token dura 15 minutos; lo renovamos antes de que venza
+const REFRESH_INTERVAL_MS = 10 * 60 * 1000;
 
 // Cliente
 import Dashboard from './pages/Dashboard'; 
@@ -34,6 +38,12 @@ function App() {
 	const handleVerTurnos = () => navigate('/turnos');
 	const handleIngresar = () => navigate('/login');
 
+	useEffect(() => {
+		refreshAccessToken();
+		const intervalId = setInterval(refreshAccessToken, REFRESH_INTERVAL_MS);
+		return () => clearInterval(intervalId);
+	}, []);
+
 	return (
 		<div className='min-h-screen flex flex-col bg-slate-900 text-slate-100'>
 			<Header />
@@ -2,17 +2,12 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import logo from '../assets/logojava.png';
 import { jwtDecode } from 'jwt-decode'; // 1. Importa jwtDecode
+import { logout } from '../utils/auth';
 
 const isLoggedIn = () => {
 	return !!localStorage.getItem('accessToken');
 };
 
-const logout = () => {
-	localStorage.removeItem('accessToken');
-	localStorage.removeItem('tokenType');
-  window.dispatchEvent(new Event('authChange'));
-};
-
 function Header() {
 	const navigate = useNavigate();
 	const [loggedIn, setLoggedIn] = useState(isLoggedIn());
@@ -1,7 +1,6 @@
-import React from 'react';
+import React, { useState } from 'react';
 import { motion } from 'framer-motion'; //eslint-disable-line
-import { PDFDownloadLink } from '@react-pdf/renderer';
-import ComprobantePDF from './ComprobantePDF';
+import { descargarArchivo } from '../utils/descargas';
 
 // --- 1. AÑADIR ESTOS HELPERS ---
 const formatFecha = (isoString) => {
@@ -43,6 +42,21 @@ function TurnoDetalleModal({ turno, onClose }) {
     e.stopPropagation();
   };
 
+  // El comprobante se genera (y cachea) en el servidor
+  const [generando, setGenerando] = useState(false);
+  const [errorPDF, setErrorPDF] = useState(null);
+  const descargarComprobante = async () => {
+    setGenerando(true);
+    setErrorPDF(null);
+    try {
+      await descargarArchivo(`http://localhost:8000/turnos/${turno.id}/comprobante.pdf`, `comprobante_turno_${turno.id}.pdf`);
+    } catch (err) {
+      setErrorPDF(err.message);
+    } finally {
+      setGenerando(false);
+    }
+  };
+
   // --- 2. USAR HELPERS AQUÍ ---
   const fecha = formatFecha(turno.fecha_hora);
   const hora = formatHora(turno.fecha_hora);
@@ -115,32 +129,32 @@ function TurnoDetalleModal({ turno, onClose }) {
            {turno.fecha_creacion && (<div className="rounded-md border border-slate-200 bg-slate-50 p-4"><p className="text-sm text-slate-600">Turno solicitado el:</p><p className="mt-1 text-sm text-slate-800">{new Date(turno.fecha_creacion).toLocaleString()}</p></div>)}
         </div>
 
+        {errorPDF && <p className="px-5 pb-2 text-sm text-rose-600">{errorPDF}</p>}
         {/* Footer (Acciones) */}
         <div className="flex-shrink-0 flex flex-col sm:flex-row items-center justify-end gap-3 border-t border-slate-200 p-5 bg-slate-50 rounded-b-xl">
            <button type="button" onClick={onClose} className="w-full sm:w-auto inline-flex items-center justify-center gap-2 rounded-md bg-emerald-600 px-4 py-2 text-sm font-semibold text-white shadow hover:bg-emerald-700 focus:outline-none focus:ring-2 focus:ring-emerald-400 disabled:opacity-60">Cerrar</button>
 
-           <PDFDownloadLink
-              document={<ComprobantePDF turno={turno} />}
-              fileName={`comprobante_turno_${turno.id}.pdf`}
+           <button
+              type="button"
+              onClick={descargarComprobante}
+              disabled={generando}
               className="w-full sm:w-auto inline-flex items-center justify-center gap-2 rounded-md bg-emerald-600 px-4 py-2 text-sm font-semibold text-white shadow hover:bg-emerald-700 focus:outline-none focus:ring-2 focus:ring-emerald-400 disabled:opacity-60"
            >
-             {({ loading, blob: _blob, url: _url, error: _error }) => { //eslint-disable-line
-                return loading ? (
-                  <>
-                    <svg className="animate-spin h-5 w-5 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
-                        <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
-                        <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
-                    </svg>
-                    Generando...
-                  </>
-                ) : (
-                  <>
-                    <IconoPDF />
-                    Descargar Comprobante
-                  </>
-                );
-             }}
-           </PDFDownloadLink>
+             {generando ? (
+               <>
+                 <svg className="animate-spin h-5 w-5 text-white" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
+                     <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
+                     <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
+                 </svg>
+                 Generando...
+               </>
+             ) : (
+               <>
+                 <IconoPDF />
+                 Descargar Comprobante
+               </>
+             )}
+           </button>
         </div>
       </motion.div>
     </motion.div>
@@ -1,4 +1,4 @@
-import React from 'react'; // Importa React
+import React, { useState, useEffect } from 'react'; // Importa React
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion'; //eslint-disable-line
 
@@ -33,6 +33,20 @@ function Card({ title, description, actionLabel, onAction, icon }) {
 
 function AdminDashboard() {
   const navigate = useNavigate();
+  // Resumen de ocupación de las últimas 4 semanas (GET /admin/ocupacion)
+  const [ocupacion, setOcupacion] = useState(null);
+
+  useEffect(() => {
+    const token = localStorage.getItem('accessToken');
+    if (!token) return;
+    fetch('http://localhost:8000/admin/ocupacion', { headers: { 'Authorization': `Bearer ${token}` } })
+      .then((response) => (response.ok ? response.json() : null))
+      .then(setOcupacion)
+      .catch((err) => console.error('Error al obtener la ocupación:', err));
+  }, []);
+
+  const mostrar = (valor) => (valor === null || valor === undefined ? '—' : valor);
+  const ocupacionTotal = ocupacion?.totales?.ocupacion;
 
   return (
     // Estructura principal con animación
@@ -141,7 +155,10 @@ function AdminDashboard() {
                     Usuarios activos: <span className="font-medium text-slate-800">—</span> | Turnos hoy: <span className="font-medium text-slate-800">—</span>
                   </p>
                   <p className="mt-1 text-slate-600 text-sm">
-                    Profesionales: <span className="font-medium text-slate-800">—</span> | Consultorios: <span className="font-medium text-slate-800">—</span>
+                    Profesionales: <span className="font-medium text-slate-800">{mostrar(ocupacion?.medicos.length)}</span> | Consultorios: <span className="font-medium text-slate-800">{mostrar(ocupacion?.consultorios.length)}</span>
+                  </p>
+                  <p className="mt-1 text-slate-600 text-sm">
+                    Ocupación (4 semanas): <span className="font-medium text-slate-800">{ocupacionTotal === null || ocupacionTotal === undefined ? '—' : `${Math.round(ocupacionTotal * 100)}%`}</span>
                   </p>
                 </div>
                 <div className="shrink-0">
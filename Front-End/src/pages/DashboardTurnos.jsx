@@ -153,7 +153,7 @@ function DashboardTurnos() {
     setError(null);
     try {
         console.log(`DashboardTurnos: Fetching turnos para cliente ID: ${idUsuario}`);
-        const response = await fetch(`http://localhost:8000/turnos/cliente/${idUsuario}`, {
+        const response = await fetch(`http://localhost:8000/turnos/cliente/${idUsuario}?incluir_historial=true`, {
             headers: { 'Authorization': `Bearer ${token}` }
         });
         if (!response.ok) {
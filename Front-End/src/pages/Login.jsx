@@ -46,6 +46,7 @@ function Login() {
 			const token = data.access_token;
 			localStorage.setItem('accessToken', token);
 			localStorage.setItem('tokenType', data.token_type);
+			if (data.refresh_token) localStorage.setItem('refreshToken', data.refresh_token);
 
 			// --- CAMBIO PRINCIPAL: Decodificar y Redirigir ---
 			try {
@@ -2,8 +2,7 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { jwtDecode } from 'jwt-decode';
 import Alert from '../components/Alert';
-import { PDFDownloadLink } from '@react-pdf/renderer';
-import HistorialMedicoPDF from '../components/HistorialMedicoPDF'; // Importamos el nuevo PDF
+import { descargarArchivo } from '../utils/descargas';
 
 // Reutilizamos el layout
 function MedicoPageLayout({ title, children }) {
@@ -38,7 +37,8 @@ function MedicoPageLayout({ title, children }) {
 function MedicoHistorial() {
   const [historial, setHistorial] = useState([]);
   const [pacientesMap, setPacientesMap] = useState(new Map());
-  const [medicoInfo, setMedicoInfo] = useState(null);
+  // Id del turno cuyo PDF se está descargando
+  const [descargando, setDescargando] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
@@ -47,39 +47,31 @@ function MedicoHistorial() {
     setIsLoading(true);
     setError(null);
     try {
-      // 1. Obtener todos los turnos del médico
-      const turnosResponse = await fetch(`http://localhost:8000/turnos/medico/${medicoId}`, {
+      // 1. Obtener el historial del médico (completados o cancelados), filtrado en el backend
+      const turnosResponse = await fetch(`http://localhost:8000/turnos/medico/${medicoId}?estado=completado&estado=cancelado&incluir_historial=true`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (!turnosResponse.ok) throw new Error('Error al obtener los turnos');
       const turnosData = await turnosResponse.json();
       
-      // Guardamos la info del médico del primer turno (será la misma para todos)
-      if (turnosData.length > 0) {
-        setMedicoInfo(turnosData[0].medico);
-      }
-
-      // 2. Filtrar por historial (completados o cancelados)
-      const turnosPasados = turnosData.filter(
-        t => t.estado === 'completado' || t.estado === 'cancelado'
-      );
+      const turnosPasados = turnosData;
       setHistorial(turnosPasados);
 
-      // 3. Obtener IDs de pacientes únicos de esos turnos
+      // 2. Obtener IDs de pacientes únicos de esos turnos
       const pacienteIds = [...new Set(turnosPasados.map(t => t.clientes_id))];
 
       if (pacienteIds.length === 0) return;
 
-      // 4. Buscar la información de cada paciente
-      const fetchesPacientes = pacienteIds.map(id =>
-        fetch(`http://localhost:8000/clientes/${id}`, {
-          headers: { 'Authorization': `Bearer ${token}` }
-        }).then(res => res.ok ? res.json() : null)
-      );
-
-      const pacientesData = await Promise.all(fetchesPacientes);
+      // 3. Buscar la información de todos los pacientes en un solo pedido (de a 500 ids)
       const newPacientesMap = new Map();
-      pacientesData.filter(Boolean).forEach(p => newPacientesMap.set(p.id, p));
+      for (let i = 0; i < pacienteIds.length; i += 500) {
+        const ids = pacienteIds.slice(i, i + 500).join(',');
+        const res = await fetch(`http://localhost:8000/clientes/?ids=${ids}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) throw new Error('Error al obtener los pacientes');
+        (await res.json()).forEach(p => newPacientesMap.set(p.id, p));
+      }
       setPacientesMap(newPacientesMap);
 
     } catch (err) {
@@ -107,6 +99,34 @@ function MedicoHistorial() {
     }
   }, [navigate, fetchHistorial]);
 
+  // Descarga del historial completo en CSV (el backend lo genera en streaming)
+  const exportarCSV = async () => {
+    try {
+      const { id } = jwtDecode(localStorage.getItem('accessToken'));
+      await descargarArchivo(
+        `http://localhost:8000/turnos/medico/${id}/exportar?formato=csv&estado=completado&estado=cancelado&incluir_historial=true`,
+        'historial_turnos.csv'
+      );
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
+  // El PDF del historial del paciente se genera en el servidor
+  const descargarHistorialPDF = async (turno, paciente) => {
+    setDescargando(turno.id);
+    try {
+      await descargarArchivo(
+        `http://localhost:8000/turnos/cliente/${turno.clientes_id}/historial.pdf`,
+        `historial_${turno.clientes_id}_${paciente.apellido}.pdf`
+      );
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setDescargando(null);
+    }
+  };
+
   const getPaciente = (id) => {
     return pacientesMap.get(id) || { nombre: 'Cargando...', apellido: '', dni: '', email: '', fecha_nacimiento: '' };
   };
@@ -118,6 +138,15 @@ function MedicoHistorial() {
       {!isLoading && !error && (
         historial.length > 0 ? (
           <div className="overflow-x-auto">
+            <div className="mb-4 flex justify-end">
+              <button
+                type="button"
+                onClick={exportarCSV}
+                className="inline-flex items-center justify-center gap-1 rounded-md bg-slate-700 px-3 py-1.5 text-white text-xs font-semibold shadow hover:bg-slate-800"
+              >
+                Exportar CSV
+              </button>
+            </div>
             <table className="min-w-full divide-y divide-gray-200">
               <thead className="bg-gray-50">
                 <tr>
@@ -153,13 +182,14 @@ function MedicoHistorial() {
                         {/* El botón de CRUD (Editar notas) iría aquí */}
                         {/* <button className="text-indigo-600 hover:text-indigo-900 mr-4">Editar Notas</button> */}
                         
-                        <PDFDownloadLink
-                          document={<HistorialMedicoPDF turno={turno} paciente={paciente} medico={medicoInfo} />}
-                          fileName={`historial_turno_${turno.id}_${paciente.apellido}.pdf`}
-                          className="inline-flex items-center justify-center gap-1 rounded-md bg-blue-600 px-3 py-1.5 text-white text-xs font-semibold shadow hover:bg-blue-700"
+                        <button
+                          type="button"
+                          onClick={() => descargarHistorialPDF(turno, paciente)}
+                          disabled={descargando === turno.id}
+                          className="inline-flex items-center justify-center gap-1 rounded-md bg-blue-600 px-3 py-1.5 text-white text-xs font-semibold shadow hover:bg-blue-700 disabled:opacity-60"
                         >
-                          {({ loading }) => (loading ? 'Cargando PDF...' : 'Generar PDF')}
-                        </PDFDownloadLink>
+                          {descargando === turno.id ? 'Cargando PDF...' : 'Generar PDF'}
+                        </button>
                       </td>
                     </tr>
                   );
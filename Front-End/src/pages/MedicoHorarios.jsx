@@ -75,7 +75,8 @@ function MedicoHorarios() {
   
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
-  const [processingSlot, setProcessingSlot] = useState(null); // Para UI "cargando"
+  const [hayCambios, setHayCambios] = useState(false); // Cambios en la grilla sin guardar
+  const [isSaving, setIsSaving] = useState(false);
   
   const navigate = useNavigate();
 
@@ -141,59 +142,57 @@ function MedicoHorarios() {
     );
   };
 
-  // 4. Lógica para HABILITAR o DESHABILITAR un slot
-  const handleToggleHorario = async (dia_semana, hora_inicio) => {
+  // 4. HABILITAR o DESHABILITAR un slot: solo cambia la grilla local.
+  //    Los cambios se envían todos juntos con "Guardar cambios".
+  const handleToggleHorario = (dia_semana, hora_inicio) => {
     setError(null);
-    const slotKey = `${dia_semana}-${hora_inicio}`;
-    setProcessingSlot(slotKey);
-
     const horarioEncontrado = findHorario(dia_semana, hora_inicio);
 
-    try {
-      // --- Caso A: El horario existe, vamos a DESHABILITAR (DELETE) ---
-      if (horarioEncontrado) {
-        const response = await fetch(`http://localhost:8000/horarios_medicos/${horarioEncontrado.id}`, {
-          method: 'DELETE',
-          headers: getAuthHeaders()
-        });
-        if (!response.ok) {
-          const errData = await response.json();
-          throw new Error(errData.detail || 'Error al deshabilitar horario');
-        }
-        // Actualizamos el estado local quitando el horario
-        setMisHorarios(prev => prev.filter(h => h.id !== horarioEncontrado.id));
-
-      // --- Caso B: El horario NO existe, vamos a HABILITAR (POST) ---
-      } else {
-        if (!selectedConsultorioId) {
-          throw new Error("Por favor, selecciona un consultorio primero.");
-        }
-        
-        const nuevoHorario = {
-            dia_semana: parseInt(dia_semana, 10),
-            hora_inicio: `${hora_inicio}:00`,
-            hora_fin: calcularHoraFin(hora_inicio),
-            medicos_id: medicoId,
-            consultorios_id: parseInt(selectedConsultorioId, 10)
-        };
+    if (horarioEncontrado) {
+      setMisHorarios(prev => prev.filter(h => h !== horarioEncontrado));
+    } else {
+      if (!selectedConsultorioId) {
+        setError("Por favor, selecciona un consultorio primero.");
+        return;
+      }
+      setMisHorarios(prev => [...prev, {
+        dia_semana: parseInt(dia_semana, 10),
+        hora_inicio: `${hora_inicio}:00`,
+        hora_fin: calcularHoraFin(hora_inicio),
+        consultorios_id: parseInt(selectedConsultorioId, 10)
+      }]);
+    }
+    setHayCambios(true);
+  };
 
-        const response = await fetch(`http://localhost:8000/horarios_medicos/`, {
-          method: 'POST',
-          headers: getAuthHeaders(),
-          body: JSON.stringify(nuevoHorario)
-        });
-        if (!response.ok) {
-          const errData = await response.json();
-          throw new Error(errData.detail || 'Error al habilitar horario');
-        }
-        // Actualizamos el estado local añadiendo el nuevo horario
-        const horarioCreado = await response.json();
-        setMisHorarios(prev => [...prev, horarioCreado]);
+  // 5. Guarda la grilla completa en un solo pedido (el backend calcula el diff)
+  const handleGuardar = async () => {
+    setError(null);
+    setIsSaving(true);
+    try {
+      const grilla = misHorarios.map(h => ({
+        dia_semana: h.dia_semana,
+        hora_inicio: h.hora_inicio,
+        hora_fin: h.hora_fin,
+        duracion_slot: h.duracion_slot ?? null,
+        consultorios_id: h.consultorios_id
+      }));
+      const response = await fetch(`http://localhost:8000/horarios_medicos/por-medico/${medicoId}`, {
+        method: 'PUT',
+        headers: getAuthHeaders(),
+        body: JSON.stringify(grilla)
+      });
+      if (!response.ok) {
+        const errData = await response.json();
+        throw new Error(errData.detail || 'Error al guardar los horarios');
       }
+      const resultado = await response.json();
+      setMisHorarios(resultado.horarios);
+      setHayCambios(false);
     } catch (err) {
       setError(err.message);
     } finally {
-      setProcessingSlot(null);
+      setIsSaving(false);
     }
   };
 
@@ -247,7 +246,7 @@ function MedicoHorarios() {
                     
                     {diasSemana.map(dia => {
                       const slotKey = `${dia.id}-${hora}`;
-                      const isProcessing = processingSlot === slotKey;
+                      const isProcessing = isSaving;
                       const horario = findHorario(dia.id, hora);
                       const isEnabled = Boolean(horario);
                       
@@ -283,6 +282,18 @@ function MedicoHorarios() {
               </tbody>
             </table>
           </div>
+
+          <div className="mt-6 flex items-center justify-end gap-3">
+            {hayCambios && <span className="text-sm text-amber-600">Hay cambios sin guardar</span>}
+            <button
+              type="button"
+              onClick={handleGuardar}
+              disabled={!hayCambios || isSaving}
+              className="rounded-md bg-emerald-500 px-5 py-2.5 text-sm font-semibold text-white shadow-sm hover:bg-emerald-600 disabled:opacity-50"
+            >
+              {isSaving ? 'Guardando...' : 'Guardar cambios'}
+            </button>
+          </div>
         </>
       )}
     </MedicoPageLayout>
@@ -35,7 +35,6 @@ function MedicoPageLayout({ title, children }) {
 
 function MedicoPacientes() {
   const [pacientes, setPacientes] = useState([]);
-  const [turnos, setTurnos] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
@@ -44,39 +43,22 @@ function MedicoPacientes() {
     setIsLoading(true);
     setError(null);
     try {
-      // 1. Obtener todos los turnos del médico
-      const turnosResponse = await fetch(`http://localhost:8000/turnos/medico/${medicoId}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (!turnosResponse.ok) throw new Error('Error al obtener los turnos');
-      const turnosData = await turnosResponse.json();
-      setTurnos(turnosData); // Guardamos los turnos por si los necesitamos
+      // El backend arma el listado de pacientes (con resumen de visitas) en una sola consulta.
+      // Viene paginado: seguimos X-Next-Cursor hasta la última página.
+      const todos = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: '500' });
+        if (cursor) params.set('despues_de', cursor);
+        const response = await fetch(`http://localhost:8000/medicos/${medicoId}/pacientes?${params}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) throw new Error('Error al obtener los pacientes');
+        todos.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
 
-      // 2. Extraer IDs de pacientes únicos
-      const pacienteIds = [...new Set(turnosData.map(turno => turno.clientes_id))];
-
-      if (pacienteIds.length === 0) {
-        setPacientes([]);
-        return;
-      }
-
-      // 3. Buscar la información de cada paciente
-      // (Usando el endpoint de 'services/cliente.py' -> get_cliente_by_id)
-      const fetchesPacientes = pacienteIds.map(id =>
-        fetch(`http://localhost:8000/clientes/${id}`, {
-          headers: { 'Authorization': `Bearer ${token}` } // Asumiendo que este endpoint también requiere auth
-        }).then(res => {
-          if (!res.ok) {
-            console.warn(`No se pudo encontrar el cliente con ID: ${id}`);
-            return null; // Devolver null si falla para no romper Promise.all
-          }
-          return res.json();
-        })
-      );
-
-      const pacientesData = await Promise.all(fetchesPacientes);
-      // Filtramos los nulos (pacientes no encontrados)
-      setPacientes(pacientesData.filter(Boolean)); 
+      setPacientes(todos);
 
     } catch (err) {
       setError(err.message);
@@ -105,14 +87,10 @@ function MedicoPacientes() {
   }, [navigate, fetchPacientes]);
 
   // Derivamos los pacientes activos (que tienen turnos pendientes o confirmados)
-  const pacientesActivos = useMemo(() => {
-    const idsActivos = new Set(
-        turnos
-            .filter(t => t.estado === 'pendiente' || t.estado === 'confirmado')
-            .map(t => t.clientes_id)
-    );
-    return pacientes.filter(p => idsActivos.has(p.id));
-  }, [turnos, pacientes]);
+  const pacientesActivos = useMemo(
+    () => pacientes.filter(p => p.turnos_activos > 0),
+    [pacientes]
+  );
 
   return (
     <MedicoPageLayout title="Mis Pacientes">
@@ -129,6 +107,9 @@ function MedicoPacientes() {
                         <p className="font-semibold text-emerald-900">{paciente.nombre} {paciente.apellido}</p>
                         <p className="text-sm text-emerald-700">DNI: {paciente.dni}</p>
                         <p className="text-sm text-emerald-700">Email: {paciente.email}</p>
+                        {paciente.proxima_visita && (
+                          <p className="text-sm text-emerald-700">Próxima visita: {new Date(paciente.proxima_visita).toLocaleString('es-AR')}</p>
+                        )}
                     </div>
                 ))}
                 {pacientesActivos.length === 0 && <p className='text-slate-500 text-sm'>No hay pacientes activos en este momento.</p>}
@@ -141,6 +122,7 @@ function MedicoPacientes() {
                     <div key={paciente.id} className="p-4 bg-slate-50 border border-slate-200 rounded-lg">
                         <p className="font-semibold text-slate-900">{paciente.nombre} {paciente.apellido}</p>
                         <p className="text-sm text-slate-600">DNI: {paciente.dni}</p>
+                        <p className="text-sm text-slate-600">Turnos: {paciente.total_turnos}</p>
                     </div>
                 ))}
             </div>
@@ -1,5 +1,6 @@
-import React from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { jwtDecode } from 'jwt-decode';
 import Alert from '../components/Alert';
 
 // Reutilizamos el layout
@@ -31,58 +32,123 @@ function MedicoPageLayout({ title, children }) {
   );
 }
 
-// Datos de ejemplo para simular reportes guardados
-const dummyReportes = [
-    { id: 'rep_001', fecha: '2025-10-30T10:00:00Z', paciente: 'García, María', tipo: 'Historial de Atención' },
-    { id: 'rep_002', fecha: '2025-10-28T14:30:00Z', paciente: 'López, Carlos', tipo: 'Historial de Atención' },
-    { id: 'rep_003', fecha: '2025-10-25T11:15:00Z', paciente: 'Martínez, Ana', tipo: 'Informe Post-Operatorio' },
-];
+// Cantidad de días del reporte (el backend guarda un resumen por día)
+const DIAS_REPORTE = 30;
+
+const formatearOcupacion = (ocupacion) =>
+  ocupacion === null || ocupacion === undefined ? '—' : `${Math.round(ocupacion * 100)}%`;
 
 function MedicoReportes() {
+  const [reporte, setReporte] = useState(null);
+  const [isLoading, setIsLoading] = useState(true);
+  const [error, setError] = useState(null);
+  const navigate = useNavigate();
+
+  const fetchReporte = useCallback(async (medicoId, token) => {
+    setIsLoading(true);
+    setError(null);
+    try {
+      const hasta = new Date();
+      const desde = new Date();
+      desde.setDate(hasta.getDate() - (DIAS_REPORTE - 1));
+      const aFecha = (d) => d.toLocaleDateString('en-CA'); // YYYY-MM-DD en hora local
+      const params = new URLSearchParams({ desde: aFecha(desde), hasta: aFecha(hasta) });
+      const response = await fetch(`http://localhost:8000/medicos/${medicoId}/reportes?${params}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) throw new Error('Error al obtener los reportes');
+      setReporte(await response.json());
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setIsLoading(false);
+    }
+  }, []);
+
+  useEffect(() => {
+    const token = localStorage.getItem('accessToken');
+    if (!token) {
+      navigate('/login');
+      return;
+    }
+    try {
+      const decodedToken = jwtDecode(token);
+      if (decodedToken.rol !== 'medico' || !decodedToken.id) {
+        throw new Error("Token inválido o rol incorrecto.");
+      }
+      fetchReporte(decodedToken.id, token);
+    } catch (err) {
+      console.error("Error al decodificar token o fetch:", err);
+      setError("No se pudo verificar su identidad.");
+      setIsLoading(false);
+    }
+  }, [navigate, fetchReporte]);
+
+  const totales = reporte?.totales;
+  // Más reciente primero
+  const dias = reporte ? [...reporte.dias].reverse() : [];
 
   return (
-    <MedicoPageLayout title="Mis Reportes Generados">
-        
-        <Alert variant="info" title="Página en Construcción (Demo)">
-            Actualmente, los PDFs se generan y descargan en su computadora desde la pestaña "Historial Médico".
-            Esta sección es una demostración de cómo se vería un panel si los reportes generados se guardaran también en el servidor para consulta futura.
-        </Alert>
+    <MedicoPageLayout title="Mis Reportes">
+      {isLoading && <p>Cargando reportes...</p>}
+      {error && <Alert variant="error" title="Error">{error}</Alert>}
+      {!isLoading && !error && reporte && (
+        <div>
+          <h2 className="text-xl font-semibold mb-4">Últimos {DIAS_REPORTE} días</h2>
+          <div className="grid grid-cols-2 md:grid-cols-5 gap-4 mb-8">
+            {[
+              ['Reservados', totales.reservados],
+              ['Confirmados', totales.confirmados],
+              ['Completados', totales.completados],
+              ['Cancelados', totales.cancelados],
+              ['Ocupación', formatearOcupacion(totales.ocupacion)],
+            ].map(([titulo, valor]) => (
+              <div key={titulo} className="p-4 bg-slate-50 border border-slate-200 rounded-lg">
+                <p className="text-sm text-slate-600">{titulo}</p>
+                <p className="text-2xl font-semibold text-slate-900">{valor}</p>
+              </div>
+            ))}
+          </div>
 
-        <div className="overflow-x-auto mt-6">
+          <div className="overflow-x-auto">
             <table className="min-w-full divide-y divide-gray-200">
               <thead className="bg-gray-50">
                 <tr>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Fecha de Generación</th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Paciente</th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Tipo de Reporte</th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Acciones</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Fecha</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Reservados</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Pendientes</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Confirmados</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Completados</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Cancelados</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Pacientes</th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Ocupación</th>
                 </tr>
               </thead>
               <tbody className="bg-white divide-y divide-gray-200">
-                {dummyReportes.map((reporte) => (
-                    <tr key={reporte.id}>
-                      <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
-                        {new Date(reporte.fecha).toLocaleString('es-AR')}
-                      </td>
-                      <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                        {reporte.paciente}
-                      </td>
-                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                        {reporte.tipo}
-                      </td>
-                      <td className="px-6 py-4 whitespace-nowrap text-sm font-medium">
-                        <button className="inline-flex items-center justify-center gap-1 rounded-md bg-gray-600 px-3 py-1.5 text-white text-xs font-semibold shadow hover:bg-gray-700">
-                            Descargar (Sim)
-                        </button>
-                      </td>
-                    </tr>
+                {dias.map((dia) => (
+                  <tr key={dia.fecha}>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
+                      {new Date(`${dia.fecha}T00:00:00`).toLocaleDateString('es-AR', { weekday: 'short', day: '2-digit', month: '2-digit' })}
+                    </td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.reservados}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.pendientes}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.confirmados}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.completados}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.cancelados}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">{dia.pacientes_unicos}</td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                      {formatearOcupacion(dia.ocupacion)}
+                      {dia.capacidad > 0 && <span className="text-xs text-gray-400"> de {dia.capacidad}</span>}
+                    </td>
+                  </tr>
                 ))}
               </tbody>
             </table>
           </div>
-
+        </div>
+      )}
     </MedicoPageLayout>
   );
 }
 
-export default MedicoReportes;
\ No newline at end of file
+export default MedicoReportes;
@@ -4,6 +4,7 @@ import { jwtDecode } from 'jwt-decode';
 import Alert from '../components/Alert';
 // Importamos 'getAuthHeaders' para las peticiones
 import { getAuthHeaders } from '../utils/auth'; 
+import { suscribirEventos } from '../utils/eventos';
 
 // --- Componente de Layout (Sin cambios) ---
 function MedicoPageLayout({ title, children }) {
@@ -49,16 +50,16 @@ function MedicoTurnos() {
   const navigate = useNavigate();
 
   // Estados para manejar las acciones
-  const [medicoId, setMedicoId] = useState(null);
-  const [token, setToken] = useState(null);
+  const [medicoId, setMedicoId] = useState(null); //eslint-disable-line
+  const [token, setToken] = useState(null); //eslint-disable-line
   const [processingId, setProcessingId] = useState(null); // Para deshabilitar botones
 
   const fetchTurnosMedico = useCallback(async (mId, authToken) => {
     setIsLoading(true);
     setError(null);
     try {
-      // Usamos el endpoint que ya trae los datos detallados
-      const response = await fetch(`http://localhost:8000/turnos/medico/${mId}`, {
+      // Usamos el endpoint que ya trae los datos detallados, ordenado por fecha (ASC)
+      const response = await fetch(`http://localhost:8000/turnos/medico/${mId}?orden=asc`, {
         headers: { 'Authorization': `Bearer ${authToken}` }
       });
       if (!response.ok) {
@@ -66,10 +67,6 @@ function MedicoTurnos() {
         throw new Error(errData.detail || 'Error al obtener los turnos');
       }
       const data = await response.json();
-      
-      // Ordenamos por fecha (ASC) para ver próximos primero
-      data.sort((a, b) => new Date(a.fecha_hora) - new Date(b.fecha_hora));
-      
       setTurnos(data);
     } catch (err) {
       setError(err.message);
@@ -102,6 +99,23 @@ function MedicoTurnos() {
     }
   }, [navigate, fetchTurnosMedico]);
 
+  // Agenda en vivo: turnos nuevos, cambios de estado y bajas llegan por SSE
+  useEffect(() => {
+    if (!medicoId || !token) return;
+    // EventSource no permite headers: el token va en la query
+    return suscribirEventos(`/eventos/medico/${medicoId}?token=${encodeURIComponent(token)}`, {
+      turno_creado: ({ turno }) => setTurnos(prev => (
+        prev.some(t => t.id === turno.id)
+          ? prev
+          : [...prev, turno].sort((a, b) => a.fecha_hora.localeCompare(b.fecha_hora) || a.id - b.id)
+      )),
+      turno_estado: ({ turno_id, estado }) =>
+        setTurnos(prev => prev.map(t => (t.id === turno_id ? { ...t, estado } : t))),
+      turno_eliminado: ({ turno_id }) => setTurnos(prev => prev.filter(t => t.id !== turno_id)),
+      resincronizar: () => fetchTurnosMedico(medicoId, token),
+    });
+  }, [medicoId, token, fetchTurnosMedico]);
+
   // Lógica para Aceptar/Rechazar
   const handleUpdateTurno = async (turnoId, accion) => {
     if (processingId) return; // Evitar doble click
@@ -131,9 +145,9 @@ function MedicoTurnos() {
         throw new Error(errData.detail || `Error al ${accion} el turno`);
       }
 
-      // Si fue exitoso, actualizamos la lista para reflejar el cambio
-      // Volvemos a pedir todos los turnos
-      await fetchTurnosMedico(medicoId, token);
+      // El backend devuelve el turno actualizado: lo reemplazamos en la lista
+      const turnoActualizado = await response.json();
+      setTurnos(prev => prev.map(t => (t.id === turnoActualizado.id ? turnoActualizado : t)));
 
     } catch (err) {
       setError(err.message);
@@ -142,6 +156,34 @@ function MedicoTurnos() {
     }
   };
 
+  // Confirma todos los turnos pendientes en un solo pedido (una transacción en el backend)
+  const pendientes = turnos.filter(t => t.estado === 'pendiente');
+
+  const handleConfirmarPendientes = async () => {
+    if (processingId || pendientes.length === 0) return;
+    if (!window.confirm(`¿Confirmar los ${pendientes.length} turnos pendientes?`)) return;
+
+    setProcessingId('lote');
+    setError(null);
+    try {
+      const response = await fetch('http://localhost:8000/turnos/estado', {
+        method: 'PUT',
+        headers: getAuthHeaders(),
+        body: JSON.stringify({ ids: pendientes.map(t => t.id), estado: 'confirmado' })
+      });
+      if (!response.ok) {
+        const errData = await response.json();
+        throw new Error(errData.detail || 'Error al confirmar los turnos');
+      }
+      const actualizados = new Map((await response.json()).map(t => [t.id, t]));
+      setTurnos(prev => prev.map(t => actualizados.get(t.id) || t));
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setProcessingId(null);
+    }
+  };
+
   const formatFechaHora = (fechaHoraISO) => {
     try {
       const fecha = new Date(fechaHoraISO);
@@ -161,6 +203,18 @@ function MedicoTurnos() {
       {!isLoading && !error && (
         turnos.length > 0 ? (
           <div className="overflow-x-auto">
+            {pendientes.length > 0 && (
+              <div className="mb-4 flex justify-end">
+                <button
+                  type="button"
+                  onClick={handleConfirmarPendientes}
+                  disabled={Boolean(processingId)}
+                  className="rounded-md bg-emerald-500 px-4 py-2 text-sm font-semibold text-white shadow-sm hover:bg-emerald-600 disabled:opacity-50"
+                >
+                  Confirmar pendientes ({pendientes.length})
+                </button>
+              </div>
+            )}
             <table className="min-w-full divide-y divide-gray-200">
               <thead className="bg-gray-50">
                 <tr>
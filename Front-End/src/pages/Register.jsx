@@ -117,6 +117,7 @@ function Register() {
       // --- PASO 3: Guardar el token (¡Login exitoso!) ---
       localStorage.setItem('accessToken', loginData.access_token)
       localStorage.setItem('tokenType', loginData.token_type)
+      if (loginData.refresh_token) localStorage.setItem('refreshToken', loginData.refresh_token)
       window.dispatchEvent(new Event('authChange'))
 
       // --- PASO 4: Mostrar modal de éxito ---
@@ -1,9 +1,10 @@
-import React, { useState, useMemo, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Alert from '../components/Alert';
 import AuthRequiredModal from '../components/AuthRequiredModal';
 import InfoModal from '../components/InfoModal';
 import { jwtDecode } from 'jwt-decode';
+import { suscribirEventos } from '../utils/eventos';
 
 // --- Componente TurnoDisponibleCard ---
 function TurnoDisponibleCard({ turno, onReservar, userRole, isReserving }) {
@@ -43,6 +44,20 @@ function TurnoDisponibleCard({ turno, onReservar, userRole, isReserving }) {
 }
 // --- Fin TurnoDisponibleCard ---
 
+// Mismo rango por defecto que /horarios_medicos/disponibles/
+const DIAS_LISTADO = 14;
+
+// Agrega un slot liberado manteniendo el orden del servidor (fecha_hora, horario)
+function agregarSlot(lista, slot) {
+	if (lista.some(t => t.id === slot.id)) return lista;
+	const limite = new Date();
+	limite.setDate(limite.getDate() + DIAS_LISTADO - 1);
+	if (new Date(slot.fecha_turno + 'T00:00:00') > limite) return lista;
+	return [...lista, slot].sort((a, b) =>
+		a.fecha_hora.localeCompare(b.fecha_hora) || a.horarios_medico_id - b.horarios_medico_id
+	);
+}
+
 function Turnos() {
 	const navigate = useNavigate();
 	const [filtroEspecialidad, setFiltroEspecialidad] = useState('');
@@ -55,7 +70,11 @@ function Turnos() {
 	const [especialidades, setEspecialidades] = useState([]);
 	const [isLoading, setIsLoading] = useState(true);
 	const [error, setError] = useState(null);
+	// Se incrementa para volver a pedir la lista completa (evento 'resincronizar')
+	const [recarga, setRecarga] = useState(0);
     const [isReserving, setIsReserving] = useState(false);
+    // Una Idempotency-Key por slot: si se reintenta la misma reserva, el backend no la duplica
+    const clavesReserva = useRef({});
 
 	// --- FUNCIÓN fetchTurnos (MODIFICADA) ---
 	useEffect(() => {
@@ -81,10 +100,14 @@ function Turnos() {
 	        if (isMounted) setError(null);
 
 	        try {
-                // --- CAMBIO AQUÍ ---
-	            // Llamamos al nuevo endpoint que genera los slots disponibles
-	            const response = await fetch('http://localhost:8000/horarios_medicos/disponibles/');
-                // --- FIN DEL CAMBIO ---
+	            // Los filtros se resuelven en el servidor
+	            const params = new URLSearchParams();
+	            if (filtroEspecialidad) params.set('especialidad', filtroEspecialidad);
+	            if (filtroFecha) {
+	                params.set('fecha_desde', filtroFecha);
+	                params.set('fecha_hasta', filtroFecha);
+	            }
+	            const response = await fetch(`http://localhost:8000/horarios_medicos/disponibles/?${params}`);
 
 				if (!response.ok) {
 					let errorText = `Error ${response.status}`;
@@ -104,9 +127,6 @@ function Turnos() {
 	                    throw new Error("Formato de respuesta inesperado del servidor.");
 	                }
 	                setTurnosDisponibles(data);
-	                // La data ya incluye la especialidad, la extraemos
-	                const uniqueEspecialidades = [...new Set(data.map(t => t.especialidad).filter(Boolean))];
-	                setEspecialidades(uniqueEspecialidades);
 	            }
 	        } catch (err) {
 	            if (isMounted) {
@@ -121,6 +141,10 @@ function Turnos() {
 
 	    setCurrentUserRole(getRole());
 	    fetchTurnos();
+	    fetch('http://localhost:8000/horarios_medicos/especialidades/')
+	        .then(res => (res.ok ? res.json() : []))
+	        .then(data => { if (isMounted && Array.isArray(data)) setEspecialidades(data); })
+	        .catch(err => console.error("Error cargando especialidades:", err));
 
 	    const handleAuthChange = () => {
 	        setCurrentUserRole(getRole());
@@ -133,17 +157,27 @@ function Turnos() {
 	        window.removeEventListener('storage', handleAuthChange);
 	        window.removeEventListener('authChange', handleAuthChange);
 	    };
-	}, []);
+	}, [filtroEspecialidad, filtroFecha, recarga]);
     // --- FIN FUNCIÓN fetchTurnos ---
 
-
-	const turnosFiltrados = useMemo(() => {
-        return turnosDisponibles.filter((turno) => {
-			const matchEspecialidad = !filtroEspecialidad || turno.especialidad === filtroEspecialidad;
-			const matchFecha = !filtroFecha || turno.fecha_turno === filtroFecha;
-			return matchEspecialidad && matchFecha;
-		});
-	}, [filtroEspecialidad, filtroFecha, turnosDisponibles]);
+	// Cambios de disponibilidad en vivo: se aplican sobre la lista sin volver a pedirla
+	useEffect(() => {
+	    const params = new URLSearchParams();
+	    if (filtroEspecialidad) params.set('especialidad', filtroEspecialidad);
+	    return suscribirEventos(`/eventos/disponibilidad?${params}`, {
+	        slot_ocupado: ({ slot_id }) =>
+	            setTurnosDisponibles(prev => prev.filter(t => t.id !== slot_id)),
+	        slot_liberado: ({ slot }) => {
+	            if (filtroFecha && slot.fecha_turno !== filtroFecha) return;
+	            setTurnosDisponibles(prev => agregarSlot(prev, slot));
+	        },
+	        resincronizar: () => setRecarga(n => n + 1),
+	    });
+	}, [filtroEspecialidad, filtroFecha]);
+
+
+	// El servidor ya devuelve los turnos filtrados
+	const turnosFiltrados = turnosDisponibles;
 
 	const handleReservar = async (turnoSeleccionado) => {
 		if (!currentUserRole) { setShowAuthModal(true); return; }
@@ -172,14 +206,41 @@ function Turnos() {
         
         console.log("Enviando reserva:", JSON.stringify(reservaData, null, 2));
 
+        const idempotencyKey = clavesReserva.current[turnoSeleccionado.id] ??= crypto.randomUUID();
+
 		try {
-			const response = await fetch('http://localhost:8000/turnos/', {
+			// 1. Apartamos el slot: mientras dure, no se ofrece a otros pacientes
+			const retencionResponse = await fetch('http://localhost:8000/turnos/retenciones', {
+				method: 'POST',
+				headers: {
+					'Content-Type': 'application/json',
+					'Authorization': `Bearer ${token}`
+				},
+				body: JSON.stringify({
+					horarios_medicos_id: reservaData.horarios_medicos_id,
+					fecha_hora: reservaData.fecha_hora
+				}),
+			});
+			if (retencionResponse.status === 409) {
+				setTurnosDisponibles(prevTurnos =>
+					prevTurnos.filter(t => t.id !== turnoSeleccionado.id)
+				);
+			}
+			if (!retencionResponse.ok) {
+				const errorData = await retencionResponse.json().catch(() => null);
+				throw new Error(errorData?.detail || `Error ${retencionResponse.status} al reservar`);
+			}
+			const retencion = await retencionResponse.json();
+
+			// 2. Confirmamos la retención: se convierte en el turno
+			const response = await fetch(`http://localhost:8000/turnos/retenciones/${retencion.token}/confirmar`, {
 				method: 'POST',
 				headers: {
 					'Content-Type': 'application/json',
-					'Authorization': `Bearer ${token}` 
+					'Authorization': `Bearer ${token}`,
+					'Idempotency-Key': idempotencyKey
 				},
-				body: JSON.stringify(reservaData), 
+				body: JSON.stringify({ motivo: reservaData.motivo }),
 			});
 
             const responseText = await response.text();
@@ -199,6 +260,12 @@ function Turnos() {
                 data = { message: "Turno creado" }; 
             }
 
+			if (response.status === 409) {
+                // Otro paciente lo reservó primero: lo sacamos de la lista
+                setTurnosDisponibles(prevTurnos =>
+                    prevTurnos.filter(t => t.id !== turnoSeleccionado.id)
+                );
+			}
 			if (!response.ok) {
                 // El SP 'crear_turno' puede devolver un error 45000
                 // que FastAPI convertirá en un error 400 o 500
@@ -38,12 +38,56 @@ export const getAuthHeaders = () => {
  * dispara un evento global para actualizar componentes (como el Header).
  */
 export const logout = () => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (refreshToken) {
+    // Revoca la sesión en el servidor; si falla, igual se cierra localmente
+    fetch('http://localhost:8000/auth/logout', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    }).catch(() => {});
+  }
   localStorage.removeItem('accessToken');
   localStorage.removeItem('tokenType');
+  localStorage.removeItem('refreshToken');
   // Dispara el evento para que el Header y otros componentes reaccionen
   window.dispatchEvent(new Event('authChange'));
 };
 
+/**
+ * Renueva el access token con el refresh token guardado (sin pedir contraseña).
+ * Devuelve true si se renovó; si el refresh token ya no es válido, cierra la sesión.
+ */
+export const refreshAccessToken = async () => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) {
+    return false;
+  }
+  try {
+    const response = await fetch('http://localhost:8000/auth/token/refresh', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (response.status === 401) {
+      localStorage.removeItem('refreshToken');
+      logout();
+      return false;
+    }
+    if (!response.ok) {
+      return false;
+    }
+    const data = await response.json();
+    localStorage.setItem('accessToken', data.access_token);
+    localStorage.setItem('tokenType', data.token_type);
+    localStorage.setItem('refreshToken', data.refresh_token);
+    return true;
+  } catch (error) {
+    console.error("Error al renovar el token:", error);
+    return false;
+  }
+};
+
 /**
  * Verifica si el usuario está autenticado y si su rol
  * coincide con uno de los roles permitidos (usado por ProtectedRoute).
@@ -0,0 +1,19 @@
+// src/utils/descargas.jsx
+
+/**
+ * Descarga un archivo generado por el backend (PDF, CSV) enviando el token.
+ * No se puede usar un <a href> directo porque el endpoint requiere Authorization.
+ */
+export const descargarArchivo = async (url, nombreArchivo) => {
+  const token = localStorage.getItem('accessToken');
+  const response = await fetch(url, {
+    headers: { 'Authorization': `Bearer ${token}` }
+  });
+  if (!response.ok) throw new Error('No se pudo descargar el archivo');
+  const objectUrl = URL.createObjectURL(await response.blob());
+  const enlace = document.createElement('a');
+  enlace.href = objectUrl;
+  enlace.download = nombreArchivo;
+  enlace.click();
+  URL.revokeObjectURL(objectUrl);
+};
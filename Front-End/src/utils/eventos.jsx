@@ -0,0 +1,16 @@
+// src/utils/eventos.jsx
+
+/**
+ * Abre un stream de Server-Sent Events del backend y registra un handler por
+ * tipo de evento (`{ slot_ocupado: (datos) => ..., ... }`).
+ * EventSource se reconecta solo y manda el último id recibido, así que el
+ * servidor reenvía lo que se perdió (o un `resincronizar` si ya no puede).
+ * Devuelve una función que cierra la conexión (para el cleanup de useEffect).
+ */
+export const suscribirEventos = (ruta, handlers) => {
+  const fuente = new EventSource(`http://localhost:8000${ruta}`);
+  Object.entries(handlers).forEach(([tipo, handler]) => {
+    fuente.addEventListener(tipo, (evento) => handler(JSON.parse(evento.data)));
+  });
+  return () => fuente.close();
+};